@@ -0,0 +1,207 @@
+"""
+In-process HTTP response cache with ETag revalidation for read-only
+dashboard endpoints (/analytics, /top-risk, /customers, /customer/{id}).
+
+Responses only change when the customer snapshot, the live features, the
+batch results or the model change, so a serialized 200 response is stored
+in an LRU keyed by path + query string + the current data versions:
+
+- snapshot: api.routes.churn.SNAPSHOT_VERSION (bumped by load_reference_data)
+- features: core.feature_store.feature_store.data_version() (bumped by
+            every ingested event batch and every day), re-read at most every
+            RESPONSE_CACHE_FEATURE_REFRESH_S so a steady event stream does
+            not keep emptying the cache
+- scores:   core.db.scores_version() (bumped by every event-driven
+            rescoring write to scores.db), re-read on the same schedule
+- batch:    core.db.data_version() (bumped by the batch job)
+- model:    ml.inference.churn_model_service.version (bumped on (re)load)
+
+When any version moves, the whole cache is dropped. Per-customer responses
+(/customer/{id}) also key on that customer's own feature version, so they
+reflect the customer's events immediately without touching other entries. Every cacheable
+response carries a strong `ETag` and `Cache-Control: no-cache`, so
+browsers revalidate with `If-None-Match` and get an empty 304 when nothing
+changed.
+
+The cache is only touched from the event loop thread (middleware), so it
+needs no lock.
+"""
+
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from core import config
+from observability.metrics import CACHE_REQUESTS
+
+# Headers recomputed per response rather than replayed from the cache
+_SKIP_HEADERS = {"content-length", "etag", "cache-control"}
+
+CUSTOMER_PREFIX = "/api/churn/customer/"
+
+# Live feature and rescoring versions as last read, and when (monotonic seconds)
+_live_versions = None
+_live_read_at = 0.0
+
+
+def _live_version(feature_store, db) -> tuple:
+    """
+    (feature_store.data_version(), db.scores_version()), refreshed at most
+    every RESPONSE_CACHE_FEATURE_REFRESH_S.
+    """
+    global _live_versions, _live_read_at
+    now = time.monotonic()
+    if _live_versions is None or now - _live_read_at >= config.RESPONSE_CACHE_FEATURE_REFRESH_S:
+        _live_versions = (feature_store.data_version(), db.scores_version())
+        _live_read_at = now
+    return _live_versions
+
+
+def current_versions() -> tuple:
+    """(snapshot, live features + scores, batch, model) versions the cached responses depend on."""
+    from core import db
+    from core.feature_store import feature_store
+
+    churn = sys.modules.get("api.routes.churn")
+    # Don't trigger the model load from a request: before startup it is simply version 0
+    inference = sys.modules.get("ml.inference")
+    return (
+        getattr(churn, "SNAPSHOT_VERSION", 0),
+        _live_version(feature_store, db),
+        db.data_version(),
+        inference.churn_model_service.version if inference is not None else 0,
+    )
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """RFC 9110 weak comparison against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class CachedResponse:
+    __slots__ = ("body", "status_code", "headers", "media_type", "etag")
+
+    def __init__(self, body: bytes, status_code: int, headers: dict, media_type: str, etag: str):
+        self.body = body
+        self.status_code = status_code
+        self.headers = headers
+        self.media_type = media_type
+        self.etag = etag
+
+
+class ResponseCache:
+    """LRU of serialized responses bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.versions = None
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def sync_versions(self, versions: tuple):
+        """Drop everything when the data or model version changed."""
+        if versions != self.versions:
+            self.clear()
+            self.versions = versions
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.body)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "versions": self.versions}
+
+
+response_cache = ResponseCache(config.RESPONSE_CACHE_MAX_ENTRIES, config.RESPONSE_CACHE_MAX_MB * 1024 * 1024)
+
+CACHEABLE_PREFIXES = tuple(p.strip() for p in config.RESPONSE_CACHE_ROUTES.split(",") if p.strip())
+
+
+def is_cacheable(request: Request) -> bool:
+    return (
+        config.RESPONSE_CACHE_ENABLED
+        and request.method == "GET"
+        and request.url.path.startswith(CACHEABLE_PREFIXES)
+    )
+
+
+def _reply(entry: CachedResponse, if_none_match: str) -> Response:
+    if etag_matches(if_none_match, entry.etag):
+        CACHE_REQUESTS.labels(cache="response", result="not_modified").inc()
+        return Response(status_code=304, headers={"ETag": entry.etag, "Cache-Control": "no-cache"})
+    return Response(
+        content=entry.body,
+        status_code=entry.status_code,
+        headers={**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"},
+        media_type=entry.media_type,
+    )
+
+
+async def cache_responses(request: Request, call_next):
+    """HTTP middleware: serve/store cacheable GET responses, answer revalidation with 304."""
+    if not is_cacheable(request):
+        return await call_next(request)
+
+    versions = current_versions()
+    response_cache.sync_versions(versions)
+    # Versions are part of the key too, so a response computed while a
+    # version moved is never served under the new version
+    path = request.url.path
+    key = (versions, path, request.url.query)
+    if path.startswith(CUSTOMER_PREFIX):
+        from core.feature_store import feature_store
+        key += (feature_store.customer_version(path[len(CUSTOMER_PREFIX):].split("/", 1)[0]),)
+    if_none_match = request.headers.get("if-none-match")
+
+    entry = response_cache.get(key)
+    if entry is not None:
+        CACHE_REQUESTS.labels(cache="response", result="hit").inc()
+        return _reply(entry, if_none_match)
+
+    CACHE_REQUESTS.labels(cache="response", result="miss").inc()
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    entry = CachedResponse(
+        body=body,
+        status_code=response.status_code,
+        headers={k: v for k, v in response.headers.items() if k not in _SKIP_HEADERS},
+        media_type=response.media_type,
+        etag=make_etag(body),
+    )
+    response_cache.put(key, entry)
+    return _reply(entry, if_none_match)
@@ -0,0 +1,209 @@
+"""
+API startup: lifespan-managed initialisation, warmup and readiness.
+
+Importing api.main only defines the app. The expensive work (reading the
+customer/competitor CSVs, loading the model, importing shap and building
+the TreeExplainer) happens in `initialize()`, which the lifespan runs in
+the inference pool after the server starts listening. `/health` answers
+immediately (liveness); `/ready` returns 503 until initialisation and
+warmup have finished, so a rolling restart only routes traffic to warm
+workers.
+
+The lifespan also owns the online feature store (core/feature_store.py):
+it is restored from its checkpoint before the snapshot loads, checkpointed
+every FEATURE_CHECKPOINT_INTERVAL_S and at shutdown, and fed by the event
+file tailer when FEATURE_EVENTS_FILE is set. Once ready it starts the
+rescoring worker (core/rescoring.py, RESCORING_ENABLED) that re-scores
+customers whose features changed.
+
+Warmup (WARMUP_ENABLED, WARMUP_REQUESTS) pushes synthetic customers
+through every stage /predict uses (single and batch model scoring, the
+cascade, SHAP, competitor lookup, customer lookup) so the first real
+request doesn't pay for lazy initialisation. The LLM is not called.
+
+Usage (scripts and benchmarks that use the API modules without a server):
+    from api.lifecycle import initialize
+    initialize()
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from core import config
+from core.inference_pool import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Startup progress reported by /ready."""
+
+    def __init__(self):
+        self.ready = False
+        self.phase = "starting"
+        self.error = None
+        self.timings_ms = {}
+        self._started = time.perf_counter()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "phase": self.phase,
+            "error": self.error,
+            "uptime_s": round(time.perf_counter() - self._started, 3),
+            "timings_ms": self.timings_ms,
+        }
+
+
+readiness = Readiness()
+
+
+def synthetic_customers(n: int) -> list:
+    """Feature dicts spread over the risk range, so both cascade tiers are exercised."""
+    sensitivities = ("Low", "Medium", "High")
+    categories = ("Fresh Produce", "Dairy", "Bakery", "Meat & Seafood")
+    return [
+        {
+            "customer_id": f"WARMUP_{i:04d}",
+            "yearly_purchase_count": 4 + (i * 7) % 48,
+            "avg_gap_days": 3 + (i * 5) % 40,
+            "avg_order_value": 200.0 + (i * 97) % 1500,
+            "days_since_last_purchase": (i * 13) % 120,
+            "discount_sensitivity": sensitivities[i % 3],
+            "online_ratio": (i % 10) / 10,
+            "primary_category": categories[i % len(categories)],
+        }
+        for i in range(n)
+    ]
+
+
+def _timed(name: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    readiness.timings_ms[name] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def warmup(requests: int = None):
+    """Prime the model, explainer and lookups with synthetic customers (blocking)."""
+    from api.routes import churn
+    from ml.cascade import get_cascade_model
+    from ml.explain import explain_churn_decision, get_explainer
+    from ml.inference import churn_model_service
+
+    requests = config.WARMUP_REQUESTS if requests is None else requests
+    customers = synthetic_customers(requests)
+    _timed("explainer_init", get_explainer)
+
+    def run():
+        cascade = get_cascade_model() if config.CASCADE_ENABLED else None
+        churn_model_service.predict_churn_batch(customers)
+        for customer in customers:
+            probability = churn_model_service.predict_churn_probability(customer)
+            if cascade is not None:
+                cascade.predict_churn_probability(customer)
+            explain_churn_decision(customer, probability)
+            churn.get_competitor_gap(customer["primary_category"])
+        if not churn.CUSTOMER_DF.empty:
+            for customer_id in churn.CUSTOMER_DF.index[:requests]:
+                churn.CUSTOMER_DF.loc[customer_id].to_dict()
+
+    _timed("warmup_requests", run)
+
+
+def _load_model():
+    # Importing ml.inference loads the model once; ml.explain reuses it
+    from ml.inference import churn_model_service
+    return churn_model_service
+
+
+def initialize(warm: bool = None):
+    """Load reference data and the model, then warm up (blocking)."""
+    from api.routes.churn import load_reference_data
+    from core.feature_store import feature_store
+
+    readiness.phase = "loading_data"
+    _timed("feature_store", feature_store.restore)
+    _timed("reference_data", load_reference_data)
+
+    readiness.phase = "loading_model"
+    _timed("model_load", _load_model)
+
+    if config.WARMUP_ENABLED if warm is None else warm:
+        readiness.phase = "warming_up"
+        warmup()
+
+
+# Purchase event file tailer (FEATURE_EVENTS_FILE) and rescoring worker, started once the snapshot is loaded
+event_tailer = None
+rescoring_worker = None
+
+
+async def _startup():
+    global event_tailer, rescoring_worker
+    start = time.perf_counter()
+    try:
+        await run_blocking(initialize)
+        readiness.ready = True
+        readiness.phase = "ready"
+        logger.info("API ready after %.0f ms (%s)", (time.perf_counter() - start) * 1000, readiness.timings_ms)
+    except Exception as e:
+        readiness.phase = "failed"
+        readiness.error = str(e)
+        logger.error("Startup initialisation failed: %s", e)
+        return
+
+    if config.RESCORING_ENABLED:
+        from core.feature_store import feature_store
+        from core.rescoring import RescoringWorker, alert_hub
+        alert_hub.attach_loop(asyncio.get_running_loop())
+        rescoring_worker = RescoringWorker(feature_store, alert_hub)
+        rescoring_worker.start()
+
+    if config.FEATURE_EVENTS_FILE:
+        from core.feature_store import EventFileTailer, feature_store
+        event_tailer = EventFileTailer(feature_store, config.FEATURE_EVENTS_FILE)
+        event_tailer.start()
+
+
+async def _checkpoint_features():
+    """Persist the online feature store every FEATURE_CHECKPOINT_INTERVAL_S (when it changed)."""
+    from core.feature_store import feature_store
+
+    while True:
+        await asyncio.sleep(config.FEATURE_CHECKPOINT_INTERVAL_S)
+        try:
+            await run_blocking(feature_store.checkpoint)
+        except Exception as e:
+            logger.error("Feature store checkpoint failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start initialisation in the background; /ready flips once it is done."""
+    from core.feature_store import feature_store
+    from observability.logs import shutdown_logging
+    from observability.profiler import profiler
+
+    if config.PROFILER_CONTINUOUS:
+        profiler.set_continuous(True)
+        logger.info("Continuous profiling enabled at %s Hz", profiler.continuous_hz)
+
+    task = asyncio.create_task(_startup())
+    checkpoint_task = asyncio.create_task(_checkpoint_features())
+    logger.info("FreshMart Customer Retention API started")
+    try:
+        yield
+    finally:
+        task.cancel()
+        checkpoint_task.cancel()
+        if event_tailer is not None:
+            event_tailer.stop()
+        if rescoring_worker is not None:
+            rescoring_worker.stop()
+        # Keep the events ingested since the last periodic checkpoint
+        feature_store.checkpoint()
+        # Flush records still queued for the log writer thread
+        shutdown_logging()
@@ -1,16 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 import logging
+import time
 
+from api.caching import cache_responses
+from api.lifecycle import lifespan
+from api.responses import CompressionMiddleware, FastJSONResponse
+from api.routes.admin import router as admin_router
 from api.routes.churn import router as churn_router
 from core.tracing import setup_tracing
+from observability.logs import bind_request, setup_logging, unbind_request
+from observability.metrics import REGISTRY, REQUEST_LATENCY, CONTENT_TYPE
+from observability.profiler import profiler
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
 # Initialize Tracing
 setup_tracing()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (queue-based, JSON, per-route sampling)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -18,11 +27,17 @@ app = FastAPI(
     title="FreshMart Customer Retention API",
     description="API for predicting customer churn and recommending retention actions",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Instrument the FastAPI application
 FastAPIInstrumentor.instrument_app(app)
 
+# Response cache + ETags for read-only dashboard routes; registered before
+# CORS so per-origin CORS headers are added to cached responses, not stored
+app.middleware("http")(cache_responses)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -32,10 +47,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Tracing initialized.")
-    logger.info("FreshMart Customer Retention API started")
+# gzip/brotli for large complete responses (outside the response cache,
+# which stores uncompressed bodies)
+app.add_middleware(CompressionMiddleware)
+
+def _route_template(request: Request) -> str:
+    """
+    Matched route as a template (e.g. /api/churn/customer/{customer_id}) so
+    metric label cardinality stays bounded; unmatched paths share one label.
+    """
+    if request.scope.get("route") is None:
+        return "unmatched"
+    path = request.url.path
+    for name, value in request.path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_LATENCY.labels(
+            route=_route_template(request),
+            method=request.method,
+            status=status
+        ).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def bind_log_context(request: Request, call_next):
+    token = bind_request(request.url.path)
+    try:
+        return await call_next(request)
+    finally:
+        unbind_request(token)
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    # One header lookup (and an int check) per request when profiling is off
+    if not profiler.should_profile(request.headers.get("x-profile")):
+        return await call_next(request)
+    session = profiler.begin(f"{request.method} {request.url.path}")
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.end(session)
+    response.headers["X-Profile-Id"] = session.id
+    return response
 
 @app.get("/")
 async def root():
@@ -44,9 +106,25 @@ async def root():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint: request, stage, cache, pool and drift metrics."""
+    from ml.drift import publish_metrics
+
+    publish_metrics()
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # Register churn routes
 app.include_router(
     churn_router,
     prefix="/api/churn",
     tags=["Churn"]
 )
+
+
+# Register admin routes (profiler)
+app.include_router(
+    admin_router,
+    prefix="/admin",
+    tags=["Admin"]
+)
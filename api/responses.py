@@ -0,0 +1,137 @@
+"""
+Fast response path: orjson encoding and gzip/brotli compression.
+
+- `FastJSONResponse` encodes with orjson, which is several times faster
+  than the stdlib encoder and serializes NumPy arrays and scalars directly
+  (OPT_SERIALIZE_NUMPY), so handlers can return model outputs unconverted.
+  It is the app's default response class. Handlers that build trusted
+  payloads (lists of plain dicts, /predict) return it explicitly, which
+  also skips FastAPI's jsonable_encoder pass and response-model
+  revalidation.
+- `CompressionMiddleware` compresses complete (non-streaming) responses
+  of at least COMPRESSION_MIN_BYTES, using brotli when the client accepts
+  it and the optional `brotli` package is installed, gzip otherwise.
+  Streaming responses (e.g. server-sent events) pass through untouched.
+  The ETag of a compressed response is made weak, so If-None-Match
+  revalidation against api/caching.py still matches.
+"""
+
+import gzip
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from core import config
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Types orjson doesn't handle natively."""
+    if hasattr(obj, "model_dump"):  # pydantic models
+        return obj.model_dump()
+    if hasattr(obj, "item"):  # numpy scalars not covered by OPT_SERIALIZE_NUMPY
+        return obj.item()
+    if hasattr(obj, "isoformat"):  # pandas Timestamp
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """'br', 'gzip' or None for an Accept-Encoding header value."""
+    offered = set()
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        offered.add(coding.strip())
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered or "*" in offered:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=config.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=config.GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware negotiating br/gzip for complete responses above a size threshold."""
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = config.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                return await send(message)
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = start["headers"]
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or any(k == b"content-encoding" for k, _ in headers)
+            ):
+                # Streaming, small or already encoded: pass through as is
+                await send(start)
+                return await send(message)
+
+            body = compress(body, encoding)
+            new_headers = []
+            for k, v in headers:
+                if k == b"content-length":
+                    continue
+                if k == b"etag" and not v.startswith(b"W/"):
+                    v = b"W/" + v
+                new_headers.append((k, v))
+            new_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": new_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,168 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+import logging
+
+from core import config
+from observability.profiler import profiler, to_folded, top_functions
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Admin endpoints need ADMIN_TOKEN; they are closed without one unless ADMIN_OPEN is set."""
+    if not config.ADMIN_TOKEN:
+        if not config.ADMIN_OPEN:
+            raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    elif x_admin_token != config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+class ArmRequest(BaseModel):
+    requests: int = Field(..., ge=0, le=1000, description="Profile the next N requests (0 disarms)")
+
+
+class ContinuousRequest(BaseModel):
+    enabled: bool
+    hz: Optional[float] = Field(default=None, gt=0, le=100, description="Sampling rate in continuous mode")
+
+
+def _render(stacks, fmt: str, extra: dict):
+    if fmt == "folded":
+        return PlainTextResponse(to_folded(stacks))
+    return {**extra, "top_functions": top_functions(stacks), "top_stacks": [
+        {"stack": stack, "samples": count} for stack, count in stacks.most_common(20)
+    ]}
+
+
+@router.get("/profiler")
+async def profiler_status():
+    """Profiler state: armed requests, stored profiles, continuous mode."""
+    return profiler.status()
+
+
+@router.post("/profiler/arm")
+async def arm_profiler(request: ArmRequest):
+    """Profile the next N requests (any route)."""
+    profiler.arm(request.requests)
+    logger.info("Profiler armed for the next %d requests", request.requests)
+    return profiler.status()
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """Stored request profiles, newest first."""
+    return profiler.list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "json"):
+    """
+    One request profile: JSON summary with hot functions/stacks, or
+    `?format=folded` for flame graph tools.
+    """
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return _render(profile.stacks, format, profile.summary())
+
+
+@router.post("/profiler/continuous")
+async def set_continuous(request: ContinuousRequest):
+    """Turn low-rate continuous sampling on or off."""
+    profiler.set_continuous(request.enabled, request.hz)
+    return profiler.status()
+
+
+@router.get("/profiler/continuous")
+async def get_continuous(format: str = "json"):
+    """Hot stacks aggregated by continuous sampling since the last reset."""
+    data = profiler.continuous_profile()
+    stacks = data.pop("stacks")
+    return _render(stacks, format, data)
+
+
+@router.delete("/profiler/continuous")
+async def reset_continuous():
+    """Clear the continuous-mode aggregate."""
+    profiler.reset_continuous()
+    return profiler.status()
+
+
+@router.post("/reload")
+async def reload_data():
+    """
+    Reload the customer snapshot and the model file (e.g. after a new model
+    was promoted). Bumps their versions, which invalidates cached responses.
+    """
+    from api.routes.churn import load_reference_data
+    from core.inference_pool import run_blocking
+    from ml.drift import reset_drift_monitor
+    from ml.inference import churn_model_service
+
+    await run_blocking(load_reference_data)
+    await run_blocking(churn_model_service.reload)
+    # The new model comes with its own drift reference
+    reset_drift_monitor()
+    logger.info("Reference data and model reloaded")
+    return await cache_stats()
+
+
+@router.get("/cache")
+async def cache_stats():
+    """Response cache size and the data versions it is keyed on."""
+    from api.caching import current_versions, response_cache
+
+    return {**response_cache.stats(), "current_versions": current_versions()}
+
+
+@router.delete("/cache")
+async def clear_cache():
+    """Drop all cached responses."""
+    from api.caching import response_cache
+
+    response_cache.clear()
+    return response_cache.stats()
+
+
+@router.get("/admission")
+async def admission_status():
+    """Current load pressure and the inputs behind the /predict service level."""
+    from core.admission import admission
+
+    return admission.status()
+
+
+@router.get("/feature-store")
+async def feature_store_status():
+    """Tracked customers, pending syncs and checkpoint state of the online feature store."""
+    from core.feature_store import feature_store
+
+    return feature_store.status()
+
+
+@router.post("/feature-store/checkpoint")
+async def checkpoint_feature_store():
+    """Write the feature store checkpoint now."""
+    from core.feature_store import feature_store
+    from core.inference_pool import run_blocking
+
+    await run_blocking(feature_store.checkpoint, None, True)
+    return feature_store.status()
+
+
+@router.get("/rescoring")
+async def rescoring_status():
+    """Rescoring worker backlog and throughput, and alert stream subscribers."""
+    from api import lifecycle
+    from core.rescoring import alert_hub
+
+    worker = lifecycle.rescoring_worker
+    return {
+        "worker": worker.status() if worker is not None else None,
+        "alerts": alert_hub.status(),
+    }
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+import asyncio
 import logging
+import threading
+import time
 import pandas as pd
 from opentelemetry import trace
 from api.schemas import (
@@ -15,9 +19,29 @@ from api.schemas import (
     ComparisonResult,
     InterventionConfig,
     ComparisonRequest,
-    InterventionResult
+    InterventionResult,
+    SimulationGridRequest,
+    SimulationGridResponse,
+    GridPoint,
+    CampaignRequest,
+    CampaignResponse,
+    CampaignAllocation,
+    StrategyMatrixRequest,
+    StrategyMatrixResponse,
+    StrategyRanking,
+    SegmentWinner,
+    PurchaseEvent,
+    EventIngestResponse
 )
 from genai.explanation_engine import GenAIExplanationEngine
+from core import config
+from core.inference_pool import run_blocking
+from core.singleflight import SingleFlight, canonical_key
+from core.feature_store import feature_store
+from ml.drift import get_drift_monitor
+from core.admission import admission, recent_scores, LEVEL_NAMES, NO_LLM, NO_SHAP, PRECOMPUTED, REJECTED
+from api.responses import FastJSONResponse, dumps
+from observability.metrics import STAGE_LATENCY, timer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -26,27 +50,57 @@ tracer = trace.get_tracer(__name__)
 # Initialize GenAI Engine
 explanation_engine = GenAIExplanationEngine()
 
-# Load customer data
-try:
-    CUSTOMER_DF = pd.read_csv("data/freshmart_customers_big.csv")
-    CUSTOMER_DF["customer_id"] = CUSTOMER_DF["customer_id"].astype(str)
-    CUSTOMER_DF.set_index("customer_id", inplace=True)
-    logger.info(f"Loaded {len(CUSTOMER_DF)} customer records.")
-    with open("debug_status.txt", "w") as f:
-        f.write(f"SUCCESS: Loaded {len(CUSTOMER_DF)} customers.\nSample ID: {CUSTOMER_DF.index[0]}")
-except Exception as e:
-    logger.error(f"Failed to load customer data: {e}")
-    with open("debug_status.txt", "w") as f:
-        f.write(f"ERROR: Failed to load customer data: {e}")
-    CUSTOMER_DF = pd.DataFrame()
-
-# Load competitor data
-try:
-    COMPETITOR_DF = pd.read_csv("data/competitor_prices.csv")
-    logger.info(f"Loaded {len(COMPETITOR_DF)} competitor price records.")
-except Exception as e:
-    logger.error(f"Failed to load competitor data: {e}")
-    COMPETITOR_DF = pd.DataFrame()
+# Reference data, loaded at startup by load_reference_data() (api/lifecycle.py)
+CUSTOMER_DF = pd.DataFrame()
+COMPETITOR_DF = pd.DataFrame()
+# Bumped on every load; response caches key on it
+SNAPSHOT_VERSION = 0
+# CUSTOMER_DF is never written in place: new frames (reload, live feature
+# sync) are built aside and published by swapping the reference under this
+# lock, so readers on any thread see one whole version
+_CUSTOMER_DF_LOCK = threading.Lock()
+
+def load_reference_data():
+    """
+    Load the customer snapshot and competitor prices into memory.
+    Called once at startup rather than on import, so importing the API is cheap.
+    """
+    global CUSTOMER_DF, COMPETITOR_DF, SNAPSHOT_VERSION
+
+    # Load customer data
+    try:
+        customers = pd.read_csv("data/freshmart_customers_big.csv")
+        customers["customer_id"] = customers["customer_id"].astype(str)
+        customers.set_index("customer_id", inplace=True)
+        logger.info(f"Loaded {len(customers)} customer records.")
+        with open("debug_status.txt", "w") as f:
+            f.write(f"SUCCESS: Loaded {len(customers)} customers.\nSample ID: {customers.index[0]}")
+    except Exception as e:
+        logger.error(f"Failed to load customer data: {e}")
+        with open("debug_status.txt", "w") as f:
+            f.write(f"ERROR: Failed to load customer data: {e}")
+        customers = pd.DataFrame()
+
+    # Load competitor data
+    try:
+        COMPETITOR_DF = pd.read_csv("data/competitor_prices.csv")
+        logger.info(f"Loaded {len(COMPETITOR_DF)} competitor price records.")
+    except Exception as e:
+        logger.error(f"Failed to load competitor data: {e}")
+        COMPETITOR_DF = pd.DataFrame()
+
+    # New snapshot frame: the feature store seeds from it and re-applies live features on the next read
+    with _CUSTOMER_DF_LOCK:
+        CUSTOMER_DF = customers
+        feature_store.attach(customers)
+        SNAPSHOT_VERSION += 1
+
+def refresh_live_features():
+    """Publish CUSTOMER_DF with the purchase events ingested since the last read applied (core/feature_store.py)."""
+    global CUSTOMER_DF
+    with _CUSTOMER_DF_LOCK:
+        if not CUSTOMER_DF.empty:
+            CUSTOMER_DF = feature_store.sync(CUSTOMER_DF)
 
 def get_competitor_gap(category: str, freshmart_price: float = None):
     """
@@ -85,6 +139,7 @@ async def get_customer(customer_id: str):
     """
     Fetch customer profile by ID from the simulated database.
     """
+    refresh_live_features()
     if customer_id not in CUSTOMER_DF.index:
         raise HTTPException(status_code=404, detail="Customer not found")
     
@@ -92,45 +147,213 @@ async def get_customer(customer_id: str):
     data["customer_id"] = customer_id
     return data
 
+@router.post("/events", response_model=EventIngestResponse)
+async def ingest_purchase_events(events: List[PurchaseEvent]):
+    """
+    Apply purchase events to the customers' rolling features. Reads of the
+    customer endpoints see the new values immediately.
+
+    Returns 503 until the store has been restored from its checkpoint at
+    startup, so no event is applied to state the restore would replace.
+    """
+    if not feature_store.restored:
+        raise HTTPException(
+            status_code=503,
+            detail="Feature store is starting up, retry later",
+            headers={"Retry-After": str(config.ADMISSION_RETRY_AFTER_S)},
+        )
+    return feature_store.ingest([event.dict() for event in events])
+
+@router.get("/alerts")
+async def get_recent_alerts(after_id: int = 0):
+    """Recent alerts for customers that moved into the High risk band (core/rescoring.py)."""
+    from core.rescoring import alert_hub
+
+    return FastJSONResponse(alert_hub.recent(after_id))
+
+def _sse_event(alert: dict) -> bytes:
+    return b"id: %d\nevent: churn_alert\ndata: %s\n\n" % (alert["id"], dumps(alert))
+
+@router.get("/alerts/stream")
+async def stream_alerts(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-sent events stream of churn-risk alerts. A reconnecting client
+    sends Last-Event-ID and gets the buffered alerts it missed first.
+    """
+    from core.rescoring import alert_hub
+
+    queue = alert_hub.subscribe()
+    last_sent = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def events():
+        nonlocal last_sent
+        try:
+            yield b"retry: 5000\n\n"
+            if last_sent is not None:
+                for alert in alert_hub.recent(last_sent):
+                    last_sent = alert["id"]
+                    yield _sse_event(alert)
+            while True:
+                try:
+                    alert = await asyncio.wait_for(queue.get(), timeout=config.ALERTS_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Comment line keeps proxies from timing out an idle stream
+                    yield b": keepalive\n\n"
+                    continue
+                if last_sent is not None and alert["id"] <= last_sent:
+                    continue  # already sent during the replay
+                last_sent = alert["id"]
+                yield _sse_event(alert)
+        finally:
+            alert_hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Concurrent identical /predict requests share one model + SHAP + LLM run
+predict_flight = SingleFlight("predict")
+
 @router.post("/predict", response_model=ChurnPrediction)
 async def predict_churn(features: CustomerFeatures):
     """
     Predict churn risk for a FreshMart customer based on their shopping behavior,
     enriched with GenAI explanations.
+
+    Under load the work is degraded step by step (core/admission.py); the
+    level applied is returned in `service_level` and X-Service-Level.
+    """
+    level = admission.admit()
+    if level == REJECTED:
+        # Rejections cost ~nothing; counting them lets the latency signal decay
+        admission.observe(0.0)
+        return FastJSONResponse(
+            {"detail": "Service overloaded, retry later", "service_level": LEVEL_NAMES[REJECTED]},
+            status_code=503,
+            headers={"Retry-After": str(config.ADMISSION_RETRY_AFTER_S)},
+        )
+
+    drift_monitor = get_drift_monitor()
+    if drift_monitor is not None:
+        drift_monitor.observe(features.dict())
+
+    if level == PRECOMPUTED:
+        start = time.perf_counter()
+        prediction = _precomputed_prediction(features)
+        # Cheap answers let the compute latency signal decay
+        admission.observe(time.perf_counter() - start)
+    elif config.PREDICT_COALESCING_ENABLED:
+        # Only requests admitted at the same level share a result
+        prediction = await predict_flight.run(
+            (level, canonical_key(features.dict())), _compute_prediction, features, level
+        )
+    else:
+        prediction = await _compute_prediction(features, level)
+
+    with timer(STAGE_LATENCY, stage="serialization"):
+        # Built from trusted values and encoded directly, skipping
+        # response-model revalidation
+        return FastJSONResponse(prediction, headers={"X-Service-Level": prediction["service_level"]})
+
+def _precomputed_prediction(features: CustomerFeatures) -> dict:
+    """
+    Score without calling the model: this customer's recent prediction,
+    else the latest batch score, else the rule-based score.
+    """
+    from ml.churn_rules import (
+        calculate_churn_probability,
+        generate_recommendations,
+        get_confidence_score,
+        get_risk_level,
+    )
+
+    recent = recent_scores.get(features.customer_id)
+    if recent is not None:
+        return {**recent, "service_level": LEVEL_NAMES[PRECOMPUTED], "score_source": "recent"}
+
+    from core import db
+    batch = db.get_customer_score(features.customer_id)
+    if batch is not None:
+        probability = float(batch["churn_probability"])
+        return {
+            **batch,
+            "churn_probability": probability,
+            "confidence_score": get_confidence_score(probability),
+            "explanation_summary": None,
+            "service_level": LEVEL_NAMES[PRECOMPUTED],
+            "score_source": "batch",
+        }
+
+    model_input = features.dict()
+    probability = calculate_churn_probability(model_input)
+    risk_level = get_risk_level(probability)
+    return {
+        "customer_id": features.customer_id,
+        "churn_probability": probability,
+        "churn_risk": risk_level,
+        "confidence_score": get_confidence_score(probability),
+        "recommendations": generate_recommendations(model_input, risk_level),
+        "explanation_summary": None,
+        "key_factors": None,
+        "service_level": LEVEL_NAMES[PRECOMPUTED],
+        "score_source": "rules",
+    }
+
+async def _compute_prediction(features: CustomerFeatures, level: int = 0) -> dict:
+    """
+    Model, competitor gap, SHAP and LLM explanation for one customer,
+    skipping the LLM (level >= NO_LLM) and SHAP (level >= NO_SHAP) as
+    admission control asks.
     """
     with tracer.start_as_current_span("predict_churn") as span:
         span.set_attribute("customer_id", features.customer_id)
+        span.set_attribute("service_level", LEVEL_NAMES[level])
         
         try:
             with tracer.start_as_current_span("preprocessing"):
-                # Normalize input values
-                normalized_purchase_count = min(features.yearly_purchase_count / 52, 1.0)  # Weekly purchases
-                normalized_days_since_last = min(features.days_since_last_purchase / 90, 1.0)  # 3 months
-                # ... other normalizations used for calculation ...
-                
                 # --- Real ML Inference ---
                 from ml.inference import churn_model_service
-                
-                # Prepare features for the model (ensure keys match what model expects)
-                model_input = {
-                    "days_since_last_purchase": features.days_since_last_purchase,
-                    "yearly_purchase_count": features.yearly_purchase_count,
-                    "avg_gap_days": features.avg_gap_days,
-                    "discount_sensitivity": features.discount_sensitivity,
-                    "online_ratio": features.online_ratio,
-                    "primary_category": features.primary_category,
-                    "avg_order_value": features.avg_order_value
-                }
-                
-                churn_probability = churn_model_service.predict_churn_probability(model_input)
+                from ml.cascade import get_cascade_model, FULL_MODEL
+
+                with timer(STAGE_LATENCY, stage="feature_prep"):
+                    # Prepare features for the model (ensure keys match what model expects)
+                    model_input = {
+                        "days_since_last_purchase": features.days_since_last_purchase,
+                        "yearly_purchase_count": features.yearly_purchase_count,
+                        "avg_gap_days": features.avg_gap_days,
+                        "discount_sensitivity": features.discount_sensitivity,
+                        "online_ratio": features.online_ratio,
+                        "primary_category": features.primary_category,
+                        "avg_order_value": features.avg_order_value
+                    }
+
+                # Model and SHAP time (incl. pool queue wait) drive admission;
+                # the LLM call is tracked separately
+                compute_start = time.perf_counter()
+                with timer(STAGE_LATENCY, stage="model"):
+                    if config.CASCADE_ENABLED:
+                        # Cheap first tier decides clear-cut customers, the forest handles the rest
+                        cascade = get_cascade_model()
+                        churn_probability, model_tier = await run_blocking(cascade.predict_churn_probability, model_input)
+                        model_used = "random_forest_v1" if model_tier == FULL_MODEL else f"cascade_{cascade.tier1.name}"
+                    else:
+                        churn_probability = await run_blocking(churn_model_service.predict_churn_probability, model_input)
+                        model_tier = FULL_MODEL
+                        model_used = "random_forest_v1"
+                compute_s = time.perf_counter() - compute_start
                 churn_probability = min(max(churn_probability, 0.0), 0.99)
                 
                 span.set_attribute("churn_probability", float(churn_probability))
-                span.set_attribute("model_used", "random_forest_v1")
+                span.set_attribute("model_used", model_used)
 
                 
                 # --- Competitor Price Gap Analysis ---
-                gap_pct, comp_name, comp_price = get_competitor_gap(features.primary_category)
+                with timer(STAGE_LATENCY, stage="competitor_lookup"):
+                    gap_pct, comp_name, comp_price = get_competitor_gap(features.primary_category)
                 competitor_risk_factor = False
                 
                 if gap_pct > 0.10: # If competitor is > 10% cheaper
@@ -160,8 +383,18 @@ async def predict_churn(features: CustomerFeatures):
 
                 # --- GenAI Integration ---
                 # --- SHAP Explanation (The "Why") ---
-                from ml.explain import explain_churn_decision
-                shap_explanation = explain_churn_decision(model_input, churn_probability)
+                if model_tier == FULL_MODEL and level < NO_SHAP:
+                    from ml.explain import explain_churn_decision
+                    shap_start = time.perf_counter()
+                    with timer(STAGE_LATENCY, stage="shap"):
+                        shap_explanation = await run_blocking(explain_churn_decision, model_input, churn_probability)
+                    compute_s += time.perf_counter() - shap_start
+                else:
+                    # First-tier decisions are clear-cut (or we're shedding load);
+                    # skip the SHAP computation
+                    from ml.cascade import tier1_explanation
+                    shap_explanation = tier1_explanation(churn_probability)
+                admission.observe(compute_s)
                 
                 # --- GenAI Integration (The Narrative) ---
                 # Prepare explanation data context
@@ -176,12 +409,25 @@ async def predict_churn(features: CustomerFeatures):
                 }
                 
                 # We pass the calculated metrics to the LLM to get the "Why" and "What Next"
-                explanation_data = explanation_engine.generate_explanation(
-                    features.dict(),
-                    churn_probability,
-                    risk_level,
-                    explanation_context
-                )
+                if level >= NO_LLM:
+                    # Shedding load: SHAP summary and rule-based actions instead of the LLM
+                    from ml.churn_rules import generate_recommendations
+                    explanation_data = {
+                        "summary": shap_explanation.get("explanation"),
+                        "key_factors": [],
+                        "recommended_actions": generate_recommendations(model_input, risk_level),
+                    }
+                else:
+                    llm_start = time.perf_counter()
+                    with timer(STAGE_LATENCY, stage="llm"):
+                        explanation_data = await run_blocking(
+                            explanation_engine.generate_explanation,
+                            features.dict(),
+                            churn_probability,
+                            risk_level,
+                            explanation_context
+                        )
+                    admission.observe_llm(time.perf_counter() - llm_start)
                 
                 explanation_summary = explanation_data.get("summary")
                 # Merge SHAP factors if LLM fails or for data richness
@@ -195,23 +441,27 @@ async def predict_churn(features: CustomerFeatures):
                 if not recommendations:
                      recommendations = ["Review customer engagement history manually."]
 
-                prediction = ChurnPrediction(
-                    customer_id=features.customer_id,
-                    churn_probability=float(churn_probability),
-                    churn_risk=risk_level,
-                    confidence_score=confidence,
-                    recommendations=recommendations,
-                    explanation_summary=explanation_summary,
-                    key_factors=key_factors
-                )
+                # LLM-provided lists are coerced to str (no response-model validation)
+                prediction = {
+                    "customer_id": features.customer_id,
+                    "churn_probability": float(churn_probability),
+                    "churn_risk": risk_level,
+                    "confidence_score": confidence,
+                    "recommendations": [str(r) for r in recommendations],
+                    "explanation_summary": str(explanation_summary) if explanation_summary is not None else None,
+                    "key_factors": [str(k) for k in key_factors] if key_factors is not None else None,
+                    "service_level": LEVEL_NAMES[level],
+                    "score_source": "model",
+                }
             
-            logger.info(f"Churn prediction completed for {features.customer_id}: {risk_level} risk")
+            logger.info("Churn prediction completed for %s: %s risk", features.customer_id, risk_level)
+            recent_scores.put(features.customer_id, prediction)
             return prediction
             
         except Exception as e:
             span.record_exception(e)
             span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
-            logger.error(f"Error in churn prediction: {str(e)}")
+            logger.error("Error in churn prediction: %s", e)
             raise HTTPException(status_code=500, detail=f"Churn prediction failed: {str(e)}")
 
 @router.post("/simulate", response_model=SimulationResponse)
@@ -219,6 +469,7 @@ async def simulate_intervention(simulation: SimulationInput):
     """
     Simulate the impact of a retention high-touch intervention on churn probability.
     """
+    refresh_live_features()
     if simulation.customer_id not in CUSTOMER_DF.index:
         raise HTTPException(status_code=404, detail="Customer not found")
     
@@ -266,6 +517,7 @@ async def generate_outreach(request: OutreachRequest):
     """
     Generate a personalized retention message for a customer.
     """
+    refresh_live_features()
     if request.customer_id not in CUSTOMER_DF.index:
         raise HTTPException(status_code=404, detail="Customer not found")
     
@@ -273,13 +525,15 @@ async def generate_outreach(request: OutreachRequest):
     features["customer_id"] = request.customer_id
     
     try:
-        outreach = explanation_engine.generate_outreach_draft(
-            features,
-            {"type": request.intervention_type, "details": request.intervention_details}
-        )
+        with timer(STAGE_LATENCY, stage="llm"):
+            outreach = await run_blocking(
+                explanation_engine.generate_outreach_draft,
+                features,
+                {"type": request.intervention_type, "details": request.intervention_details}
+            )
         return OutreachResponse(**outreach)
     except Exception as e:
-        logger.error(f"Failed to generate outreach: {e}")
+        logger.error("Failed to generate outreach: %s", e)
         raise HTTPException(status_code=500, detail="GenAI outreach generation failed.")
 
 @router.get("/analytics")
@@ -288,6 +542,7 @@ async def get_analytics():
     Get analytics data for the dashboard including risk distribution,
     average churn probability, and total customers.
     """
+    refresh_live_features()
     try:
         if CUSTOMER_DF.empty:
             raise HTTPException(status_code=503, detail="Customer data not available")
@@ -312,7 +567,8 @@ async def get_analytics():
                 "avg_gap_days": customer_data.get("avg_gap_days", 0),
                 "discount_sensitivity": customer_data.get("discount_sensitivity", "Medium"),
                 "online_ratio": customer_data.get("online_ratio", 0),
-                "avg_order_value": customer_data.get("avg_order_value", 0)
+                "avg_order_value": customer_data.get("avg_order_value", 0),
+                "primary_category": customer_data.get("primary_category", "Grocery")
             }
             batch_inputs.append(model_input)
             
@@ -321,9 +577,13 @@ async def get_analytics():
 
         # Batch Prediction (Vectorized)
         try:
-             churn_probs = churn_model_service.predict_churn_batch(batch_inputs)
+             if config.CASCADE_ENABLED:
+                 from ml.cascade import get_cascade_model
+                 churn_probs, _ = get_cascade_model().predict_churn_frame(pd.DataFrame(batch_inputs))
+             else:
+                 churn_probs = churn_model_service.predict_churn_batch(batch_inputs)
         except Exception as e:
-             logger.error(f"Batch prediction failed: {e}")
+             logger.error("Batch prediction failed: %s", e)
              churn_probs = [0.5] * len(batch_inputs) # Fallback
 
         # Aggregation
@@ -368,7 +628,7 @@ async def get_analytics():
         }
         
     except Exception as e:
-        logger.error(f"Analytics generation failed: {e}")
+        logger.error("Analytics generation failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate analytics: {str(e)}")
 
 @router.get("/top-risk")
@@ -376,44 +636,13 @@ async def get_top_risk_customers():
     """
     Retrieve the top 100 at-risk customers from the batch job results.
     """
-    import sqlite3
-    import json
-    import os
-    
-    db_path = "data/db/churn.db"
-    if not os.path.exists(db_path):
-        # Fallback to empty if DB not found (though it should exist)
-        return []
+    from core import db
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get top 100 high-risk customers
-        query = """
-        SELECT customer_id, risk_score, churn_probability, top_factors 
-        FROM churn_predictions 
-        ORDER BY churn_probability DESC 
-        LIMIT 100
-        """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        results = []
-        for row in rows:
-            results.append({
-                "customer_id": row[0],
-                "churn_risk": "High" if row[2] > 0.7 else "Medium",
-                "churn_probability": row[2],
-                "key_factors": json.loads(row[3]) if row[3] else [],
-                "recommendations": [] # Placeholder for now as top_risk query doesn't join recommend yet
-            })
-            
-        conn.close()
-        return results
-        
+        # Served from memory until the batch job writes a new version
+        return FastJSONResponse(db.get_top_risk_customers(limit=100))
     except Exception as e:
-        logger.error(f"Failed to fetch top risk customers: {e}")
+        logger.error("Failed to fetch top risk customers: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to retrieve data: {str(e)}")
 
 @router.get("/customers")
@@ -421,27 +650,28 @@ async def get_customers(page: int = 1, limit: int = 100, search: str = ""):
     """
     Get paginated customer list with optional search.
     """
+    refresh_live_features()
     try:
         # Filter logic
-        logger.info(f"🔍 Searching customers with query: '{search}' | DF Size: {len(CUSTOMER_DF)}")
+        logger.debug("🔍 Searching customers with query: '%s' | DF Size: %s", search, len(CUSTOMER_DF))
         
         if search:
             search_clean = search.strip()
             # Try exact match first (fastest)
             if search_clean in CUSTOMER_DF.index:
                 filtered_df = CUSTOMER_DF.loc[[search_clean]]
-                logger.info(f"🔍 Found exact match for '{search_clean}'")
+                logger.debug("🔍 Found exact match for '%s'", search_clean)
             else:
                 # Fallback to substring search
                 # Ensure index is treated as string and handle NaNs
                 mask = CUSTOMER_DF.index.astype(str).str.contains(search_clean, case=False, regex=False, na=False)
                 filtered_df = CUSTOMER_DF[mask]
-                logger.info(f"🔍 Found {len(filtered_df)} matches for '{search_clean}'")
+                logger.debug("🔍 Found %s matches for '%s'", len(filtered_df), search_clean)
         else:
             filtered_df = CUSTOMER_DF
             
         total_count = len(filtered_df)
-        logger.info(f"🔍 Final Total Count: {total_count}")
+        logger.debug("🔍 Final Total Count: %s", total_count)
         
         # Pagination logic
         start = (page - 1) * limit
@@ -450,25 +680,33 @@ async def get_customers(page: int = 1, limit: int = 100, search: str = ""):
         # Slice the dataframe
         paginated_df = filtered_df.iloc[start:end]
         
-        results = []
-        for customer_id, row in paginated_df.iterrows():
-            # Basic info
-            results.append({
+        # Column-wise instead of iterrows(): plain Python values, ready for orjson
+        n = len(paginated_df)
+        categories = paginated_df["primary_category"].tolist() if "primary_category" in paginated_df else ["Unknown"] * n
+        order_values = paginated_df["avg_order_value"].tolist() if "avg_order_value" in paginated_df else [0] * n
+        purchases = paginated_df["yearly_purchase_count"].tolist() if "yearly_purchase_count" in paginated_df else [0] * n
+        recency = paginated_df["days_since_last_purchase"].tolist() if "days_since_last_purchase" in paginated_df else [0] * n
+
+        results = [
+            {
                 "id": customer_id,
                 "name": f"Customer {customer_id.split('_')[-1]}", # Mock name
-                "category": str(row.get("primary_category", "Unknown")), # Ensure string
-                "spend": float(row.get("avg_order_value", 0)) * float(row.get("yearly_purchase_count", 0)),
-                "risk": "High" if row.get("days_since_last_purchase", 0) > 60 else "Low" # Simple heuristic for list view speed
-            })
+                "category": str(category), # Ensure string
+                "spend": float(order_value) * float(count),
+                "risk": "High" if days > 60 else "Low" # Simple heuristic for list view speed
+            }
+            for customer_id, category, order_value, count, days
+            in zip(paginated_df.index.tolist(), categories, order_values, purchases, recency)
+        ]
             
-        return {
+        return FastJSONResponse({
             "data": results,
             "total": total_count,
             "page": page,
             "limit": limit
-        }
+        })
     except Exception as e:
-        logger.error(f"Customer list fetch failed: {e}")
+        logger.error("Customer list fetch failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/customer/{customer_id}")
@@ -476,6 +714,7 @@ async def get_customer_details(customer_id: str):
     """
     Get raw features for a specific customer to populate the ChurnForm.
     """
+    refresh_live_features()
     if customer_id not in CUSTOMER_DF.index:
          raise HTTPException(status_code=404, detail="Customer not found")
          
@@ -493,7 +732,7 @@ async def get_customer_details(customer_id: str):
         # Fill missing relevant fields for form if needed
         return data
     except Exception as e:
-        logger.error(f"Failed to fetch customer {customer_id}: {e}")
+        logger.error("Failed to fetch customer %s: %s", customer_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/simulate-comparison", response_model=ComparisonResult)
@@ -502,6 +741,7 @@ async def simulate_comparison(request: ComparisonRequest):
     Compare two intervention strategies side-by-side and determine a winner
     based on Net Retention Score.
     """
+    refresh_live_features()
     
     if request.customer_id not in CUSTOMER_DF.index:
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -561,9 +801,305 @@ async def simulate_comparison(request: ComparisonRequest):
         winner=winner
     )
 
+# Upper bound on discount x points x channel combinations per grid request
+MAX_GRID_POINTS = 5000
+
+@router.post("/simulate-grid", response_model=SimulationGridResponse)
+async def simulate_grid(request: SimulationGridRequest):
+    """
+    Evaluate a full grid of discount levels x loyalty bonuses x channels for a
+    customer, scoring every counterfactual through the churn model in one batch,
+    and return the Pareto frontier of churn reduction versus cost.
+    """
+    refresh_live_features()
+    import numpy as np
+    from ml.inference import churn_model_service
+    from ml.interventions import score_interventions, pareto_frontier, normalize_channel
+
+    if request.customer_id not in CUSTOMER_DF.index:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    if not request.discount_levels or not request.loyalty_bonus_levels or not request.channels:
+        raise HTTPException(status_code=400, detail="Grid dimensions must not be empty")
+
+    grid_size = len(request.discount_levels) * len(request.loyalty_bonus_levels) * len(request.channels)
+    if grid_size > MAX_GRID_POINTS:
+        raise HTTPException(status_code=400, detail=f"Grid too large ({grid_size} points, max {MAX_GRID_POINTS})")
+
+    try:
+        channels = [normalize_channel(c) for c in request.channels]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    with tracer.start_as_current_span("simulate_grid") as span:
+        span.set_attribute("customer_id", request.customer_id)
+        span.set_attribute("grid_size", grid_size)
+
+        # Full cartesian product, discount-major
+        d_grid, p_grid, c_grid = np.meshgrid(
+            np.asarray(request.discount_levels, dtype=float),
+            np.asarray(request.loyalty_bonus_levels, dtype=float),
+            np.arange(len(channels)),
+            indexing="ij"
+        )
+        discounts = d_grid.ravel()
+        points = p_grid.ravel()
+        channel_names = [channels[i] for i in c_grid.ravel()]
+
+        customer = CUSTOMER_DF.loc[[request.customer_id]]
+        scores = score_interventions(customer, discounts, points, channel_names, churn_model_service)
+
+        new_prob = scores["new_probability"][0]
+        reduction = scores["churn_reduction"][0]
+        cost = scores["cost"][0]
+        net = scores["net_score"][0]
+
+        grid = [
+            GridPoint(
+                planned_discount=float(discounts[i]),
+                loyalty_points_bonus=int(points[i]),
+                intervention_channel=channel_names[i],
+                new_churn_probability=float(new_prob[i]),
+                churn_reduction_absolute=float(reduction[i]),
+                intervention_cost=float(cost[i]),
+                net_retention_score=float(net[i])
+            )
+            for i in range(grid_size)
+        ]
+
+        frontier = pareto_frontier(cost, reduction)
+        span.set_attribute("pareto_size", len(frontier))
+
+    return SimulationGridResponse(
+        customer_id=request.customer_id,
+        baseline_churn_probability=float(scores["baseline_probability"][0]),
+        grid=grid,
+        pareto_frontier=[grid[i] for i in frontier],
+        best_strategy=grid[int(np.argmax(net))]
+    )
+
+@router.post("/optimize-campaign", response_model=CampaignResponse)
+def optimize_campaign(request: CampaignRequest):
+    """
+    Decide who gets which offer under a total budget, maximising expected
+    retained revenue across the customer base.
+
+    Declared as a sync endpoint so the (CPU-heavy) whole-base scoring runs in
+    the threadpool instead of blocking the event loop.
+    """
+    refresh_live_features()
+    from ml.inference import churn_model_service
+    from ml.campaign import plan_campaign, DEFAULT_INTERVENTIONS
+    from ml.interventions import normalize_channel
+
+    if CUSTOMER_DF.empty:
+        raise HTTPException(status_code=503, detail="Customer data not available")
+
+    if request.interventions:
+        interventions = [i.dict() for i in request.interventions]
+    else:
+        interventions = DEFAULT_INTERVENTIONS
+
+    names = [i["name"] for i in interventions]
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail="Intervention names must be unique")
+    try:
+        for intervention in interventions:
+            normalize_channel(intervention.get("intervention_channel", "email"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if request.customer_ids:
+        customers = CUSTOMER_DF.loc[CUSTOMER_DF.index.intersection(request.customer_ids)]
+    else:
+        customers = CUSTOMER_DF
+
+    with tracer.start_as_current_span("optimize_campaign") as span:
+        span.set_attribute("customers", len(customers))
+        span.set_attribute("interventions", len(interventions))
+        span.set_attribute("budget", request.budget)
+
+        try:
+            plan = plan_campaign(customers, interventions, request.budget, churn_model_service)
+        except Exception as e:
+            span.record_exception(e)
+            logger.error("Campaign optimization failed: %s", e)
+            raise HTTPException(status_code=500, detail=f"Campaign optimization failed: {str(e)}")
+
+        span.set_attribute("customers_targeted", len(plan["allocation"]))
+
+    top = plan["allocation"].head(request.max_allocations_returned)
+    return CampaignResponse(
+        budget=request.budget,
+        total_cost=plan["total_cost"],
+        expected_retained_revenue=plan["expected_retained_revenue"],
+        customers_considered=plan["customers_considered"],
+        customers_targeted=len(plan["allocation"]),
+        intervention_counts=plan["intervention_counts"],
+        allocations=[CampaignAllocation(**row) for row in top.to_dict(orient="records")]
+    )
+
+# Customer attributes usable for filtering and per-segment winners
+SEGMENT_COLUMNS = ["primary_category", "secondary_category", "location", "gender", "discount_sensitivity", "risk_band"]
+
+@router.post("/compare-strategies", response_model=StrategyMatrixResponse)
+def compare_strategies(request: StrategyMatrixRequest):
+    """
+    Compare N intervention strategies across a set of customers. The full
+    customers x strategies matrix of probability, cost and net score is
+    computed with array operations, then reduced to rankings and
+    per-segment winners.
+    """
+    refresh_live_features()
+    import numpy as np
+    from ml.inference import churn_model_service
+    from ml.interventions import score_interventions, normalize_channel
+    from ml.churn_rules import get_risk_level
+
+    if CUSTOMER_DF.empty:
+        raise HTTPException(status_code=503, detail="Customer data not available")
+
+    names = [s.name for s in request.strategies]
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail="Strategy names must be unique")
+    try:
+        channels = [normalize_channel(s.intervention_channel) for s in request.strategies]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for column in list((request.segment_filters or {}).keys()) + [request.segment_by]:
+        if column is not None and column not in SEGMENT_COLUMNS:
+            raise HTTPException(status_code=400, detail=f"Unsupported segment attribute '{column}'. Supported: {SEGMENT_COLUMNS}")
+
+    # 1. Select customers
+    if request.customer_ids:
+        customers = CUSTOMER_DF.loc[CUSTOMER_DF.index.intersection(request.customer_ids)]
+        if customers.empty:
+            raise HTTPException(status_code=404, detail="Customer not found")
+    else:
+        customers = CUSTOMER_DF
+
+    filters = {k: v for k, v in (request.segment_filters or {}).items() if k != "risk_band"}
+    for column, value in filters.items():
+        customers = customers[customers[column].astype(str).str.lower() == str(value).lower()]
+
+    if len(customers) > request.max_customers:
+        customers = customers.sample(n=request.max_customers, random_state=42)
+
+    with tracer.start_as_current_span("compare_strategies") as span:
+        span.set_attribute("strategies", len(names))
+
+        # 2. Score the full customers x strategies matrix in one batch
+        scores = score_interventions(
+            customers,
+            [s.planned_discount for s in request.strategies],
+            [s.loyalty_points_bonus for s in request.strategies],
+            channels,
+            churn_model_service
+        )
+        baseline = scores["baseline_probability"]
+        segments = None
+        if request.segment_by == "risk_band" or "risk_band" in (request.segment_filters or {}):
+            risk_band = np.array([get_risk_level(p) for p in baseline])
+            if "risk_band" in (request.segment_filters or {}):
+                keep = np.char.lower(risk_band.astype(str)) == str(request.segment_filters["risk_band"]).lower()
+                customers = customers[keep]
+                risk_band = risk_band[keep]
+                scores = {k: v[keep] for k, v in scores.items()}
+                baseline = scores["baseline_probability"]
+            if request.segment_by == "risk_band":
+                segments = risk_band
+        if request.segment_by and segments is None:
+            segments = customers[request.segment_by].astype(str).to_numpy()
+
+        if len(customers) == 0:
+            raise HTTPException(status_code=404, detail="No customers match the requested segment")
+        span.set_attribute("customers", len(customers))
+
+        net = scores["net_score"]
+
+        # 3. Rankings
+        winners = net.argmax(axis=1)
+        win_rate = np.bincount(winners, minlength=len(names)) / len(customers)
+        mean_net = net.mean(axis=0)
+        order = np.argsort(-mean_net)
+        rankings = [
+            StrategyRanking(
+                rank=rank + 1,
+                name=names[i],
+                mean_net_retention_score=float(mean_net[i]),
+                total_net_retention_score=float(net[:, i].sum()),
+                mean_new_churn_probability=float(scores["new_probability"][:, i].mean()),
+                mean_churn_reduction=float(scores["churn_reduction"][:, i].mean()),
+                mean_intervention_cost=float(scores["cost"][:, i].mean()),
+                win_rate=float(win_rate[i])
+            )
+            for rank, i in enumerate(order)
+        ]
+
+        # 4. Per-segment winners
+        segment_winners = []
+        if segments is not None:
+            by_segment = pd.DataFrame(net, columns=names).groupby(segments)
+            segment_means = by_segment.mean()
+            segment_sizes = by_segment.size()
+            best = segment_means.to_numpy().argmax(axis=1)
+            for row, segment in enumerate(segment_means.index):
+                segment_winners.append(SegmentWinner(
+                    segment=str(segment),
+                    customers=int(segment_sizes[segment]),
+                    winner=names[best[row]],
+                    mean_net_retention_score=float(segment_means.iat[row, best[row]])
+                ))
+
+    return StrategyMatrixResponse(
+        customers_evaluated=len(customers),
+        mean_baseline_churn_probability=float(baseline.mean()),
+        rankings=rankings,
+        segment_by=request.segment_by,
+        segment_winners=segment_winners
+    )
+
+@router.get("/cascade/stats")
+async def get_cascade_stats():
+    """
+    Traffic handled by each cascade tier and live agreement with the full model.
+    """
+    if not config.CASCADE_ENABLED:
+        return {"enabled": False}
+
+    from ml.cascade import get_cascade_model
+    return {"enabled": True, **get_cascade_model().stats()}
+
+@router.get("/drift")
+async def get_feature_drift():
+    """
+    PSI / KS of the live (/predict and rescoring) and last batch-run
+    feature distributions against the model's training reference.
+    """
+    from ml.drift import load_batch_report
+
+    monitor = get_drift_monitor()
+    return {
+        "enabled": config.DRIFT_ENABLED,
+        "online": monitor.report() if monitor is not None else None,
+        "batch": load_batch_report(),
+    }
+
 @router.get("/health")
 async def health_check():
     """
     Health check endpoint for FreshMart churn prediction service.
     """
-    return {"status": "healthy", "service": "freshmart_churn_prediction"}
\ No newline at end of file
+    return {"status": "healthy", "service": "freshmart_churn_prediction"}
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 until reference data, the model and warmup are done.
+    Unlike /health (liveness), use this to decide when to route traffic.
+    """
+    from fastapi.responses import JSONResponse
+    from api.lifecycle import readiness
+
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
\ No newline at end of file
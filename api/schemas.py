@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field, confloat, conint
+from typing import Dict, List, Optional
 
 class CustomerFeatures(BaseModel):
     """
@@ -34,6 +35,8 @@ class ChurnPredictionResponse(BaseModel):
     recommendations: List[str] = Field(..., description="List of actionable retention recommendations")
     explanation_summary: Optional[str] = Field(None, description="GenAI generated textual explanation of the risk")
     key_factors: Optional[List[str]] = Field(None, description="Key factors contributing to the risk")
+    service_level: Optional[str] = Field(None, description="Admission level applied (full, no_llm, no_shap, precomputed)")
+    score_source: Optional[str] = Field(None, description="Where the score came from (model, recent, batch, rules)")
 
 class SimulationInput(BaseModel):
     """
@@ -74,8 +77,9 @@ class InterventionConfig(BaseModel):
     Configuration for a single intervention strategy in a comparison.
     """
     name: str = Field(..., description="Name of the strategy (e.g. 'Aggressive Discount')")
-    planned_discount: float = Field(default=0.0, description="Discount percentage (0-100)")
-    loyalty_points_bonus: int = Field(default=0, description="Loyalty points to add")
+    planned_discount: float = Field(default=0.0, ge=0, le=100, description="Discount percentage (0-100)")
+    loyalty_points_bonus: int = Field(default=0, ge=0, description="Loyalty points to add")
+    intervention_channel: str = Field(default="email", description="Outreach channel (email, sms, push, phone)")
 
 class InterventionResult(BaseModel):
     """
@@ -104,3 +108,125 @@ class ComparisonRequest(BaseModel):
     customer_id: str
     strategy_a: InterventionConfig
     strategy_b: InterventionConfig
+
+class SimulationGridRequest(BaseModel):
+    """
+    Request schema for evaluating a full grid of interventions for one customer.
+    """
+    customer_id: str
+    discount_levels: List[confloat(ge=0, le=100)] = Field(default=[0, 5, 10, 15, 20, 25, 30], description="Discount percentages (0-100) to evaluate")
+    loyalty_bonus_levels: List[conint(ge=0)] = Field(default=[0, 250, 500, 1000], description="Loyalty point bonuses (>= 0) to evaluate")
+    channels: List[str] = Field(default=["email", "sms", "push", "phone"], description="Outreach channels to evaluate")
+
+class GridPoint(BaseModel):
+    """
+    A single evaluated point of the intervention grid.
+    """
+    planned_discount: float
+    loyalty_points_bonus: int
+    intervention_channel: str
+    new_churn_probability: float
+    churn_reduction_absolute: float
+    intervention_cost: float
+    net_retention_score: float
+
+class SimulationGridResponse(BaseModel):
+    """
+    Response schema for the intervention grid simulation.
+    """
+    customer_id: str
+    baseline_churn_probability: float
+    grid: List[GridPoint]
+    pareto_frontier: List[GridPoint] = Field(..., description="Grid points where churn reduction cannot be improved without higher cost, ordered by cost")
+    best_strategy: GridPoint = Field(..., description="Grid point with the highest net retention score")
+
+class CampaignRequest(BaseModel):
+    """
+    Request schema for a budget-constrained retention campaign.
+    """
+    budget: float = Field(..., gt=0, description="Total campaign budget")
+    interventions: Optional[List[InterventionConfig]] = Field(None, description="Offer menu; defaults to the standard offers")
+    customer_ids: Optional[List[str]] = Field(None, description="Restrict the campaign to these customers (default: whole base)")
+    max_allocations_returned: int = Field(default=100, ge=0, description="How many allocations (highest value first) to include in the response")
+
+class CampaignAllocation(BaseModel):
+    """
+    The offer assigned to a single customer.
+    """
+    customer_id: str
+    intervention: str
+    expected_cost: float
+    expected_value_saved: float
+    baseline_churn_probability: float
+    new_churn_probability: float
+
+class CampaignResponse(BaseModel):
+    """
+    Response schema for the campaign optimizer.
+    """
+    budget: float
+    total_cost: float
+    expected_retained_revenue: float = Field(..., description="Sum of expected value saved over all allocations")
+    customers_considered: int
+    customers_targeted: int
+    intervention_counts: Dict[str, int]
+    allocations: List[CampaignAllocation] = Field(..., description="Top allocations by expected value saved")
+
+class StrategyMatrixRequest(BaseModel):
+    """
+    Request schema for comparing many strategies across a set of customers.
+    """
+    strategies: List[InterventionConfig] = Field(..., min_length=1, max_length=50, description="Candidate strategies to compare")
+    customer_ids: Optional[List[str]] = Field(None, description="Explicit customers to evaluate")
+    segment_filters: Optional[Dict[str, str]] = Field(None, description="Select customers by attribute, e.g. {'primary_category': 'Grocery'}")
+    segment_by: Optional[str] = Field(None, description="Attribute used for per-segment winners (e.g. primary_category, location, risk_band)")
+    max_customers: int = Field(default=5000, gt=0, le=100000, description="Customers sampled when the selection is larger")
+
+class StrategyRanking(BaseModel):
+    """
+    Aggregate performance of one strategy across the evaluated customers.
+    """
+    rank: int
+    name: str
+    mean_net_retention_score: float
+    total_net_retention_score: float
+    mean_new_churn_probability: float
+    mean_churn_reduction: float
+    mean_intervention_cost: float
+    win_rate: float = Field(..., description="Share of customers for which this strategy has the best net score")
+
+class SegmentWinner(BaseModel):
+    """
+    Best strategy for one customer segment.
+    """
+    segment: str
+    customers: int
+    winner: str
+    mean_net_retention_score: float
+
+class StrategyMatrixResponse(BaseModel):
+    """
+    Response schema for the N-way strategy comparison.
+    """
+    customers_evaluated: int
+    mean_baseline_churn_probability: float
+    rankings: List[StrategyRanking]
+    segment_by: Optional[str] = None
+    segment_winners: List[SegmentWinner] = []
+
+class PurchaseEvent(BaseModel):
+    """
+    One purchase, applied to the customer's rolling features by the online feature store.
+    """
+    customer_id: str = Field(..., description="Customer who made the purchase")
+    amount: float = Field(..., ge=0, description="Order value")
+    channel: str = Field("store", description="'online' or 'store'")
+    timestamp: Optional[datetime] = Field(None, description="Purchase time (defaults to now; more than a day ahead is rejected)")
+
+class EventIngestResponse(BaseModel):
+    """
+    Result of ingesting a batch of purchase events.
+    """
+    applied: int
+    rejected: int
+    version: int
@@ -1,5 +1,4 @@
 import pandas as pd
-import sqlite3
 import sys
 import os
 import json
@@ -7,11 +6,13 @@ import json
 # Add the project root to the python path so we can import from ml
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from core import config, db
 from ml.features import prepare_features
 from ml.churn_rules import calculate_churn_probability, get_risk_level, get_confidence_score, generate_recommendations
+from ml.drift import DriftMonitor, load_reference, save_batch_report
 
 DATA_PATH = os.path.join("data", "freshmart_customers_big.csv")
-DB_PATH = os.path.join("data", "churn.db")
+DB_PATH = config.CHURN_DB_PATH
 
 def process_customers():
     print("Starting batch churn prediction job...")
@@ -24,6 +25,17 @@ def process_customers():
         print(f"Error loading data: {e}")
         return
 
+    # Feature drift of this run's input vs. the model's training data (served at /api/churn/drift)
+    reference = load_reference()
+    if reference is not None:
+        monitor = DriftMonitor(reference, source="batch", window_s=float("inf"))
+        monitor.observe_frame(df)
+        report = monitor.report()
+        save_batch_report(report)
+        print(f"Feature drift: {report['status']} (max PSI {report['max_psi']})")
+    else:
+        print("No drift reference saved with the model; skipping the drift check.")
+
     results = []
 
     # 2. Process each customer
@@ -64,29 +76,10 @@ def process_customers():
     
     print(f"Identified top {len(top_risk_df)} at-risk customers.")
 
-    # 4. Store in SQLite
+    # 4. Store in SQLite (one transaction; bumps the version the API caches on)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        # improved schema with proper types
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS at_risk_customers (
-            customer_id TEXT PRIMARY KEY,
-            churn_probability REAL,
-            churn_risk TEXT,
-            factors TEXT,
-            recommendations TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        conn.execute(create_table_sql)
-        
-        # Clear old data? For a daily batch, replacing is likely desired.
-        conn.execute("DELETE FROM at_risk_customers")
-        
-        top_risk_df.to_sql("at_risk_customers", conn, if_exists="append", index=False)
-        conn.commit()
-        conn.close()
-        print(f"Successfully saved results to {DB_PATH}")
+        version = db.replace_at_risk_customers(top_risk_df)
+        print(f"Successfully saved results to {DB_PATH} (data version {version})")
         
     except Exception as e:
         print(f"Error saving to database: {e}")
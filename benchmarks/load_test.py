@@ -0,0 +1,294 @@
+"""
+End-to-end API load test.
+
+Drives /predict, /customers, /analytics, /simulate and /generate-outreach
+with a configurable request mix and concurrency, and reports throughput and
+p50/p95/p99 latency per endpoint. Results are saved as JSON so runs can be
+compared (--compare).
+
+By default the app runs in-process (httpx ASGITransport, no server needed)
+with Groq swapped for genai.llm_stub.StubGroqClient, so the numbers measure
+this service rather than the LLM provider. Against a live server
+(--base-url), start it with LLM_STUB_ENABLED=true to get the same effect.
+
+Usage:
+    python -m benchmarks.load_test --concurrency 16 --requests 500
+    python -m benchmarks.load_test --mix predict=1 --llm-latency-ms 800 --llm-error-rate 0.05
+    python -m benchmarks.load_test --base-url http://localhost:8000 --duration 60
+    python -m benchmarks.load_test --compare benchmarks/results/load_test_20240601_120000.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+API_PREFIX = "/api/churn"
+
+ENDPOINTS = {
+    "predict": ("POST", "/predict"),
+    "customers": ("GET", "/customers"),
+    "analytics": ("GET", "/analytics"),
+    "simulate": ("POST", "/simulate"),
+    "outreach": ("POST", "/generate-outreach"),
+}
+
+DEFAULT_MIX = {"predict": 4, "customers": 3, "analytics": 1, "simulate": 2, "outreach": 1}
+
+FEATURE_FIELDS = [
+    "primary_category", "yearly_purchase_count", "avg_gap_days", "avg_order_value",
+    "days_since_last_purchase", "discount_sensitivity", "online_ratio",
+]
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def parse_mix(text: str) -> dict:
+    """'predict=4,customers=1' -> {'predict': 4.0, 'customers': 1.0}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {list(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _build_request(endpoint: str, customer: dict, rng: random.Random):
+    """(params, json body) for one request against `customer`."""
+    cid = customer["customer_id"]
+    if endpoint == "predict":
+        return None, {"customer_id": cid, **{k: customer[k] for k in FEATURE_FIELDS}}
+    if endpoint == "customers":
+        # Mix of browsing and id lookups, like the dashboard
+        if rng.random() < 0.5:
+            return {"page": rng.randint(1, 20), "limit": 100}, None
+        return {"search": cid}, None
+    if endpoint == "analytics":
+        return None, None
+    if endpoint == "simulate":
+        return None, {
+            "customer_id": cid,
+            "planned_discount": rng.choice([0, 5, 10, 15, 20, 30]),
+            "loyalty_points_bonus": rng.choice([0, 250, 500, 1000]),
+        }
+    return None, {
+        "customer_id": cid,
+        "intervention_type": "Discount",
+        "intervention_details": f"{rng.choice([10, 15, 20])}% off your next order",
+    }
+
+
+async def _load_customers(client: httpx.AsyncClient, sample_size: int) -> list:
+    """Customer feature dicts used to build request payloads (not timed)."""
+    resp = await client.get(f"{API_PREFIX}/customers", params={"limit": sample_size})
+    resp.raise_for_status()
+    customers = []
+    for row in resp.json()["data"]:
+        detail = await client.get(f"{API_PREFIX}/customer/{row['id']}")
+        if detail.status_code == 200:
+            customers.append(detail.json())
+    if not customers:
+        raise RuntimeError("No customers available to build load-test requests")
+    return customers
+
+
+async def run_load_test(
+    client: httpx.AsyncClient,
+    mix: dict = None,
+    concurrency: int = 16,
+    total_requests: int = 500,
+    duration: float = None,
+    sample_size: int = 200,
+    seed: int = 42,
+) -> dict:
+    """
+    Issue requests from `concurrency` concurrent workers until
+    `total_requests` have been sent (or `duration` seconds have passed).
+
+    Returns:
+        dict: Per-endpoint and overall latency / throughput summary.
+    """
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    customers = await _load_customers(client, sample_size)
+    names, weights = list(mix), list(mix.values())
+
+    samples = {name: [] for name in names}
+    statuses = {name: {} for name in names}
+    sent = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        nonlocal sent
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+            elif sent >= total_requests:
+                return
+            sent += 1
+
+            endpoint = rng.choices(names, weights)[0]
+            method, path = ENDPOINTS[endpoint]
+            params, body = _build_request(endpoint, rng.choice(customers), rng)
+
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, API_PREFIX + path, params=params, json=body)
+                status = str(resp.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            samples[endpoint].append(time.perf_counter() - start)
+            statuses[endpoint][status] = statuses[endpoint].get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return summarize(samples, statuses, elapsed)
+
+
+def _latency_stats(latencies: list) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max()),
+    }
+
+
+def summarize(samples: dict, statuses: dict, elapsed: float) -> dict:
+    """Throughput, error rate and latency percentiles per endpoint and overall."""
+    def errors(codes: dict) -> int:
+        return sum(n for code, n in codes.items() if not code.isdigit() or int(code) >= 500)
+
+    endpoints = {}
+    for name, latencies in samples.items():
+        if not latencies:
+            continue
+        endpoints[name] = {
+            "requests": len(latencies),
+            "throughput_rps": len(latencies) / elapsed,
+            "error_rate": errors(statuses[name]) / len(latencies),
+            "status_codes": statuses[name],
+            **_latency_stats(latencies),
+        }
+
+    all_latencies = [t for latencies in samples.values() for t in latencies]
+    total_errors = sum(errors(codes) for codes in statuses.values())
+    overall = {
+        "requests": len(all_latencies),
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(all_latencies) / elapsed if elapsed else 0.0,
+        "error_rate": total_errors / len(all_latencies) if all_latencies else 0.0,
+        **(_latency_stats(all_latencies) if all_latencies else {}),
+    }
+    return {"overall": overall, "endpoints": endpoints}
+
+
+def print_report(result: dict, baseline: dict = None):
+    """Table of the run, with deltas against `baseline` when given."""
+    header = f"{'endpoint':<12}{'reqs':>7}{'rps':>9}{'err%':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'Δp95':>9}{'Δrps':>9}"
+    print(header)
+
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    base_rows = {**baseline["endpoints"], "overall": baseline["overall"]} if baseline else {}
+    for name, r in rows:
+        line = (
+            f"{name:<12}{r['requests']:>7}{r['throughput_rps']:>9.1f}{r['error_rate'] * 100:>7.1f}"
+            f"{r.get('p50_ms', 0):>10.1f}{r.get('p95_ms', 0):>10.1f}{r.get('p99_ms', 0):>10.1f}"
+        )
+        base = base_rows.get(name)
+        if base and base.get("p95_ms") and base.get("throughput_rps"):
+            line += f"{(r['p95_ms'] / base['p95_ms'] - 1) * 100:>+8.0f}%"
+            line += f"{(r['throughput_rps'] / base['throughput_rps'] - 1) * 100:>+8.0f}%"
+        print(line)
+
+
+def _in_process_client(stub) -> httpx.AsyncClient:
+    from api.lifecycle import initialize
+    from api.main import app
+    from api.routes.churn import explanation_engine
+
+    # ASGITransport does not run the lifespan: initialise and warm up here
+    initialize()
+    explanation_engine.client = stub
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=120)
+
+
+async def main(args) -> dict:
+    stub = None
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=120)
+    else:
+        from genai.llm_stub import StubGroqClient
+        stub = StubGroqClient(args.llm_latency_ms, args.llm_error_rate)
+        client = _in_process_client(stub)
+
+    async with client:
+        if args.warmup:
+            await run_load_test(client, args.mix, args.concurrency, args.warmup, sample_size=args.sample_size)
+        result = await run_load_test(
+            client, args.mix, args.concurrency, args.requests, args.duration, args.sample_size, args.seed
+        )
+
+    result["config"] = {
+        "target": args.base_url or "in-process",
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "duration": args.duration,
+        # LLM failures are absorbed by the engine's fallbacks, so they show up here, not as HTTP errors
+        "llm_stub": None if stub is None else {
+            "latency_ms": stub.latency_ms,
+            "error_rate": stub.error_rate,
+            "calls": stub.calls,
+            "errors": stub.errors,
+        },
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the churn API.")
+    parser.add_argument("--base-url", default=None, help="Live server URL (default: run the app in-process)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. predict=4,customers=3,analytics=1")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests before measuring")
+    parser.add_argument("--sample-size", type=int, default=200, help="Customers used to build payloads")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Stub LLM latency (in-process only)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Stub LLM error rate (in-process only)")
+    parser.add_argument("--output", default=None, help="Results JSON (default: benchmarks/results/load_test_<time>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print()
+    print_report(result, baseline)
+    print(f"\nResults saved to {output}")
@@ -0,0 +1,236 @@
+"""
+Microbenchmarks for the ML and feature hot paths.
+
+Covers prepare_features, calculate_churn_probability, single-row and batch
+model scoring, SHAP explanations, competitor-gap lookup and the customer
+lookup / search handlers. Each benchmark is timed timeit-style: the loop
+count is calibrated to ~0.2s, then repeated, and the median per-call time
+is kept (per-row as well for batch benchmarks).
+
+`run` saves results as JSON; `compare` checks a run against the stored
+baseline (benchmarks/microbench_baseline.json) and exits non-zero when a
+benchmark got slower than the threshold allows.
+
+Usage:
+    python -m benchmarks.microbench run --output benchmarks/results/microbench.json
+    python -m benchmarks.microbench run --save-baseline
+    python -m benchmarks.microbench compare --threshold 0.15
+    python -m benchmarks.microbench compare --current benchmarks/results/microbench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BASELINE_PATH = os.path.join("benchmarks", "microbench_baseline.json")
+BATCH_SIZES = [1, 10, 100, 1000]
+TARGET_SECONDS = 0.2
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.15
+
+SAMPLE_CUSTOMER = {
+    "customer_id": "FM_CUST_000001",
+    "primary_category": "Grocery",
+    "yearly_purchase_count": 12,
+    "avg_gap_days": 30,
+    "avg_order_value": 850.0,
+    "days_since_last_purchase": 75,
+    "discount_sensitivity": "High",
+    "online_ratio": 0.4,
+}
+
+
+def _run_coroutine(coro):
+    """Drive an async handler that never awaits I/O to completion, without an event loop."""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("Handler awaited; cannot run it synchronously")
+
+
+def _customer_rows(n: int) -> list:
+    """n customer feature dicts from the live snapshot (or the sample customer)."""
+    from api.routes.churn import CUSTOMER_DF
+
+    if CUSTOMER_DF.empty:
+        return [dict(SAMPLE_CUSTOMER) for _ in range(n)]
+    rows = CUSTOMER_DF.head(n).reset_index().to_dict("records")
+    return (rows * (n // len(rows) + 1))[:n]
+
+
+def build_benchmarks() -> list:
+    """
+    (name, rows per call, callable) for every benchmark.
+    Imports happen here so the (slow) module loading is not timed.
+    """
+    from api.lifecycle import initialize
+    from ml.features import prepare_features
+    from ml.churn_rules import calculate_churn_probability
+    from ml.inference import churn_model_service
+    from ml.explain import explain_churn_decision
+
+    # Reference data and model, as loaded at API startup (no warmup: time_callable warms each benchmark)
+    initialize(warm=False)
+    from api.routes.churn import CUSTOMER_DF, get_competitor_gap, get_customer_details, get_customers
+
+    customer = dict(SAMPLE_CUSTOMER)
+    customer_id = CUSTOMER_DF.index[len(CUSTOMER_DF) // 2] if not CUSTOMER_DF.empty else customer["customer_id"]
+
+    benches = [
+        ("prepare_features", 1, lambda: prepare_features(customer)),
+        ("calculate_churn_probability", 1, lambda: calculate_churn_probability(customer)),
+        ("predict_churn_probability", 1, lambda: churn_model_service.predict_churn_probability(customer)),
+    ]
+    for size in BATCH_SIZES:
+        rows = _customer_rows(size)
+        benches.append((f"predict_churn_batch[{size}]", size, lambda rows=rows: churn_model_service.predict_churn_batch(rows)))
+    benches += [
+        ("explain_churn_decision", 1, lambda: explain_churn_decision(customer, 0.6)),
+        ("get_competitor_gap", 1, lambda: get_competitor_gap(customer["primary_category"])),
+        ("customer_lookup", 1, lambda: _run_coroutine(get_customer_details(customer_id))),
+        ("customer_search_exact", 1, lambda: _run_coroutine(get_customers(search=customer_id))),
+        ("customer_list_page", 100, lambda: _run_coroutine(get_customers(page=5, limit=100))),
+    ]
+    return benches
+
+
+def time_callable(fn, repeat: int = DEFAULT_REPEAT, target_seconds: float = TARGET_SECONDS) -> dict:
+    """Median / min seconds per call over `repeat` calibrated loops."""
+    fn()  # warm up caches and lazy initialisation
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target_seconds or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < target_seconds / 10 else 2
+
+    per_call = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - start) / loops)
+
+    return {"median_s": statistics.median(per_call), "min_s": min(per_call), "loops": loops, "repeat": repeat}
+
+
+def run_benchmarks(name_filter: str = None, repeat: int = DEFAULT_REPEAT) -> dict:
+    """Run every (matching) benchmark and return the results document."""
+    import numpy as np
+    import pandas as pd
+    import sklearn
+
+    results = {}
+    for name, rows, fn in build_benchmarks():
+        if name_filter and name_filter not in name:
+            continue
+        stats = time_callable(fn, repeat)
+        stats["rows"] = rows
+        stats["median_us_per_row"] = stats["median_s"] / rows * 1e6
+        results[name] = stats
+        print(f"{name:<32}{stats['median_s'] * 1e3:>12.4f} ms/call{stats['median_us_per_row']:>12.2f} us/row")
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Per-benchmark comparison rows; `regression` is set when the current
+    median is more than `threshold` (fraction) slower than the baseline.
+    """
+    rows = []
+    for name, cur in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            rows.append({"name": name, "baseline_s": None, "current_s": cur["median_s"], "change": None, "regression": False})
+            continue
+        change = cur["median_s"] / base["median_s"] - 1
+        rows.append({
+            "name": name,
+            "baseline_s": base["median_s"],
+            "current_s": cur["median_s"],
+            "change": change,
+            "regression": change > threshold,
+        })
+    return rows
+
+
+def _save(doc: dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2)
+    print(f"\nResults saved to {path}")
+
+
+if __name__ == "__main__":
+    # Keep model/data loading chatter (and per-call error logs on fallback
+    # paths) out of the benchmark table
+    logging.basicConfig(level=logging.CRITICAL)
+
+    parser = argparse.ArgumentParser(description="ML / feature hot-path microbenchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Run the benchmarks")
+    p_run.add_argument("--filter", default=None, help="Only benchmarks whose name contains this")
+    p_run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    p_run.add_argument("--output", default=None, help="Results JSON")
+    p_run.add_argument("--save-baseline", action="store_true", help=f"Also overwrite {BASELINE_PATH}")
+
+    p_cmp = sub.add_parser("compare", help="Compare against the baseline and flag regressions")
+    p_cmp.add_argument("--baseline", default=BASELINE_PATH)
+    p_cmp.add_argument("--current", default=None, help="Results JSON to compare (default: run now)")
+    p_cmp.add_argument("--filter", default=None)
+    p_cmp.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    p_cmp.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.15 = 15%%)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        doc = run_benchmarks(args.filter, args.repeat)
+        if args.output:
+            _save(doc, args.output)
+        if args.save_baseline:
+            _save(doc, BASELINE_PATH)
+    else:
+        with open(args.baseline) as f:
+            baseline_doc = json.load(f)
+        if args.current:
+            with open(args.current) as f:
+                current_doc = json.load(f)
+        else:
+            current_doc = run_benchmarks(args.filter, args.repeat)
+
+        rows = compare_results(baseline_doc, current_doc, args.threshold)
+        print(f"\n{'benchmark':<32}{'baseline ms':>14}{'current ms':>14}{'change':>10}")
+        for r in rows:
+            base_ms = f"{r['baseline_s'] * 1e3:.4f}" if r["baseline_s"] is not None else "-"
+            change = f"{r['change'] * 100:+.1f}%" if r["change"] is not None else "new"
+            flag = "  REGRESSION" if r["regression"] else ""
+            print(f"{r['name']:<32}{base_ms:>14}{r['current_s'] * 1e3:>14.4f}{change:>10}{flag}")
+
+        regressions = [r["name"] for r in rows if r["regression"]]
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) past {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✅ No regressions past {args.threshold:.0%}")
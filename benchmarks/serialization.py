@@ -0,0 +1,138 @@
+"""
+Bytes and CPU per response for the large API payloads, before and after the
+fast response path (api/responses.py).
+
+"before" is what FastAPI did by default: jsonable_encoder + the stdlib
+JSONResponse encoder (and, for /predict, ChurnPredictionResponse
+validation). "after" is FastJSONResponse (orjson). Compressed sizes and
+compression CPU are reported for gzip and, when installed, brotli.
+
+Usage:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --output benchmarks/results/serialization.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+
+def _cpu_us(fn, min_seconds: float = 0.2) -> float:
+    """CPU microseconds per call (process time, so waits don't count)."""
+    fn()
+    loops = 1
+    while True:
+        start = time.process_time()
+        for _ in range(loops):
+            fn()
+        elapsed = time.process_time() - start
+        if elapsed >= min_seconds or loops >= 100_000:
+            return elapsed / loops * 1e6
+        loops *= 4
+
+
+def build_payloads() -> dict:
+    """name -> (payload, response model or None), from the real handlers."""
+    import orjson
+    from api.lifecycle import initialize
+    from api.routes import churn
+    from api.schemas import ChurnPredictionResponse
+    from benchmarks.microbench import _run_coroutine
+
+    initialize(warm=False)
+
+    def handler_json(coro):
+        return orjson.loads(_run_coroutine(coro).body)
+
+    payloads = {
+        "customers[100]": (handler_json(churn.get_customers(page=1, limit=100)), None),
+        "customers[1000]": (handler_json(churn.get_customers(page=1, limit=1000)), None),
+        "top_risk[100]": (handler_json(churn.get_top_risk_customers()), None),
+        "predict": ({
+            "customer_id": "FM_CUST_000001",
+            "churn_probability": 0.7312,
+            "churn_risk": "High",
+            "confidence_score": 0.85,
+            "recommendations": ["Send a personalized discount", "Offer bonus loyalty points", "Follow up by email"],
+            "explanation_summary": "Purchase frequency dropped sharply while a competitor is 14% cheaper in Dairy.",
+            "key_factors": ["High days since last purchase", "Competitor price gap"],
+        }, ChurnPredictionResponse),
+    }
+    # NumPy output as returned by the model (orjson serializes it directly)
+    probs = np.random.default_rng(0).random(1000)
+    payloads["probabilities[1000]"] = ({"churn_probability": probs}, None)
+    return payloads
+
+
+def measure(name: str, payload, response_model=None) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from api.responses import FastJSONResponse, brotli, compress
+
+    if response_model is not None:
+        def before():
+            return JSONResponse(jsonable_encoder(response_model(**payload))).body
+    else:
+        def before():
+            return JSONResponse(jsonable_encoder(payload)).body
+
+    def after():
+        return FastJSONResponse(payload).body
+
+    try:
+        before_body = before()
+        before_bytes, before_us = len(before_body), _cpu_us(before)
+    except (TypeError, ValueError):
+        # The stdlib path can't encode raw NumPy arrays at all
+        before_bytes, before_us = None, None
+
+    body = after()
+    row = {
+        "payload": name,
+        "before_bytes": before_bytes,
+        "before_cpu_us": before_us,
+        "after_bytes": len(body),
+        "after_cpu_us": _cpu_us(after),
+    }
+    for encoding in ("gzip", "br"):
+        if encoding == "br" and brotli is None:
+            continue
+        row[f"{encoding}_bytes"] = len(compress(body, encoding))
+        row[f"{encoding}_cpu_us"] = _cpu_us(lambda: compress(body, encoding))
+    return row
+
+
+def _cell(value, width: int, decimals: int = None) -> str:
+    if value is None:
+        return "-".rjust(width)
+    return f"{value:>{width}.{decimals}f}" if decimals is not None else f"{value:>{width}}"
+
+
+if __name__ == "__main__":
+    import logging
+
+    parser = argparse.ArgumentParser(description="Response serialization / compression benchmark.")
+    parser.add_argument("--output", default=None, help="Results JSON")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rows = [measure(name, payload, model) for name, (payload, model) in build_payloads().items()]
+
+    print(f"{'payload':<22}{'before B':>10}{'before us':>11}{'after B':>10}{'after us':>10}{'gzip B':>9}{'gzip us':>9}{'br B':>9}{'br us':>8}")
+    for r in rows:
+        print(
+            f"{r['payload']:<22}{_cell(r['before_bytes'], 10)}{_cell(r['before_cpu_us'], 11, 1)}"
+            f"{_cell(r['after_bytes'], 10)}{_cell(r['after_cpu_us'], 10, 1)}"
+            f"{_cell(r['gzip_bytes'], 9)}{_cell(r['gzip_cpu_us'], 9, 1)}"
+            f"{_cell(r.get('br_bytes'), 9)}{_cell(r.get('br_cpu_us'), 8, 1)}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults saved to {args.output}")
@@ -0,0 +1,136 @@
+"""
+Per-request tracing overhead at each tracing setting.
+
+Each setting runs in its own subprocess (the global tracer provider can only
+be installed once per process) against a minimal instrumented FastAPI app
+whose handler opens the same nested spans as /predict but does no real
+work, so the difference from the "disabled" row is the tracing cost.
+Exported spans go to an in-memory counting exporter (or to /dev/null for
+the console setting), so no collector is needed.
+
+Usage:
+    python -m benchmarks.tracing_overhead --requests 3000
+    python -m benchmarks.tracing_overhead --output benchmarks/results/tracing_overhead.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+# name -> build_tracer_provider overrides (None = tracing not installed)
+SETTINGS = {
+    "disabled": None,
+    "ratio_1.0_console": {"sample_ratio": 1.0, "exporter": "console"},
+    "ratio_1.0": {"sample_ratio": 1.0},
+    "ratio_0.1_keep_errors_slow": {"sample_ratio": 0.1, "keep_errors": True, "slow_ms": 1000},
+    "ratio_0.1": {"sample_ratio": 0.1, "keep_errors": False, "slow_ms": 0},
+    "ratio_0.0": {"sample_ratio": 0.0, "keep_errors": False, "slow_ms": 0},
+}
+
+
+def _run_worker(setting: str, requests: int) -> dict:
+    """Measure mean request latency under one setting (runs in a subprocess)."""
+    import httpx
+    from fastapi import FastAPI
+    from opentelemetry import trace
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SpanExporter, SpanExportResult
+
+    class CountingExporter(SpanExporter):
+        def __init__(self):
+            self.spans = 0
+
+        def export(self, spans):
+            self.spans += len(spans)
+            return SpanExportResult.SUCCESS
+
+    options = SETTINGS[setting]
+    exporter = None
+    provider = None
+    if options is not None:
+        from core.tracing import setup_tracing
+
+        options = dict(options)
+        if options.pop("exporter", None) == "console":
+            exporter = ConsoleSpanExporter(out=open(os.devnull, "w"))
+        else:
+            exporter = CountingExporter()
+        provider = setup_tracing(exporters=[exporter], route_ratios={}, **options)
+
+    tracer = trace.get_tracer(__name__)
+    app = FastAPI()
+
+    @app.post("/api/churn/predict")
+    async def predict():
+        with tracer.start_as_current_span("predict_churn") as span:
+            span.set_attribute("customer_id", "FM_CUST_000001")
+            with tracer.start_as_current_span("preprocessing"):
+                pass
+            with tracer.start_as_current_span("response_generation"):
+                pass
+        return {"churn_probability": 0.5}
+
+    FastAPIInstrumentor.instrument_app(app)
+
+    async def drive(n: int) -> float:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(min(200, n)):
+                await client.post("/api/churn/predict")
+            start = time.perf_counter()
+            for _ in range(n):
+                await client.post("/api/churn/predict")
+            return time.perf_counter() - start
+
+    elapsed = asyncio.run(drive(requests))
+    if provider is not None:
+        provider.force_flush()
+    return {
+        "setting": setting,
+        "requests": requests,
+        "us_per_request": elapsed / requests * 1e6,
+        "exported_spans": getattr(exporter, "spans", None),
+    }
+
+
+def run_all(requests: int) -> list:
+    results = []
+    for setting in SETTINGS:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.tracing_overhead", "--worker", setting, "--requests", str(requests)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    base = results[0]["us_per_request"]
+    for r in results:
+        r["overhead_us"] = r["us_per_request"] - base
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-request tracing overhead.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--output", default=None, help="Results JSON")
+    parser.add_argument("--worker", default=None, choices=list(SETTINGS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_run_worker(args.worker, args.requests)))
+        sys.exit(0)
+
+    rows = run_all(args.requests)
+    print(f"{'setting':<30}{'us/request':>12}{'overhead us':>13}{'exported spans':>16}")
+    for r in rows:
+        spans = r["exported_spans"] if r["exported_spans"] is not None else "-"
+        print(f"{r['setting']:<30}{r['us_per_request']:>12.1f}{r['overhead_us']:>13.1f}{spans:>16}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults saved to {args.output}")
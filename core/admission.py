@@ -0,0 +1,139 @@
+"""
+Admission control and graceful degradation for /predict.
+
+Each request is admitted at a service level chosen from the current load:
+
+    0 full         model + SHAP + LLM narrative
+    1 no_llm       rule-based narrative/recommendations instead of the LLM
+    2 no_shap      also skip SHAP
+    3 precomputed  no model call: recent / batch-precomputed score, or the
+                   rule-based score when neither exists
+    4 rejected     503 with Retry-After
+
+The level is floor(pressure), where pressure is the larger of
+- inference pool queue depth / ADMISSION_QUEUE_DEPTH, and
+- the EWMA of recent model + SHAP compute latency (including the wait for
+  a pool worker) / ADMISSION_LATENCY_TARGET_MS.
+
+The LLM call is not part of that signal: a slow LLM says nothing about
+model or SHAP capacity. Its latency has its own EWMA, and while that is at
+or above ADMISSION_LLM_LATENCY_TARGET_MS requests are served at least at
+no_llm, never lower because of it. Requests that skip the LLM count as
+instant LLM calls, so it is retried once the EWMA decays.
+
+Because the latency EWMA also sees the (fast) degraded and rejected
+requests, the level relaxes on its own once the backlog drains. The applied level is returned
+in the response (`service_level`) and counted in
+admission_decisions_total{level}.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from core import config
+from core.inference_pool import queue_depth
+from observability.metrics import ADMISSION_DECISIONS, ADMISSION_LEVEL, ADMISSION_PRESSURE
+
+FULL, NO_LLM, NO_SHAP, PRECOMPUTED, REJECTED = range(5)
+LEVEL_NAMES = ("full", "no_llm", "no_shap", "precomputed", "rejected")
+
+
+class AdmissionController:
+    """Maps queue depth and recent latency to a service level."""
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        queue_depth_step: float = None,
+        latency_target_s: float = None,
+        llm_latency_target_s: float = None,
+        ewma_alpha: float = 0.2,
+    ):
+        self.enabled = config.ADMISSION_ENABLED if enabled is None else enabled
+        self.queue_depth_step = config.ADMISSION_QUEUE_DEPTH if queue_depth_step is None else queue_depth_step
+        self.latency_target_s = (
+            config.ADMISSION_LATENCY_TARGET_MS / 1000 if latency_target_s is None else latency_target_s
+        )
+        self.llm_latency_target_s = (
+            config.ADMISSION_LLM_LATENCY_TARGET_MS / 1000 if llm_latency_target_s is None else llm_latency_target_s
+        )
+        self.ewma_alpha = ewma_alpha
+        self.latency_ewma_s = 0.0
+        self.llm_latency_ewma_s = 0.0
+        self._lock = threading.Lock()
+
+    def pressure(self) -> float:
+        return max(queue_depth() / self.queue_depth_step, self.latency_ewma_s / self.latency_target_s)
+
+    def level(self) -> int:
+        """Service level for the current load (not counted in the metrics)."""
+        if not self.enabled:
+            return FULL
+        level = min(int(self.pressure()), REJECTED)
+        if level == FULL and self.llm_latency_ewma_s >= self.llm_latency_target_s:
+            level = NO_LLM
+        return level
+
+    def admit(self) -> int:
+        """Service level for a new request (counted in the metrics)."""
+        if self.enabled:
+            ADMISSION_PRESSURE.set(self.pressure())
+        level = self.level()
+        if level == NO_LLM and self.llm_latency_ewma_s >= self.llm_latency_target_s:
+            # Skipped LLM calls count as instant so the LLM gets probed again
+            self.observe_llm(0.0)
+        ADMISSION_LEVEL.set(level)
+        ADMISSION_DECISIONS.labels(level=LEVEL_NAMES[level]).inc()
+        return level
+
+    def observe(self, seconds: float):
+        """Feed the model + SHAP compute latency of a finished request."""
+        with self._lock:
+            self.latency_ewma_s += self.ewma_alpha * (seconds - self.latency_ewma_s)
+
+    def observe_llm(self, seconds: float):
+        """Feed the latency of a finished LLM explanation call."""
+        with self._lock:
+            self.llm_latency_ewma_s += self.ewma_alpha * (seconds - self.llm_latency_ewma_s)
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "level": LEVEL_NAMES[self.level()],
+            "pressure": round(self.pressure(), 3),
+            "queue_depth": queue_depth(),
+            "latency_ewma_ms": round(self.latency_ewma_s * 1000, 1),
+            "queue_depth_step": self.queue_depth_step,
+            "latency_target_ms": self.latency_target_s * 1000,
+            "llm_latency_ewma_ms": round(self.llm_latency_ewma_s * 1000, 1),
+            "llm_latency_target_ms": self.llm_latency_target_s * 1000,
+        }
+
+
+class RecentScores:
+    """Last computed prediction per customer, served at the precomputed level."""
+
+    def __init__(self, max_entries: int, max_age_s: float):
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, customer_id: str, prediction: dict):
+        with self._lock:
+            self._entries[customer_id] = (time.monotonic(), prediction)
+            self._entries.move_to_end(customer_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, customer_id: str):
+        with self._lock:
+            entry = self._entries.get(customer_id)
+        if entry is None or time.monotonic() - entry[0] > self.max_age_s:
+            return None
+        return entry[1]
+
+
+admission = AdmissionController()
+recent_scores = RecentScores(config.ADMISSION_RECENT_SCORES, config.ADMISSION_RECENT_MAX_AGE_S)
@@ -2,8 +2,190 @@
 Application-level configuration.
 """
 
+import os
+
 APP_NAME = "FreshMart Customer Retention API"
 APP_VERSION = "1.0.0"
 
 # Target percentage for customer retention (example metric)
 RETENTION_TARGET_PERCENTAGE = 85.0
+
+# --------------------------------------------------
+# Cascade inference (ml/cascade.py)
+# --------------------------------------------------
+# When enabled, a cheap first-tier score decides clear-cut customers and only
+# customers inside the uncertainty band reach the Random Forest and SHAP.
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+
+# First tier: "distilled" (tiny tree distilled from the forest, falls back to
+# rules if the artifact is missing) or "rules" (ml.churn_rules)
+CASCADE_TIER1 = os.getenv("CASCADE_TIER1", "distilled")
+CASCADE_TIER1_PATH = os.getenv("CASCADE_TIER1_PATH", "ml/churn_cascade_tier1.pkl")
+
+# Uncertainty band: first-tier scores in [LOWER, UPPER] go to the full model
+CASCADE_LOWER = float(os.getenv("CASCADE_LOWER", "0.2"))
+CASCADE_UPPER = float(os.getenv("CASCADE_UPPER", "0.8"))
+
+# Fraction of first-tier decisions also scored by the full model to track agreement
+CASCADE_SHADOW_RATE = float(os.getenv("CASCADE_SHADOW_RATE", "0.05"))
+
+# --------------------------------------------------
+# LLM stub (genai/llm_stub.py)
+# --------------------------------------------------
+# Replaces the Groq client with an in-process stub so load tests measure the
+# service, not the LLM provider. Latency is the mean simulated call time.
+LLM_STUB_ENABLED = os.getenv("LLM_STUB_ENABLED", "false").lower() == "true"
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "300"))
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0.0"))
+
+# --------------------------------------------------
+# Inference pool (core/inference_pool.py)
+# --------------------------------------------------
+# Worker threads for blocking model / SHAP / LLM calls made from async handlers
+INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "8"))
+
+# --------------------------------------------------
+# Tracing (core/tracing.py)
+# --------------------------------------------------
+# Fraction of requests traced, plus per-route-prefix overrides, e.g.
+# "/api/churn/health=0,/api/churn/predict=0.25". 10% (with error/slow keeping
+# below) costs a fraction of full sampling (benchmarks/tracing_overhead.py)
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "0.1"))
+TRACING_ROUTE_SAMPLE_RATIOS = os.getenv("TRACING_ROUTE_SAMPLE_RATIOS", "")
+
+# Always export traces of failed or slow requests, even when not sampled
+TRACING_KEEP_ERRORS = os.getenv("TRACING_KEEP_ERRORS", "true").lower() == "true"
+TRACING_SLOW_MS = float(os.getenv("TRACING_SLOW_MS", "1000"))
+
+# Print every exported span to stdout (local debugging only)
+TRACING_CONSOLE = os.getenv("TRACING_CONSOLE", "false").lower() == "true"
+
+# --------------------------------------------------
+# Admin endpoints & profiler (api/routes/admin.py, observability/profiler.py)
+# --------------------------------------------------
+# /admin requires the X-Admin-Token header and the X-Profile request header
+# must carry this token to trigger profiling. With no token, /admin returns 403
+# and X-Profile is ignored, unless ADMIN_OPEN=true (local development only)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMIN_OPEN = os.getenv("ADMIN_OPEN", "false").lower() == "true"
+
+# Sampling interval while a request is being profiled
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+# Low-rate always-on sampling that aggregates hot stacks over time
+PROFILER_CONTINUOUS = os.getenv("PROFILER_CONTINUOUS", "false").lower() == "true"
+PROFILER_CONTINUOUS_HZ = float(os.getenv("PROFILER_CONTINUOUS_HZ", "10"))
+# Request profiles kept in memory (oldest dropped first)
+PROFILER_MAX_PROFILES = int(os.getenv("PROFILER_MAX_PROFILES", "50"))
+
+# --------------------------------------------------
+# Logging (observability/logs.py)
+# --------------------------------------------------
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "json" (one object per line) or "text"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Records buffered for the writer thread; further records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of requests whose sub-WARNING logs are kept, per route prefix,
+# e.g. "/api/churn/customers=0.01,/api/churn/health=0"
+LOG_ROUTE_SAMPLE_RATIOS = os.getenv("LOG_ROUTE_SAMPLE_RATIOS", "/api/churn/customers=0.05")
+
+# --------------------------------------------------
+# Startup warmup (api/lifecycle.py)
+# --------------------------------------------------
+# Prime the model, SHAP explainer and lookups before /ready reports ready
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Synthetic customers pushed through each stage during warmup
+WARMUP_REQUESTS = int(os.getenv("WARMUP_REQUESTS", "16"))
+
+# --------------------------------------------------
+# Prediction database (core/db.py)
+# --------------------------------------------------
+# Written by batch/process_churn.py, read by the API
+CHURN_DB_PATH = os.getenv("CHURN_DB_PATH", os.path.join("data", "churn.db"))
+# Event-driven rescoring results (core/rescoring.py), written by the API itself;
+# kept out of CHURN_DB_PATH so a running server never modifies the batch database
+SCORES_DB_PATH = os.getenv("SCORES_DB_PATH", os.path.join("data", "scores.db"))
+# Prepared statements kept per reader connection
+DB_STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "64"))
+# Query results kept in memory (invalidated when the batch job bumps the version)
+DB_RESULT_CACHE_SIZE = int(os.getenv("DB_RESULT_CACHE_SIZE", "256"))
+
+# --------------------------------------------------
+# HTTP response cache (api/caching.py)
+# --------------------------------------------------
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+# GET path prefixes whose 200 responses are cached
+RESPONSE_CACHE_ROUTES = os.getenv(
+    "RESPONSE_CACHE_ROUTES",
+    "/api/churn/analytics,/api/churn/top-risk,/api/churn/customers,/api/churn/customer/"
+)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+# Live feature updates and event-driven rescores reach cached aggregate responses
+# (/analytics, /top-risk, /customers) at most this often; per-customer responses
+# see feature updates immediately
+RESPONSE_CACHE_FEATURE_REFRESH_S = float(os.getenv("RESPONSE_CACHE_FEATURE_REFRESH_S", "30"))
+
+# --------------------------------------------------
+# Response compression (api/responses.py)
+# --------------------------------------------------
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Used only when the optional `brotli` package is installed
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# --------------------------------------------------
+# Request coalescing (core/singleflight.py)
+# --------------------------------------------------
+# Concurrent /predict calls with identical features share one computation
+PREDICT_COALESCING_ENABLED = os.getenv("PREDICT_COALESCING_ENABLED", "true").lower() == "true"
+
+# --------------------------------------------------
+# Admission control / load shedding (core/admission.py)
+# --------------------------------------------------
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Each multiple of this inference-pool queue depth degrades one level
+ADMISSION_QUEUE_DEPTH = float(os.getenv("ADMISSION_QUEUE_DEPTH", "16"))
+# Each multiple of this model + SHAP latency (EWMA, excluding the LLM) degrades one level
+ADMISSION_LATENCY_TARGET_MS = float(os.getenv("ADMISSION_LATENCY_TARGET_MS", "2000"))
+# LLM latency (EWMA) at or above this serves requests without the LLM narrative
+ADMISSION_LLM_LATENCY_TARGET_MS = float(os.getenv("ADMISSION_LLM_LATENCY_TARGET_MS", "8000"))
+# Retry-After sent with 503 when requests are rejected
+ADMISSION_RETRY_AFTER_S = int(os.getenv("ADMISSION_RETRY_AFTER_S", "5"))
+# Recent predictions kept for the precomputed level
+ADMISSION_RECENT_SCORES = int(os.getenv("ADMISSION_RECENT_SCORES", "10000"))
+ADMISSION_RECENT_MAX_AGE_S = float(os.getenv("ADMISSION_RECENT_MAX_AGE_S", "3600"))
+
+# --------------------------------------------------
+# Online feature store (core/feature_store.py)
+# --------------------------------------------------
+FEATURE_CHECKPOINT_PATH = os.getenv("FEATURE_CHECKPOINT_PATH", "data/feature_store.json")
+FEATURE_CHECKPOINT_INTERVAL_S = float(os.getenv("FEATURE_CHECKPOINT_INTERVAL_S", "60"))
+# Weight of the newest inter-purchase gap in avg_gap_days
+FEATURE_GAP_EWMA_ALPHA = float(os.getenv("FEATURE_GAP_EWMA_ALPHA", "0.2"))
+# JSON-lines purchase event file to tail (empty = only the /events endpoint)
+FEATURE_EVENTS_FILE = os.getenv("FEATURE_EVENTS_FILE", "")
+FEATURE_TAIL_INTERVAL_S = float(os.getenv("FEATURE_TAIL_INTERVAL_S", "1.0"))
+
+# --------------------------------------------------
+# Event-driven rescoring and alerts (core/rescoring.py)
+# --------------------------------------------------
+RESCORING_ENABLED = os.getenv("RESCORING_ENABLED", "true").lower() == "true"
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "256"))
+# Longest a changed customer waits for its micro-batch to fill
+RESCORE_MAX_WAIT_MS = float(os.getenv("RESCORE_MAX_WAIT_MS", "200"))
+# Alerts kept for Last-Event-ID replay, and per SSE client before it drops alerts
+ALERTS_BUFFER = int(os.getenv("ALERTS_BUFFER", "1000"))
+ALERTS_SUBSCRIBER_QUEUE = int(os.getenv("ALERTS_SUBSCRIBER_QUEUE", "100"))
+ALERTS_HEARTBEAT_S = float(os.getenv("ALERTS_HEARTBEAT_S", "15"))
+
+# --------------------------------------------------
+# Feature drift monitoring (ml/drift.py)
+# --------------------------------------------------
+DRIFT_ENABLED = os.getenv("DRIFT_ENABLED", "true").lower() == "true"
+# Online counts rotate every window; reports cover the last one to two windows
+DRIFT_WINDOW_S = float(os.getenv("DRIFT_WINDOW_S", "3600"))
+# Features with fewer live observations are reported without PSI/KS
+DRIFT_MIN_OBSERVATIONS = int(os.getenv("DRIFT_MIN_OBSERVATIONS", "200"))
+DRIFT_BATCH_REPORT_PATH = os.getenv("DRIFT_BATCH_REPORT_PATH", "data/drift_batch.json")
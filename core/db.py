@@ -0,0 +1,320 @@
+"""
+Shared SQLite access for the prediction tables: the batch job writes them,
+the API reads them.
+
+- One configured database for the batch results (CHURN_DB_PATH, default
+  data/churn.db), written only by the batch job.
+- The writer switches the database to WAL mode, so API reads never block
+  on (or block) a batch write, and bumps `PRAGMA user_version` in the same
+  transaction as every data change.
+- Readers use one read-only connection per thread (opened on first use),
+  and sqlite3's per-connection prepared statement cache for the fixed
+  queries below.
+- Query results are cached in memory and tagged with the user_version
+  they were read at; a cached result is served only while the version is
+  unchanged, so a finished batch run invalidates everything at once.
+- `customer_scores` holds the latest event-driven rescoring per customer
+  (core/rescoring.py). The API upserts it in small batches all day, so it
+  lives in its own database (SCORES_DB_PATH, default data/scores.db) and
+  isn't behind the result cache. Every upsert bumps that database's own
+  `user_version` (`scores_version()`), which the HTTP response cache keys on.
+
+Usage:
+    from core import db
+    db.replace_at_risk_customers(top_risk_df)   # batch job
+    db.get_top_risk_customers(limit=100)        # API
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from core import config
+from observability.metrics import CACHE_REQUESTS
+
+AT_RISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS at_risk_customers (
+    customer_id TEXT PRIMARY KEY,
+    churn_probability REAL,
+    churn_risk TEXT,
+    factors TEXT,
+    recommendations TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+CUSTOMER_SCORES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customer_scores (
+    customer_id TEXT PRIMARY KEY,
+    churn_probability REAL,
+    churn_risk TEXT,
+    model_version INTEGER,
+    scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+AT_RISK_COLUMNS = ("customer_id", "churn_probability", "churn_risk", "factors", "recommendations")
+
+CUSTOMER_SCORE_SQL = """
+SELECT churn_probability, churn_risk, factors, recommendations
+FROM at_risk_customers
+WHERE customer_id = ?
+"""
+
+TOP_RISK_SQL = """
+SELECT customer_id, churn_probability, churn_risk, factors, recommendations
+FROM at_risk_customers
+ORDER BY churn_probability DESC
+LIMIT ?
+"""
+
+
+def db_path() -> str:
+    return config.CHURN_DB_PATH
+
+
+def scores_db_path() -> str:
+    return config.SCORES_DB_PATH
+
+
+# --------------------------------------------------
+# Writer (batch jobs)
+# --------------------------------------------------
+def _connect_wal(path: str, schema: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(schema)
+    return conn
+
+
+def connect_writer(path: str = None) -> sqlite3.Connection:
+    """Read-write connection in WAL mode with the prediction schema in place."""
+    return _connect_wal(path or db_path(), AT_RISK_SCHEMA)
+
+
+def connect_scores_writer(path: str = None) -> sqlite3.Connection:
+    """Read-write connection to the rescoring database (SCORES_DB_PATH)."""
+    return _connect_wal(path or scores_db_path(), CUSTOMER_SCORES_SCHEMA)
+
+
+def _bump_version(conn: sqlite3.Connection) -> int:
+    version = conn.execute("PRAGMA user_version").fetchone()[0] + 1
+    # PRAGMA values can't be bound as parameters; version is an int we computed
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+    return version
+
+
+def replace_at_risk_customers(rows, path: str = None) -> int:
+    """
+    Replace the at-risk table with `rows` (a DataFrame or list of dicts with
+    AT_RISK_COLUMNS) in one transaction and bump the data version.
+    Returns the new version.
+    """
+    records = rows.to_dict("records") if hasattr(rows, "to_dict") else list(rows)
+    conn = connect_writer(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM at_risk_customers")
+            conn.executemany(
+                f"INSERT INTO at_risk_customers ({', '.join(AT_RISK_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                [tuple(r[c] for c in AT_RISK_COLUMNS) for r in records],
+            )
+            version = _bump_version(conn)
+    finally:
+        conn.close()
+    return version
+
+
+def upsert_customer_scores(rows, conn: sqlite3.Connection = None):
+    """
+    Insert or update (customer_id, churn_probability, churn_risk,
+    model_version) rows in customer_scores, in one transaction.
+    """
+    own = conn is None
+    conn = conn or connect_scores_writer()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO customer_scores (customer_id, churn_probability, churn_risk, model_version, scored_at) "
+                "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(customer_id) DO UPDATE SET churn_probability = excluded.churn_probability, "
+                "churn_risk = excluded.churn_risk, model_version = excluded.model_version, "
+                "scored_at = excluded.scored_at",
+                rows,
+            )
+            _bump_version(conn)
+    finally:
+        if own:
+            conn.close()
+
+
+# --------------------------------------------------
+# Readers (API)
+# --------------------------------------------------
+_local = threading.local()
+
+
+def _thread_connection(name: str, path: str):
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    cached = connections.get(name)
+    if cached is not None and cached[0] == path:
+        return cached[1]
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(
+        f"file:{os.path.abspath(path)}?mode=ro",
+        uri=True,
+        cached_statements=config.DB_STATEMENT_CACHE,
+    )
+    connections[name] = (path, conn)
+    return conn
+
+
+def read_connection():
+    """
+    This thread's read-only connection, or None if the database doesn't
+    exist yet. Reconnects if CHURN_DB_PATH changed.
+    """
+    return _thread_connection("batch", db_path())
+
+
+def scores_read_connection():
+    """This thread's read-only connection to SCORES_DB_PATH, or None if it doesn't exist yet."""
+    return _thread_connection("scores", scores_db_path())
+
+
+def data_version() -> int:
+    """Version the batch job bumps on every write (0 if there is no database)."""
+    conn = read_connection()
+    if conn is None:
+        return 0
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def scores_version() -> int:
+    """Version bumped by every customer_scores upsert (0 if there is no database)."""
+    conn = scores_read_connection()
+    if conn is None:
+        return 0
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+class VersionedResultCache:
+    """Bounded LRU of query results, each valid for one data version."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = VersionedResultCache(config.DB_RESULT_CACHE_SIZE)
+
+
+def cached_query(key, build):
+    """
+    Result of `build(conn)` for this data version, from the cache when
+    possible. Returns None if the database doesn't exist.
+    """
+    conn = read_connection()
+    if conn is None:
+        return None
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    result = result_cache.get(key, version)
+    if result is not None:
+        CACHE_REQUESTS.labels(cache="db", result="hit").inc()
+        return result
+    CACHE_REQUESTS.labels(cache="db", result="miss").inc()
+    result = build(conn)
+    result_cache.put(key, version, result)
+    return result
+
+
+def get_top_risk_customers(limit: int = 100) -> list:
+    """Highest-probability customers from the latest batch run."""
+
+    def build(conn):
+        return [
+            {
+                "customer_id": customer_id,
+                "churn_risk": churn_risk,
+                "churn_probability": churn_probability,
+                "key_factors": json.loads(factors) if factors else [],
+                "recommendations": json.loads(recommendations) if recommendations else [],
+            }
+            for customer_id, churn_probability, churn_risk, factors, recommendations
+            in conn.execute(TOP_RISK_SQL, (limit,))
+        ]
+
+    return cached_query(("top_risk", limit), build) or []
+
+
+def get_customer_score(customer_id: str):
+    """Batch-precomputed score for one customer, or None (not cached: one row by key)."""
+    conn = read_connection()
+    if conn is None:
+        return None
+    row = conn.execute(CUSTOMER_SCORE_SQL, (customer_id,)).fetchone()
+    if row is None:
+        return None
+    churn_probability, churn_risk, factors, recommendations = row
+    return {
+        "customer_id": customer_id,
+        "churn_risk": churn_risk,
+        "churn_probability": churn_probability,
+        "key_factors": json.loads(factors) if factors else [],
+        "recommendations": json.loads(recommendations) if recommendations else [],
+    }
+
+
+def get_risk_bands(customer_ids) -> dict:
+    """
+    customer_id -> latest known risk band: the event-driven score if there
+    is one, else the batch score. Customers with neither are left out.
+    """
+    customer_ids = list(customer_ids)
+    if not customer_ids:
+        return {}
+    # customer_scores is read last, so it wins over the batch score
+    sources = ((read_connection(), "at_risk_customers"), (scores_read_connection(), "customer_scores"))
+    bands = {}
+    # Chunked to stay under SQLite's bound-parameter limit
+    for i in range(0, len(customer_ids), 500):
+        chunk = customer_ids[i:i + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        for conn, table in sources:
+            if conn is None:
+                continue
+            try:
+                rows = conn.execute(
+                    f"SELECT customer_id, churn_risk FROM {table} WHERE customer_id IN ({placeholders})", chunk
+                )
+            except sqlite3.OperationalError:  # table not created yet
+                continue
+            bands.update(rows)
+    return bands
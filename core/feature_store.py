@@ -0,0 +1,469 @@
+"""
+Online feature store: keeps customers' rolling purchase features current
+from a stream of purchase events instead of the static CSV snapshot.
+
+Each tracked customer holds
+- 12 monthly ring buckets of purchase count, spend and online purchases
+  (the trailing-year window behind yearly_purchase_count, avg_order_value
+  and online_ratio),
+- the last purchase day (days_since_last_purchase is computed at read
+  time, so it ages without any events), and
+- an exponential moving average of the gap between purchases
+  (avg_gap_days, FEATURE_GAP_EWMA_ALPHA).
+
+An event touches one bucket and a few scalars, plus at most 12 bucket
+resets when a new month starts, so ingestion is O(1) per event. A customer
+is seeded from their snapshot row on their first event: the snapshot's
+yearly totals are spread evenly over the last 12 months, so they age out
+as real events replace them.
+
+Reads see new events immediately: `sync(df)` returns a copy of the
+snapshot frame with the features of customers that changed since the last
+read (all tracked customers once a day, for days_since_last_purchase)
+applied. `df` itself is never written, so readers holding it always see
+one consistent version; the caller publishes the copy.
+Customers not in the snapshot are tracked and checkpointed, but only show
+up in snapshot-backed endpoints once they are in the snapshot.
+
+Listeners registered with `add_listener` are called with the ids changed
+by every ingested batch (the rescoring worker, core/rescoring.py).
+
+The store is checkpointed to FEATURE_CHECKPOINT_PATH (atomic JSON write)
+periodically and at shutdown, together with the offset of the optional
+event file tailer (FEATURE_EVENTS_FILE, one JSON event per line). Until
+`restore()` has run at startup the API rejects /events and an existing
+checkpoint is never overwritten; customers ingested before the restore
+anyway keep their live state.
+
+Usage:
+    from core.feature_store import feature_store
+    feature_store.ingest([{"customer_id": "FM_CUST_000001", "amount": 540.0, "channel": "online"}])
+    feature_store.features("FM_CUST_000001")
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import orjson
+
+from core import config
+from observability.metrics import FEATURE_EVENTS, FEATURE_STORE_CUSTOMERS
+
+logger = logging.getLogger(__name__)
+
+MONTHS = 12
+FEATURE_COLUMNS = (
+    "days_since_last_purchase",
+    "yearly_purchase_count",
+    "avg_gap_days",
+    "avg_order_value",
+    "online_ratio",
+)
+CHECKPOINT_FORMAT = 1
+# Events dated further ahead than this are rejected (clock skew allowance)
+MAX_FUTURE_DAYS = 1
+
+
+def _today() -> int:
+    return date.today().toordinal()
+
+
+def _month(day: int) -> int:
+    d = date.fromordinal(day)
+    return d.year * 12 + d.month - 1
+
+
+def _event_day(timestamp) -> int:
+    """Day ordinal of an event timestamp (datetime, ISO string, epoch seconds or None = now)."""
+    if timestamp is None:
+        return _today()
+    if isinstance(timestamp, (int, float)):
+        return date.fromtimestamp(timestamp).toordinal()
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.date()
+    return timestamp.toordinal()
+
+
+class CustomerState:
+    """Rolling purchase state of one customer."""
+
+    __slots__ = ("last_day", "avg_gap", "head_month", "counts", "spend", "online")
+
+    def __init__(self, head_month: int, last_day: int = None, avg_gap: float = 0.0):
+        self.last_day = last_day
+        self.avg_gap = avg_gap
+        self.head_month = head_month
+        self.counts = [0.0] * MONTHS
+        self.spend = [0.0] * MONTHS
+        self.online = [0.0] * MONTHS
+
+    @classmethod
+    def from_snapshot(cls, row, today: int) -> "CustomerState":
+        """Seed from a snapshot row, spreading its yearly totals over the last 12 months."""
+        state = cls(
+            head_month=_month(today),
+            last_day=today - int(row["days_since_last_purchase"]),
+            avg_gap=float(row["avg_gap_days"]),
+        )
+        per_month = float(row["yearly_purchase_count"]) / MONTHS
+        state.counts = [per_month] * MONTHS
+        state.spend = [per_month * float(row["avg_order_value"])] * MONTHS
+        state.online = [per_month * float(row["online_ratio"])] * MONTHS
+        return state
+
+    def _advance(self, month: int):
+        """Move the window head to `month`, clearing the buckets that fall out."""
+        if month - self.head_month >= MONTHS:
+            self.counts = [0.0] * MONTHS
+            self.spend = [0.0] * MONTHS
+            self.online = [0.0] * MONTHS
+        else:
+            for m in range(self.head_month + 1, month + 1):
+                slot = m % MONTHS
+                self.counts[slot] = self.spend[slot] = self.online[slot] = 0.0
+        self.head_month = month
+
+    def add(self, day: int, amount: float, online: bool, gap_alpha: float):
+        month = _month(day)
+        if month > self.head_month:
+            self._advance(month)
+        if month > self.head_month - MONTHS:
+            slot = month % MONTHS
+            self.counts[slot] += 1
+            self.spend[slot] += amount
+            self.online[slot] += 1 if online else 0
+
+        if self.last_day is None:
+            self.last_day = day
+        elif day > self.last_day:
+            self.avg_gap += gap_alpha * ((day - self.last_day) - self.avg_gap)
+            self.last_day = day
+
+    def features(self, today: int) -> dict:
+        # Months after the head have no purchases; only buckets still inside the window count
+        oldest = max(_month(today), self.head_month) - MONTHS + 1
+        count = spend = online = 0.0
+        for m in range(max(oldest, self.head_month - MONTHS + 1), self.head_month + 1):
+            slot = m % MONTHS
+            count += self.counts[slot]
+            spend += self.spend[slot]
+            online += self.online[slot]
+        return {
+            "days_since_last_purchase": max(today - self.last_day, 0) if self.last_day is not None else 0,
+            "yearly_purchase_count": count,
+            "avg_gap_days": self.avg_gap,
+            "avg_order_value": spend / count if count else 0.0,
+            "online_ratio": online / count if count else 0.0,
+        }
+
+    def to_list(self) -> list:
+        return [self.last_day, self.avg_gap, self.head_month, self.counts, self.spend, self.online]
+
+    @classmethod
+    def from_list(cls, values: list) -> "CustomerState":
+        last_day, avg_gap, head_month, counts, spend, online = values
+        state = cls(head_month=head_month, last_day=last_day, avg_gap=avg_gap)
+        state.counts, state.spend, state.online = list(counts), list(spend), list(online)
+        return state
+
+
+class FeatureStore:
+    """Per-customer rolling features updated from purchase events."""
+
+    def __init__(self, checkpoint_path: str = None, gap_alpha: float = None):
+        self.checkpoint_path = config.FEATURE_CHECKPOINT_PATH if checkpoint_path is None else checkpoint_path
+        self.gap_alpha = config.FEATURE_GAP_EWMA_ALPHA if gap_alpha is None else gap_alpha
+        self.version = 0
+        self.tail_offset = 0
+        self._states = {}
+        # customer_id -> store version of the customer's last change
+        self._changed_in = {}
+        self._dirty = set()
+        self._snapshot = None
+        self._synced_day = None
+        self._checkpointed_version = 0
+        # Set once restore() has run; /events is rejected until then
+        self.restored = False
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    # ---------------- ingestion ----------------
+    def add_listener(self, callback):
+        """Call `callback(customer_ids)` after every batch that changed customers."""
+        self._listeners.append(callback)
+
+    def attach(self, snapshot):
+        """Use `snapshot` (the customer DataFrame) for seeding; its rows get re-synced on the next read."""
+        with self._lock:
+            self._snapshot = snapshot
+            self._synced_day = None
+
+    def _state(self, customer_id: str, today: int) -> CustomerState:
+        state = self._states.get(customer_id)
+        if state is None:
+            snapshot = self._snapshot
+            if snapshot is not None and customer_id in snapshot.index:
+                state = CustomerState.from_snapshot(snapshot.loc[customer_id], today)
+            else:
+                state = CustomerState(head_month=_month(today))
+            self._states[customer_id] = state
+        return state
+
+    def ingest(self, events, source: str = "api", tail_offset: int = None) -> dict:
+        """
+        Apply purchase events (dicts with customer_id, amount, optional
+        channel "online"/"store" and timestamp). Malformed events and events
+        dated more than MAX_FUTURE_DAYS ahead are skipped and counted.
+
+        `tail_offset` (event file tailer) is stored under the same lock as
+        the events, so a checkpoint never pairs new state with an old offset.
+        """
+        today = _today()
+        applied = rejected = 0
+        changed = set()
+        with self._lock:
+            for event in events:
+                try:
+                    customer_id = str(event["customer_id"])
+                    day = _event_day(event.get("timestamp"))
+                    amount = float(event.get("amount", 0.0))
+                    online = str(event.get("channel", "store")).lower() == "online"
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.debug("Skipping malformed purchase event %r: %s", event, e)
+                    rejected += 1
+                    continue
+                if day > today + MAX_FUTURE_DAYS:
+                    # Would move the window head ahead and wipe the customer's history
+                    logger.debug("Skipping purchase event dated in the future %r", event)
+                    rejected += 1
+                    continue
+                self._state(customer_id, today).add(day, amount, online, self.gap_alpha)
+                self._dirty.add(customer_id)
+                changed.add(customer_id)
+                applied += 1
+            if applied:
+                self.version += 1
+                self._changed_in.update(dict.fromkeys(changed, self.version))
+            if tail_offset is not None:
+                self.tail_offset = tail_offset
+            tracked = len(self._states)
+        FEATURE_EVENTS.labels(source=source, result="applied").inc(applied)
+        FEATURE_EVENTS.labels(source=source, result="rejected").inc(rejected)
+        FEATURE_STORE_CUSTOMERS.set(tracked)
+        if changed:
+            for callback in self._listeners:
+                callback(changed)
+        return {"applied": applied, "rejected": rejected, "version": self.version}
+
+    # ---------------- reads ----------------
+    def features(self, customer_id: str, today: int = None):
+        """Current rolling features of a tracked customer, or None."""
+        with self._lock:
+            state = self._states.get(customer_id)
+            return state.features(today or _today()) if state is not None else None
+
+    def tracked_ids(self) -> list:
+        with self._lock:
+            return list(self._states)
+
+    def model_inputs(self, customer_ids) -> dict:
+        """
+        customer_id -> model feature dict (snapshot attributes + live
+        features) for tracked customers that are in the snapshot.
+        """
+        today = _today()
+        with self._lock:
+            snapshot = self._snapshot
+            live = {cid: self._states[cid].features(today) for cid in customer_ids if cid in self._states}
+        if snapshot is None or snapshot.empty or not live:
+            return {}
+        static = snapshot.loc[
+            snapshot.index.intersection(list(live)), ["primary_category", "discount_sensitivity"]
+        ].to_dict("index")
+        return {cid: {**attributes, **live[cid]} for cid, attributes in static.items()}
+
+    def data_version(self) -> tuple:
+        """Changes with every ingested batch and every day (days_since_last_purchase moves)."""
+        return (self.version, _today())
+
+    def customer_version(self, customer_id: str) -> tuple:
+        """Like data_version, but only moves when this customer changed (and every day)."""
+        return (self._changed_in.get(customer_id, 0), _today())
+
+    def sync(self, df):
+        """
+        `df` with the features of customers changed since the last call
+        (all tracked customers on a new day) applied. Changed columns are
+        copied, never written in place; returns `df` itself when nothing
+        changed. Callers must serialize sync + publish of the result.
+        """
+        today = _today()
+        with self._lock:
+            if self._synced_day != today:
+                ids = list(self._states)
+                self._synced_day = today
+            else:
+                ids = list(self._dirty)
+            self._dirty.clear()
+            rows = [(cid, self._states[cid].features(today)) for cid in ids if cid in df.index]
+        if not rows:
+            return df
+
+        positions = df.index.get_indexer([cid for cid, _ in rows])
+        updated = df.copy(deep=False)
+        for column in FEATURE_COLUMNS:
+            if column not in df.columns:
+                continue
+            values = np.fromiter((f[column] for _, f in rows), dtype=float, count=len(rows))
+            column_values = df[column].to_numpy(copy=True)
+            if np.issubdtype(column_values.dtype, np.integer):
+                values = np.rint(values)
+            column_values[positions] = values
+            updated[column] = column_values
+        return updated
+
+    # ---------------- persistence ----------------
+    def checkpoint(self, path: str = None, force: bool = False) -> bool:
+        """Write the store to disk (atomically) if it changed since the last checkpoint."""
+        path = path or self.checkpoint_path
+        if not self.restored and os.path.exists(path):
+            # Don't replace a checkpoint that was never loaded with partial state
+            logger.warning("Feature store not restored yet; skipping checkpoint to %s", path)
+            return False
+        with self._lock:
+            if not force and self.version == self._checkpointed_version:
+                return False
+            version = self.version
+            payload = {
+                "format": CHECKPOINT_FORMAT,
+                "version": version,
+                "tail_offset": self.tail_offset,
+                "saved_at": time.time(),
+                "customers": {cid: state.to_list() for cid, state in self._states.items()},
+            }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(payload))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._checkpointed_version = version
+        logger.info("Feature store checkpointed: %s customers, version %s", len(payload["customers"]), version)
+        return True
+
+    def restore(self, path: str = None) -> int:
+        """
+        Load the last checkpoint, if any, and mark the store restored.
+        Customers already tracked (events ingested before the restore) keep
+        their live state; the rest come from the checkpoint. Returns the
+        number of customers restored.
+        """
+        path = path or self.checkpoint_path
+        payload = None
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                payload = orjson.loads(f.read())
+            if payload.get("format") != CHECKPOINT_FORMAT:
+                logger.warning("Ignoring feature store checkpoint with unknown format %s", payload.get("format"))
+                payload = None
+        if payload is None:
+            self.restored = True
+            return 0
+
+        with self._lock:
+            live = self._states
+            self._states = {cid: CustomerState.from_list(v) for cid, v in payload["customers"].items()}
+            restored = len(self._states)
+            self._states.update(live)
+            if live:
+                # The merged state isn't on disk yet; the next checkpoint writes it
+                self.version = max(self.version, payload["version"]) + 1
+                self._changed_in.update(dict.fromkeys(live, self.version))
+            else:
+                self.version = self._checkpointed_version = payload["version"]
+                self._changed_in.clear()
+                self._dirty.clear()
+            self.tail_offset = payload.get("tail_offset", 0)
+            self._synced_day = None
+            self.restored = True
+            tracked = len(self._states)
+        FEATURE_STORE_CUSTOMERS.set(tracked)
+        logger.info(
+            "Feature store restored: %s customers (%s kept live), version %s", restored, len(live), self.version
+        )
+        return restored
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "customers": len(self._states),
+                "pending_sync": len(self._dirty),
+                "version": self.version,
+                "checkpointed_version": self._checkpointed_version,
+                "tail_offset": self.tail_offset,
+                "restored": self.restored,
+            }
+
+
+class EventFileTailer:
+    """Follows a JSON-lines event file from the store's saved offset and ingests new lines."""
+
+    def __init__(self, store: FeatureStore, path: str, interval_s: float = None):
+        self.store = store
+        self.path = path
+        self.interval_s = config.FEATURE_TAIL_INTERVAL_S if interval_s is None else interval_s
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self) -> int:
+        """Ingest complete lines appended since the last poll. Returns the number of events read."""
+        if not os.path.exists(self.path):
+            return 0
+        offset = self.store.tail_offset
+        if os.path.getsize(self.path) < offset:
+            logger.warning("Event file %s was truncated; reading from the start", self.path)
+            offset = 0
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # leave a partially written last line for the next poll
+        if end == 0:
+            return 0
+
+        events = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                events.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                FEATURE_EVENTS.labels(source="file", result="rejected").inc()
+        self.store.ingest(events, source="file", tail_offset=offset + end)
+        return len(events)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error("Event file tailer failed: %s", e)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="feature-tailer", daemon=True)
+        self._thread.start()
+        logger.info("Tailing purchase events from %s", self.path)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+feature_store = FeatureStore()
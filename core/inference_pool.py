@@ -0,0 +1,70 @@
+"""
+Bounded worker pool for blocking inference work (model scoring, SHAP, LLM
+calls) issued from async request handlers.
+
+Running these calls directly inside `async def` handlers blocks the event
+loop, so one slow LLM call stalls every other request. `run_blocking` hands
+them to a fixed-size thread pool instead and keeps the queue depth and
+in-flight gauges in observability.metrics up to date.
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core import config
+from observability.metrics import POOL_IN_FLIGHT, POOL_QUEUE_DEPTH
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide inference pool (created on first use)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=config.INFERENCE_POOL_SIZE, thread_name_prefix="inference"
+                )
+    return _executor
+
+
+def queue_depth() -> int:
+    """Calls waiting for a free worker."""
+    return int(POOL_QUEUE_DEPTH.value)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Run `fn(*args, **kwargs)` in the inference pool and await its result.
+    The caller's context (e.g. the active tracing span) is carried over.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    state = {"started": False, "cancelled": False}
+    lock = threading.Lock()
+
+    def task():
+        with lock:
+            if state["cancelled"]:
+                return None
+            state["started"] = True
+        POOL_QUEUE_DEPTH.dec()
+        POOL_IN_FLIGHT.inc()
+        try:
+            return ctx.run(fn, *args, **kwargs)
+        finally:
+            POOL_IN_FLIGHT.dec()
+
+    POOL_QUEUE_DEPTH.inc()
+    try:
+        return await loop.run_in_executor(get_executor(), task)
+    except asyncio.CancelledError:
+        with lock:
+            if not state["started"]:
+                state["cancelled"] = True
+                POOL_QUEUE_DEPTH.dec()
+        raise
@@ -0,0 +1,228 @@
+"""
+Event-driven rescoring and churn-risk alerts.
+
+The online feature store (core/feature_store.py) notifies the
+`RescoringWorker` of every customer whose features changed. The worker
+collects the ids (deduplicated) and re-scores them in micro-batches of up
+to RESCORE_BATCH_SIZE, waiting at most RESCORE_MAX_WAIT_MS for a batch to
+fill, with one `ChurnModel.predict_churn_batch` call per batch. Tracked
+customers are also re-queued once a day, since days_since_last_purchase
+keeps growing without events.
+
+New scores are upserted into the customer_scores table, which lives in
+its own database (SCORES_DB_PATH, core/db.py). A customer whose band moves
+into High from Low or Medium, compared with their previous event-driven
+score (or the batch score when there is none), raises an alert.
+Customers with no previous score only get a baseline.
+
+Alerts go to the `AlertHub`, which keeps the last ALERTS_BUFFER alerts
+(for replay via Last-Event-ID) and fans them out to the server-sent event
+streams at /api/churn/alerts/stream. The worker runs in its own thread;
+the hub hands alerts to the event loop thread-safely.
+
+Usage:
+    worker = RescoringWorker(feature_store, alert_hub)
+    worker.start()
+    ...
+    worker.stop()
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from core import config, db
+from ml.churn_rules import get_risk_level
+from ml.drift import get_drift_monitor
+from observability.metrics import CHURN_ALERTS, RESCORE_PENDING, RESCORED_CUSTOMERS, STAGE_LATENCY, timer
+
+logger = logging.getLogger(__name__)
+
+ALERT_FROM_BANDS = ("Low", "Medium")
+ALERT_BAND = "High"
+
+
+class AlertHub:
+    """Recent alerts plus one bounded queue per SSE subscriber."""
+
+    def __init__(self, buffer_size: int = None, subscriber_queue: int = None):
+        self.subscriber_queue = config.ALERTS_SUBSCRIBER_QUEUE if subscriber_queue is None else subscriber_queue
+        self._recent = deque(maxlen=config.ALERTS_BUFFER if buffer_size is None else buffer_size)
+        self._subscribers = set()
+        self._next_id = 1
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def attach_loop(self, loop):
+        """Event loop the subscriber queues belong to."""
+        self._loop = loop
+
+    def publish(self, alert: dict) -> dict:
+        """Record an alert and deliver it to every subscriber (callable from any thread)."""
+        with self._lock:
+            alert = {"id": self._next_id, **alert}
+            self._next_id += 1
+            self._recent.append(alert)
+            subscribers = list(self._subscribers)
+        CHURN_ALERTS.inc()
+        if self._loop is not None and subscribers:
+            self._loop.call_soon_threadsafe(self._deliver, subscribers, alert)
+        return alert
+
+    def _deliver(self, subscribers, alert: dict):
+        for queue in subscribers:
+            try:
+                queue.put_nowait(alert)
+            except asyncio.QueueFull:
+                # A stalled client loses alerts rather than holding memory; it can replay on reconnect
+                logger.warning("Alert subscriber queue full; dropping alert %s", alert["id"])
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.subscriber_queue)
+        with self._lock:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def recent(self, after_id: int = 0) -> list:
+        with self._lock:
+            return [alert for alert in self._recent if alert["id"] > after_id]
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "buffered": len(self._recent), "last_id": self._next_id - 1}
+
+
+class RescoringWorker:
+    """Re-scores changed customers in micro-batches on a background thread."""
+
+    def __init__(self, store, hub: AlertHub, batch_size: int = None, max_wait_s: float = None):
+        self.store = store
+        self.hub = hub
+        self.batch_size = config.RESCORE_BATCH_SIZE if batch_size is None else batch_size
+        self.max_wait_s = config.RESCORE_MAX_WAIT_MS / 1000 if max_wait_s is None else max_wait_s
+        self._pending = {}  # insertion-ordered set of customer ids
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+        self._requeued_day = None
+        self.batches = 0
+        self.rescored = 0
+
+    def notify(self, customer_ids):
+        """Queue customers for rescoring (feature store listener)."""
+        with self._cond:
+            self._pending.update(dict.fromkeys(customer_ids))
+            RESCORE_PENDING.set(len(self._pending))
+            self._cond.notify()
+
+    def _next_batch(self) -> list:
+        with self._cond:
+            while not self._pending and not self._stop:
+                self._cond.wait(timeout=60)
+                self._requeue_daily()
+            if self._stop:
+                return []
+            # Let the batch fill up a little before scoring it
+            deadline = time.monotonic() + self.max_wait_s
+            while len(self._pending) < self.batch_size and not self._stop:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+            batch = list(self._pending)[:self.batch_size]
+            for customer_id in batch:
+                del self._pending[customer_id]
+            RESCORE_PENDING.set(len(self._pending))
+            return batch
+
+    def _requeue_daily(self):
+        today = datetime.now().date()
+        if self._requeued_day is None:
+            self._requeued_day = today
+        elif today != self._requeued_day:
+            self._requeued_day = today
+            self._pending.update(dict.fromkeys(self.store.tracked_ids()))
+            RESCORE_PENDING.set(len(self._pending))
+
+    def rescore(self, customer_ids: list, conn=None) -> list:
+        """Score `customer_ids` now, persist the scores and publish alerts. Returns the alerts."""
+        from ml.inference import churn_model_service
+
+        inputs = self.store.model_inputs(customer_ids)
+        if not inputs:
+            return []
+        ids = list(inputs)
+        drift_monitor = get_drift_monitor()
+        if drift_monitor is not None:
+            drift_monitor.observe_frame(pd.DataFrame.from_records(list(inputs.values())))
+        with timer(STAGE_LATENCY, stage="rescore_batch"):
+            previous = db.get_risk_bands(ids)
+            probabilities = churn_model_service.predict_churn_batch([inputs[cid] for cid in ids])
+            bands = [get_risk_level(p) for p in probabilities]
+            db.upsert_customer_scores([
+                (cid, float(p), band, churn_model_service.version)
+                for cid, p, band in zip(ids, probabilities, bands)
+            ], conn)
+
+        alerts = []
+        scored_at = datetime.now(timezone.utc).isoformat()
+        for cid, probability, band in zip(ids, probabilities, bands):
+            if band == ALERT_BAND and previous.get(cid) in ALERT_FROM_BANDS:
+                alerts.append(self.hub.publish({
+                    "customer_id": cid,
+                    "previous_risk": previous[cid],
+                    "churn_risk": band,
+                    "churn_probability": round(float(probability), 4),
+                    "scored_at": scored_at,
+                }))
+        self.batches += 1
+        self.rescored += len(ids)
+        RESCORED_CUSTOMERS.inc(len(ids))
+        if alerts:
+            logger.info("Rescored %s customers, %s moved into High risk", len(ids), len(alerts))
+        return alerts
+
+    def _run(self):
+        # One writer connection for the life of the worker (sqlite connections are per thread)
+        conn = db.connect_scores_writer()
+        try:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    return
+                try:
+                    self.rescore(batch, conn)
+                except Exception as e:
+                    logger.error("Rescoring batch of %s customers failed: %s", len(batch), e)
+        finally:
+            conn.close()
+
+    def start(self):
+        self.store.add_listener(self.notify)
+        self._thread = threading.Thread(target=self._run, name="rescoring-worker", daemon=True)
+        self._thread.start()
+        logger.info("Rescoring worker started (batch size %s, max wait %.0f ms)", self.batch_size, self.max_wait_s * 1000)
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def status(self) -> dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {"pending": pending, "batches": self.batches, "rescored": self.rescored}
+
+
+alert_hub = AlertHub()
@@ -0,0 +1,62 @@
+"""
+Single-flight coalescing for async request handlers.
+
+Concurrent calls with the same key share one in-flight computation: the
+first caller (the leader) starts it, later callers (followers) await the
+same result instead of recomputing. The computation runs as its own task,
+so a leader whose client disconnects doesn't cancel it for the followers.
+Nothing is cached: once the computation finishes, the next call with that
+key starts a fresh one.
+
+Usage:
+    predict_flight = SingleFlight("predict")
+    result = await predict_flight.run(key, compute, features)
+"""
+
+import asyncio
+import hashlib
+
+import orjson
+
+from observability.metrics import SINGLEFLIGHT_IN_FLIGHT, SINGLEFLIGHT_REQUESTS
+
+
+def canonical_key(payload: dict) -> str:
+    """Stable hash of a JSON-able payload (key order independent)."""
+    return hashlib.blake2b(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls per key. Use from a single event loop."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight = {}
+
+    async def run(self, key, fn, *args, **kwargs):
+        """
+        Result of `await fn(*args, **kwargs)`, shared with any concurrent
+        call for the same key. Exceptions are shared too.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            SINGLEFLIGHT_REQUESTS.labels(group=self.name, role="follower").inc()
+            return await asyncio.shield(task)
+
+        SINGLEFLIGHT_REQUESTS.labels(group=self.name, role="leader").inc()
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        self._in_flight[key] = task
+        SINGLEFLIGHT_IN_FLIGHT.labels(group=self.name).inc()
+
+        def _done(finished):
+            self._in_flight.pop(key, None)
+            SINGLEFLIGHT_IN_FLIGHT.labels(group=self.name).dec()
+            if not finished.cancelled():
+                # Mark the exception retrieved even if every caller went away
+                finished.exception()
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
@@ -1,37 +1,246 @@
+"""
+OpenTelemetry tracing setup (the single entry point for the API and scripts).
+
+Cost controls, all driven by core.config / environment variables:
+- Head sampling by ratio (TRACING_SAMPLE_RATIO), overridable per route
+  prefix (TRACING_ROUTE_SAMPLE_RATIOS="/api/churn/health=0,/api/churn/predict=0.25").
+  Child spans follow their parent's decision, so traces are never partial.
+- Keep errors and slow requests (TRACING_KEEP_ERRORS, TRACING_SLOW_MS):
+  unsampled traces are then recorded (not exported) and buffered until
+  their local root span ends; the whole trace is exported if any span
+  errored or the root took longer than the threshold. With both options
+  off, unsampled spans are non-recording and cost almost nothing.
+- Exporters: OTLP/HTTP only when an endpoint (OTEL_EXPORTER_OTLP_ENDPOINT /
+  OTEL_EXPORTER_OTLP_TRACES_ENDPOINT) or HONEYCOMB_API_KEY is configured;
+  console export only when TRACING_CONSOLE=true.
+"""
+
 import os
+import threading
+from collections import OrderedDict
+
 from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, SynchronousMultiSpanProcessor, TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.trace.sampling import Decision, Sampler, SamplingResult
 from opentelemetry.sdk.resources import Resource
+from opentelemetry.trace import SpanContext, StatusCode, TraceFlags
+
+from core import config
+
+# Same bound as the SDK's TraceIdRatioBased sampler
+_TRACE_ID_LIMIT = (1 << 64) - 1
+
+
+def parse_route_ratios(text: str) -> dict:
+    """'/a=0.1,/b=0' -> {'/a': 0.1, '/b': 0.0}"""
+    ratios = {}
+    for part in filter(None, (p.strip() for p in (text or "").split(","))):
+        prefix, _, ratio = part.partition("=")
+        ratios[prefix.strip()] = float(ratio)
+    return ratios
+
+
+class RouteRatioSampler(Sampler):
+    """
+    Parent-based ratio sampler with per-route-prefix ratios for root spans.
+
+    Args:
+        ratio: Default fraction of root spans (requests) sampled.
+        route_ratios: {path prefix: ratio}; the longest matching prefix wins.
+        record_unsampled: Return RECORD_ONLY instead of DROP for unsampled
+            traces, so a tail processor can still keep errors / slow ones.
+    """
+
+    def __init__(self, ratio: float = 1.0, route_ratios: dict = None, record_unsampled: bool = False):
+        self.ratio = ratio
+        # Longest prefixes first
+        self.route_ratios = sorted((route_ratios or {}).items(), key=lambda kv: -len(kv[0]))
+        self.record_unsampled = record_unsampled
+
+    def _ratio_for(self, name: str, attributes) -> float:
+        path = None
+        if attributes:
+            path = attributes.get("url.path") or attributes.get("http.target")
+        if path is None:
+            # FastAPI server spans are named "<METHOD> <path>"
+            path = name.split(" ", 1)[-1]
+        path = str(path).split("?", 1)[0]
+        for prefix, ratio in self.route_ratios:
+            if path.startswith(prefix):
+                return ratio
+        return self.ratio
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        parent = trace.get_current_span(parent_context).get_span_context()
+        if parent.is_valid:
+            # Follow the parent's decision (including "recorded but not sampled")
+            if parent.trace_flags.sampled:
+                decision = Decision.RECORD_AND_SAMPLE
+            else:
+                decision = Decision.RECORD_ONLY if self.record_unsampled else Decision.DROP
+            return SamplingResult(decision, attributes, parent.trace_state)
+
+        sampled = (trace_id & _TRACE_ID_LIMIT) < round(self._ratio_for(name, attributes) * (_TRACE_ID_LIMIT + 1))
+        if sampled:
+            decision = Decision.RECORD_AND_SAMPLE
+        else:
+            decision = Decision.RECORD_ONLY if self.record_unsampled else Decision.DROP
+        return SamplingResult(decision, attributes if decision != Decision.DROP else None, trace_state)
+
+    def get_description(self) -> str:
+        return f"RouteRatioSampler{{ratio={self.ratio}, routes={dict(self.route_ratios)}}}"
+
+
+def _as_sampled(span: ReadableSpan) -> ReadableSpan:
+    """Copy of a recorded-only span flagged as sampled, so exporters accept it."""
+    ctx = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(ctx.trace_id, ctx.span_id, ctx.is_remote, TraceFlags(TraceFlags.SAMPLED), ctx.trace_state),
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class KeepErrorsAndSlowProcessor(SpanProcessor):
+    """
+    Forwards sampled spans to `delegate`; buffers recorded-only spans per
+    trace and forwards the whole trace when its local root ends if any span
+    errored or the root ran longer than `slow_threshold_s`.
+    """
+
+    def __init__(self, delegate: SpanProcessor, keep_errors: bool = True, slow_threshold_s: float = None, max_traces: int = 2048):
+        self.delegate = delegate
+        self.keep_errors = keep_errors
+        self.slow_threshold_ns = int(slow_threshold_s * 1e9) if slow_threshold_s else None
+        self.max_traces = max_traces
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        if span.context.trace_flags.sampled:
+            self.delegate.on_start(span, parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        if span.context.trace_flags.sampled:
+            self.delegate.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._pending.setdefault(trace_id, [])
+            spans.append(span)
+            if is_local_root:
+                del self._pending[trace_id]
+            elif len(self._pending) > self.max_traces:
+                # Bound memory: forget the oldest unfinished trace
+                self._pending.popitem(last=False)
+        if not is_local_root:
+            return
+
+        keep = self.keep_errors and any(s.status.status_code == StatusCode.ERROR for s in spans)
+        if not keep and self.slow_threshold_ns is not None:
+            keep = (span.end_time - span.start_time) >= self.slow_threshold_ns
+        if keep:
+            for s in spans:
+                self.delegate.on_end(_as_sampled(s))
+
+    def shutdown(self):
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+def _default_exporters() -> list:
+    exporters = []
+    honeycomb_key = os.getenv("HONEYCOMB_API_KEY")
+    otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
 
-def setup_tracing():
+    if otlp_endpoint or (honeycomb_key and honeycomb_key != "YOUR_HONEYCOMB_API_KEY"):
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            if otlp_endpoint:
+                # Reads OTEL_EXPORTER_OTLP_* (endpoint, headers, ...) from the environment
+                exporters.append(OTLPSpanExporter())
+            else:
+                exporters.append(OTLPSpanExporter(
+                    endpoint="https://api.honeycomb.io/v1/traces",
+                    headers={"x-honeycomb-team": honeycomb_key}
+                ))
+            print("[INFO] OpenTelemetry configured for OTLP export (HTTP/Protobuf)")
+        except Exception as e:
+            print(f"[ERROR] Failed to configure OTLP exporter: {e}")
+
+    if config.TRACING_CONSOLE:
+        exporters.append(ConsoleSpanExporter())
+    if not exporters:
+        print("[INFO] No trace exporter configured; spans are not exported.")
+    return exporters
+
+
+def build_tracer_provider(
+    service_name: str = None,
+    sample_ratio: float = None,
+    route_ratios: dict = None,
+    keep_errors: bool = None,
+    slow_ms: float = None,
+    exporters: list = None,
+) -> TracerProvider:
     """
-    Configure OpenTelemetry tracing for the application.
-    Sets up a TracerProvider with OTLP Exporter (Honeycomb) and Console fallback.
+    TracerProvider with the configured sampling and exporters. Arguments
+    default to core.config; `exporters` replaces the environment-derived
+    exporters (used by benchmarks/tracing_overhead.py).
     """
-    # Create a Resource to identify the service
+    sample_ratio = config.TRACING_SAMPLE_RATIO if sample_ratio is None else sample_ratio
+    route_ratios = parse_route_ratios(config.TRACING_ROUTE_SAMPLE_RATIOS) if route_ratios is None else route_ratios
+    keep_errors = config.TRACING_KEEP_ERRORS if keep_errors is None else keep_errors
+    slow_ms = config.TRACING_SLOW_MS if slow_ms is None else slow_ms
+
+    # Tail keeping only matters when something can be unsampled
+    can_drop = sample_ratio < 1.0 or any(r < 1.0 for r in route_ratios.values())
+    tail_keep = can_drop and (keep_errors or bool(slow_ms))
+
     resource = Resource.create({
-        "service.name": os.getenv("OTEL_SERVICE_NAME", "freshmart-retention-api"),
-        "service.version": "1.0.0"
+        "service.name": service_name or os.getenv("OTEL_SERVICE_NAME", "freshmart-retention-api"),
+        "service.version": config.APP_VERSION
     })
+    provider = TracerProvider(
+        resource=resource,
+        sampler=RouteRatioSampler(sample_ratio, route_ratios, record_unsampled=tail_keep),
+    )
+
+    exporters = _default_exporters() if exporters is None else exporters
+    if not exporters:
+        return provider
+    if tail_keep:
+        # One buffer of unsampled traces shared by every exporter
+        batch = SynchronousMultiSpanProcessor()
+        for exporter in exporters:
+            batch.add_span_processor(BatchSpanProcessor(exporter))
+        provider.add_span_processor(KeepErrorsAndSlowProcessor(batch, keep_errors, slow_ms / 1000 if slow_ms else None))
+    else:
+        for exporter in exporters:
+            provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
 
-    # Initialize the TracerProvider
-    provider = TracerProvider(resource=resource)
-
-    # Configure OTLP Exporter (Uses env vars: OTEL_EXPORTER_OTLP_ENDPOINT, HEADERS, etc.)
-    try:
-        # We initialized the specific HTTP exporter, it will read env vars by default if not passed args
-        otlp_exporter = OTLPSpanExporter() 
-        provider.add_span_processor(BatchSpanProcessor(otlp_exporter))
-        print(f"[INFO] OpenTelemetry configured for Honeycomb (HTTP/Protobuf)")
-    except Exception as e:
-        print(f"[ERROR] Failed to configure Honeycomb exporter: {e}")
-        print("[WARN] Falling back to Console tracing.")
-    
-    # Configure the ConsoleSpanExporter as fallback/debug
-    processor = BatchSpanProcessor(ConsoleSpanExporter())
-    provider.add_span_processor(processor)
-
-    # Set the global TracerProvider
+def setup_tracing(service_name: str = None, **overrides) -> TracerProvider:
+    """
+    Configure OpenTelemetry tracing for the application and install the
+    provider globally. See build_tracer_provider for the options.
+    """
+    provider = build_tracer_provider(service_name, **overrides)
     trace.set_tracer_provider(provider)
+    return provider
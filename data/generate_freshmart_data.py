@@ -1,81 +1,302 @@
+"""
+Synthetic FreshMart data generator.
+
+Customers are generated column-wise with NumPy (no per-row Python work),
+in chunks that are written out as they are produced, so tens of millions
+of rows fit in bounded memory. Every chunk gets its own seeded random
+stream, making output reproducible for a given (seed, chunk_size).
+
+Outputs (under --output-dir):
+- churn_training_data.{csv,parquet}: labeled history (FM_HIST_ ids, `churned`)
+- freshmart_customers_big.{csv,parquet}: the same customers as the "live"
+  unlabeled snapshot (FM_CUST_ ids)
+- freshmart_transactions.{csv,parquet} (optional): one row per purchase
+  with customer_id, timestamp, amount, channel, discount_used, category
+- freshmart_live_transactions.{csv,parquet} (optional): the same purchases
+  keyed by the live FM_CUST_ ids, e.g. as an event stream for the online
+  feature store (core/feature_store.py)
+
+Usage:
+    python data/generate_freshmart_data.py
+    python data/generate_freshmart_data.py --n 10000000 --format parquet --seed 7
+    python data/generate_freshmart_data.py --n 100000 --transactions
+    python data/generate_freshmart_data.py --n 100000 --transactions --transactions-for both
+"""
+
+import argparse
+import os
+import time
+from datetime import date
+
+import numpy as np
 import pandas as pd
-import random
-
-def generate_freshmart_customers(n=50000):
-    categories = [
-        "Grocery",
-        "Pharmacy",
-        "Personal Care",
-        "Baby Care",
-        "Household Essentials",
-        "Dairy & Bakery",
-        "Snacks & Beverages",
-        "Electronics",
-        "Home & Kitchen",
-        "Seasonal Items"
-    ]
-
-    locations = ["New York", "Chicago", "San Francisco", "Austin", "Seattle", "Miami", "Boston", "Denver"]
-    
-    data = []
-
-    for i in range(n):
-        primary = random.choice(categories)
-        secondary = random.choice([c for c in categories if c != primary])
-        
-        # Features
-        days_since_last = random.randint(1, 180)
-        yearly_purchases = random.randint(1, 60)
-        avg_gap = random.randint(3, 90)
-        discount_sen = random.choice(["Low", "Medium", "High"])
-        online = round(random.uniform(0.0, 1.0), 2)
-        
-        # --- Generate "Ground Truth" Label (Simulating History) ---
-        # We use a probabilistic formula to decide if they churned
-        # This gives the ML model a pattern to find.
-        
-        risk_score = 0
-        if days_since_last > 60: risk_score += 0.4
-        if yearly_purchases < 5: risk_score += 0.3
-        if avg_gap > 45: risk_score += 0.2
-        if discount_sen == "High": risk_score += 0.1
-        
-        # Add randomness so it's not a perfect rule (Real life is messy)
-        risk_score += random.uniform(-0.1, 0.1)
-        
-        churned = 1 if risk_score > 0.5 else 0
-
-        customer = {
-            "customer_id": f"FM_HIST_{i+1:06d}", # different ID series for history
-            "age": random.randint(18, 75),
-            "gender": random.choice(["Male", "Female", "Non-binary"]),
-            "location": random.choice(locations),
-            "tenure_months": random.randint(1, 120),
-            "primary_category": primary,
-            "secondary_category": secondary,
-            "yearly_purchase_count": yearly_purchases,
-            "avg_gap_days": avg_gap,
-            "avg_order_value": random.randint(200, 3000),
-            "discount_sensitivity": discount_sen,
-            "online_ratio": online,
-            "days_since_last_purchase": days_since_last,
-            "churned": churned  # The Target Variable
-        }
-
-        data.append(customer)
-
-    df = pd.DataFrame(data)
-    
-    # Save Training Data
-    df.to_csv("data/churn_training_data.csv", index=False)
-    print(f"Generated {n} labeled training records to data/churn_training_data.csv 🧠")
-    
-    # Also save the 'current' customers file (unlabeled) for the app to use
-    # We drop the 'churned' column for the "live" data simulation
-    df_live = df.drop(columns=["churned"]).copy()
-    df_live["customer_id"] = [f"FM_CUST_{i+1:06d}" for i in range(n)] # Reset IDs
-    df_live.to_csv("data/freshmart_customers_big.csv", index=False)
-    print(f"Generated {n} live customer records to data/freshmart_customers_big.csv 🛍️")
+
+CATEGORIES = [
+    "Grocery",
+    "Pharmacy",
+    "Personal Care",
+    "Baby Care",
+    "Household Essentials",
+    "Dairy & Bakery",
+    "Snacks & Beverages",
+    "Electronics",
+    "Home & Kitchen",
+    "Seasonal Items"
+]
+
+LOCATIONS = ["New York", "Chicago", "San Francisco", "Austin", "Seattle", "Miami", "Boston", "Denver"]
+GENDERS = ["Male", "Female", "Non-binary"]
+SENSITIVITIES = ["Low", "Medium", "High"]
+
+# Chance a purchase used a discount, by discount sensitivity
+DISCOUNT_USE_RATE = np.array([0.1, 0.3, 0.6])
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def _ids(prefix: str, start: int, n: int) -> np.ndarray:
+    """prefix + 1-based zero-padded sequence numbers (at least 6 digits)."""
+    numbers = np.arange(start + 1, start + n + 1)
+    if hasattr(np, "strings"):  # NumPy >= 2: vectorized string ufuncs
+        return np.strings.add(prefix, np.strings.zfill(numbers.astype("U"), 6))
+    return (prefix + pd.Series(numbers).astype(str).str.zfill(6)).to_numpy()
+
+
+def generate_customer_frame(n: int, rng: np.random.Generator, start: int = 0) -> pd.DataFrame:
+    """
+    Labeled customers, vectorized.
+
+    Args:
+        n: Number of customers.
+        rng: NumPy random generator.
+        start: Index of the first customer (for ids across chunks).
+
+    Returns:
+        pd.DataFrame: Same columns as the original generator, including `churned`.
+    """
+    n_cat = len(CATEGORIES)
+    primary = rng.integers(0, n_cat, n)
+    # Any category but the primary one
+    secondary = (primary + rng.integers(1, n_cat, n)) % n_cat
+
+    days_since_last = rng.integers(1, 181, n)
+    yearly_purchases = rng.integers(1, 61, n)
+    avg_gap = rng.integers(3, 91, n)
+    sensitivity = rng.integers(0, 3, n)
+    online = np.round(rng.random(n), 2)
+
+    # --- Generate "Ground Truth" Label (Simulating History) ---
+    # Same probabilistic formula as before, so models trained on either match
+    risk_score = (
+        0.4 * (days_since_last > 60)
+        + 0.3 * (yearly_purchases < 5)
+        + 0.2 * (avg_gap > 45)
+        + 0.1 * (sensitivity == 2)
+        + rng.uniform(-0.1, 0.1, n)
+    )
+
+    return pd.DataFrame({
+        "customer_id": _ids("FM_HIST_", start, n),
+        "age": rng.integers(18, 76, n),
+        "gender": pd.Categorical.from_codes(rng.integers(0, len(GENDERS), n), GENDERS),
+        "location": pd.Categorical.from_codes(rng.integers(0, len(LOCATIONS), n), LOCATIONS),
+        "tenure_months": rng.integers(1, 121, n),
+        "primary_category": pd.Categorical.from_codes(primary, CATEGORIES),
+        "secondary_category": pd.Categorical.from_codes(secondary, CATEGORIES),
+        "yearly_purchase_count": yearly_purchases,
+        "avg_gap_days": avg_gap,
+        "avg_order_value": rng.integers(200, 3001, n),
+        "discount_sensitivity": pd.Categorical.from_codes(sensitivity, SENSITIVITIES),
+        "online_ratio": online,
+        "days_since_last_purchase": days_since_last,
+        "churned": (risk_score > 0.5).astype(np.int8)  # The Target Variable
+    })
+
+
+def generate_transactions(customers: pd.DataFrame, rng: np.random.Generator, as_of: date = None) -> pd.DataFrame:
+    """
+    Purchase events consistent with each customer's profile, vectorized.
+
+    Each customer gets `yearly_purchase_count` purchases: the most recent
+    exactly `days_since_last_purchase` days before `as_of`, the rest spread
+    over the preceding year. Amounts scatter around `avg_order_value`,
+    channel follows `online_ratio`, discounts follow sensitivity, and most
+    purchases fall in the primary/secondary categories.
+    """
+    as_of = np.datetime64(as_of or date.today(), "s")
+    counts = customers["yearly_purchase_count"].to_numpy()
+    owner = np.repeat(np.arange(len(customers)), counts)
+    m = len(owner)
+
+    last_days = customers["days_since_last_purchase"].to_numpy()[owner]
+    first_of_customer = np.zeros(m, dtype=bool)
+    first_of_customer[np.cumsum(counts) - counts] = True
+    spread = np.maximum(365 - last_days, 0)
+    days_ago = np.where(first_of_customer, last_days, last_days + rng.random(m) * spread)
+    seconds_ago = (days_ago * 86400 + rng.integers(0, 86400, m) * ~first_of_customer).astype("int64")
+
+    aov = customers["avg_order_value"].to_numpy()[owner]
+    sensitivity = customers["discount_sensitivity"].cat.codes.to_numpy()[owner]
+
+    primary = customers["primary_category"].cat.codes.to_numpy()[owner]
+    secondary = customers["secondary_category"].cat.codes.to_numpy()[owner]
+    pick = rng.random(m)
+    category = np.where(pick < 0.6, primary, np.where(pick < 0.85, secondary, rng.integers(0, len(CATEGORIES), m)))
+
+    return pd.DataFrame({
+        "customer_id": customers["customer_id"].to_numpy()[owner],
+        "timestamp": as_of - seconds_ago.astype("timedelta64[s]"),
+        "amount": np.round(aov * rng.gamma(4.0, 0.25, m), 2),
+        "channel": pd.Categorical.from_codes(
+            (rng.random(m) >= customers["online_ratio"].to_numpy()[owner]).astype(np.int8), ["online", "store"]
+        ),
+        "discount_used": rng.random(m) < DISCOUNT_USE_RATE[sensitivity],
+        "category": pd.Categorical.from_codes(category, CATEGORIES),
+    })
+
+
+class _ChunkWriter:
+    """Appends DataFrame chunks to a single CSV or Parquet file."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._parquet = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            self._write_csv(df)
+        self._first = False
+
+    def _write_csv(self, df: pd.DataFrame):
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+        except ImportError:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+            return
+        # Arrow's CSV writer is several times faster than DataFrame.to_csv
+        options = pacsv.WriteOptions(include_header=self._first, quoting_style="needed")
+        with open(self.path, "wb" if self._first else "ab") as f:
+            pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), f, options)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def generate_dataset(
+    n: int = 50000,
+    seed: int = None,
+    output_dir: str = "data",
+    fmt: str = "csv",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    transactions: bool = False,
+    as_of: date = None,
+    transactions_for: str = "history",
+) -> dict:
+    """
+    Generate and write the training, live and (optionally) transaction files.
+
+    `transactions_for` picks the ids the transactions are keyed by: the
+    labeled history ("history"), the live snapshot ("live") or both.
+
+    Returns:
+        dict: Output paths, row counts and elapsed seconds.
+    """
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown format '{fmt}' (expected 'csv' or 'parquet')")
+    if transactions_for not in ("history", "live", "both"):
+        raise ValueError(f"Unknown transactions_for '{transactions_for}' (expected 'history', 'live' or 'both')")
+
+    start_time = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "training": os.path.join(output_dir, f"churn_training_data.{fmt}"),
+        "live": os.path.join(output_dir, f"freshmart_customers_big.{fmt}"),
+    }
+    if transactions and transactions_for in ("history", "both"):
+        paths["transactions"] = os.path.join(output_dir, f"freshmart_transactions.{fmt}")
+    if transactions and transactions_for in ("live", "both"):
+        paths["live_transactions"] = os.path.join(output_dir, f"freshmart_live_transactions.{fmt}")
+    writers = {name: _ChunkWriter(path, fmt) for name, path in paths.items()}
+
+    n_transactions = 0
+    chunk_seeds = np.random.SeedSequence(seed).spawn((n + chunk_size - 1) // chunk_size)
+    try:
+        for i, chunk_seed in enumerate(chunk_seeds):
+            rng = np.random.default_rng(chunk_seed)
+            start = i * chunk_size
+            df = generate_customer_frame(min(chunk_size, n - start), rng, start)
+            writers["training"].write(df)
+
+            # The 'live' snapshot: same customers, new ids, no label
+            live = df.drop(columns=["churned"])
+            live["customer_id"] = _ids("FM_CUST_", start, len(df))
+            writers["live"].write(live)
+
+            if transactions:
+                events = generate_transactions(df, rng, as_of)
+                n_transactions += len(events)
+                if "transactions" in writers:
+                    writers["transactions"].write(events)
+                if "live_transactions" in writers:
+                    # Same purchases; events are grouped by customer in row order
+                    counts = df["yearly_purchase_count"].to_numpy()
+                    events["customer_id"] = np.repeat(live["customer_id"].to_numpy(), counts)
+                    writers["live_transactions"].write(events)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return {
+        "paths": paths,
+        "customers": n,
+        "transactions": n_transactions,
+        "seconds": round(time.perf_counter() - start_time, 2),
+    }
+
+
+def generate_freshmart_customers(n=50000, seed=None):
+    """Write the default training and live CSVs used by the app."""
+    result = generate_dataset(n, seed=seed)
+    print(f"Generated {n} labeled training records to {result['paths']['training']} 🧠")
+    print(f"Generated {n} live customer records to {result['paths']['live']} 🛍️")
+
 
 if __name__ == "__main__":
-    generate_freshmart_customers()
+    parser = argparse.ArgumentParser(description="Generate synthetic FreshMart data.")
+    parser.add_argument("--n", type=int, default=50000, help="Number of customers")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible output")
+    parser.add_argument("--output-dir", default="data")
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Customers generated per chunk")
+    parser.add_argument("--transactions", action="store_true", help="Also generate purchase-level events")
+    parser.add_argument("--as-of", default=None, help="Snapshot date YYYY-MM-DD for transactions (default: today)")
+    parser.add_argument(
+        "--transactions-for", default="history", choices=["history", "live", "both"],
+        help="Key transactions by the history (FM_HIST_) ids, the live (FM_CUST_) ids, or both",
+    )
+    args = parser.parse_args()
+
+    as_of_date = date.fromisoformat(args.as_of) if args.as_of else None
+    summary = generate_dataset(
+        args.n, args.seed, args.output_dir, args.format, args.chunk_size, args.transactions, as_of_date,
+        args.transactions_for,
+    )
+    print(
+        f"Generated {summary['customers']} customers"
+        + (f" and {summary['transactions']} transactions" if args.transactions else "")
+        + f" in {summary['seconds']}s 🛍️"
+    )
+    for name, path in summary["paths"].items():
+        print(f"  {name}: {path}")
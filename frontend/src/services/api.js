@@ -73,6 +73,23 @@ export const simulateComparison = async (payload) => {
     }
 };
 
+/**
+ * Evaluate a full grid of interventions (discounts x loyalty bonuses x channels)
+ * for a customer in a single request.
+ * 
+ * @param {Object} payload - { customer_id, discount_levels, loyalty_bonus_levels, channels }
+ * @returns {Promise<Object>} - Grid results, Pareto frontier and best strategy.
+ */
+export const simulateGrid = async (payload) => {
+    try {
+        const response = await apiClient.post('/api/churn/simulate-grid', payload);
+        return response.data;
+    } catch (error) {
+        handleApiError(error);
+        throw error;
+    }
+};
+
 /**
  * Generate a personalized outreach draft.
  * 
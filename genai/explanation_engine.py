@@ -3,7 +3,8 @@ import json
 import logging
 from typing import Dict, Any, List
 from dotenv import load_dotenv
-from groq import Groq
+
+from core import config
 
 # Load environment variables
 load_dotenv()
@@ -18,10 +19,17 @@ class GenAIExplanationEngine:
     
     def __init__(self):
         self.api_key = os.getenv("GROQ_API_KEY")
-        if not self.api_key:
+        if config.LLM_STUB_ENABLED:
+            # Load testing: simulated LLM with configurable latency / errors
+            from genai.llm_stub import StubGroqClient
+            self.client = StubGroqClient(config.LLM_STUB_LATENCY_MS, config.LLM_STUB_ERROR_RATE)
+            logger.info("Using in-process LLM stub instead of Groq.")
+        elif not self.api_key:
             logger.warning("GROQ_API_KEY not found in .env. Explanations might fail.")
             self.client = None
         else:
+            # Imported here: the groq SDK is slow to import and unused with the stub
+            from groq import Groq
             self.client = Groq(api_key=self.api_key)
             
     def generate_explanation(self, customer_features: dict, churn_probability: float, churn_risk: str, context: dict = None) -> dict:
@@ -65,7 +73,7 @@ class GenAIExplanationEngine:
             return result
             
         except Exception as e:
-            logger.error(f"Groq API call failed: {e}")
+            logger.error("Groq API call failed: %s", e)
             return self._fallback_explanation(customer_features, churn_risk)
 
     def generate_outreach_draft(self, customer_features: dict, intervention: dict) -> dict:
@@ -124,7 +132,7 @@ class GenAIExplanationEngine:
             return json.loads(response_content)
 
         except Exception as e:
-            logger.error(f"Outreach generation failed: {e}")
+            logger.error("Outreach generation failed: %s", e)
             return {
                 "subject_line": f"Exclusive FreshMart Offer for you!",
                 "message_body": f"We've got something special for your next {customer_features.get('primary_category')} shop. See you soon!",
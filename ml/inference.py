@@ -1,14 +1,47 @@
 import joblib
+import numpy as np
 import pandas as pd
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+# Features expected by the model in exact order (from train.py)
+MODEL_FEATURES = [
+    "yearly_purchase_count",
+    "avg_gap_days",
+    "days_since_last_purchase",
+    "avg_order_value",
+    "online_ratio",
+    "discount_sensitivity"
+]
+
+# Map string values to integers as done in training
+SENSITIVITY_MAP = {"Low": 0, "Medium": 1, "High": 2}
+
+
+def encode_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Model feature columns in training order. `discount_sensitivity` may be
+    given either as the raw label (Low/Medium/High) or already encoded.
+    """
+    encoded = df.reindex(columns=MODEL_FEATURES)
+    sens = encoded["discount_sensitivity"]
+    if not pd.api.types.is_numeric_dtype(sens):
+        encoded["discount_sensitivity"] = sens.map(SENSITIVITY_MAP).fillna(1).astype(int)
+    return encoded
+
+
 class ChurnModel:
     def __init__(self, model_path="ml/churn_model.pkl"):
         self.model = None
         self.model_path = model_path
+        # Bumped on every (re)load; response caches key on it
+        self.version = 0
+        self._load_model()
+
+    def reload(self):
+        """Load the model file again (e.g. after a new model was promoted)."""
         self._load_model()
 
     def _load_model(self):
@@ -21,6 +54,7 @@ class ChurnModel:
                 self.model = None
         else:
             logger.warning(f"⚠️ Model file not found at {self.model_path}. Using fallback.")
+        self.version += 1
 
     def predict_churn_probability(self, features: dict) -> float:
         """
@@ -29,29 +63,15 @@ class ChurnModel:
         """
         if self.model:
             try:
-                # Features expected by the model in exact order (from train.py)
-                expected_features = [
-                    "yearly_purchase_count",
-                    "avg_gap_days",
-                    "days_since_last_purchase",
-                    "avg_order_value",
-                    "online_ratio",
-                    "discount_sensitivity"
-                ]
-
-                # Preprocessing: Handle discount_sensitivity encoding
-                # Map string values to integers as done in training
-                sensitivity_map = {"Low": 0, "Medium": 1, "High": 2}
-                
                 # Create a copy to avoid modifying the input dict
                 processed_features = features.copy()
                 
                 raw_sens = processed_features.get("discount_sensitivity", "Medium")
-                processed_features["discount_sensitivity"] = sensitivity_map.get(raw_sens, 1) # Default to Medium (1)
+                processed_features["discount_sensitivity"] = SENSITIVITY_MAP.get(raw_sens, 1) # Default to Medium (1)
 
                 # Convert to DataFrame with specific columns and order
                 # This drops extra columns (like primary_category) and enforces order
-                input_df = pd.DataFrame([processed_features])[expected_features]
+                input_df = pd.DataFrame([processed_features])[MODEL_FEATURES]
                 
                 # Get probability for class 1 (Churn)
                 prob = self.model.predict_proba(input_df)[0][1]
@@ -71,37 +91,38 @@ class ChurnModel:
 
         if self.model:
             try:
-                expected_features = [
-                    "yearly_purchase_count",
-                    "avg_gap_days",
-                    "days_since_last_purchase",
-                    "avg_order_value",
-                    "online_ratio",
-                    "discount_sensitivity"
-                ]
-                sensitivity_map = {"Low": 0, "Medium": 1, "High": 2}
-
-                # Preprocessing loop (faster than DataFrame apply for list of dicts)
-                processed_list = []
-                for f in features_list:
-                    pf = f.copy()
-                    raw_sens = pf.get("discount_sensitivity", "Medium")
-                    pf["discount_sensitivity"] = sensitivity_map.get(raw_sens, 1)
-                    processed_list.append(pf)
-                
-                # Bulk DataFrame creation
-                input_df = pd.DataFrame(processed_list)[expected_features]
-                
-                # Bulk Prediction
-                # predict_proba returns [ [prob_0, prob_1], ... ]
-                probs = self.model.predict_proba(input_df)[:, 1]
-                return probs.tolist()
+                # Bulk DataFrame creation, then one vectorized prediction
+                return self.predict_churn_frame(pd.DataFrame(features_list)).tolist()
             except Exception as e:
                 logger.error(f"Batch prediction error: {e}")
         
         # Fallback loop
         return [self._heuristic_fallback(f) for f in features_list]
 
+    def predict_churn_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Vectorized prediction for a DataFrame of customers.
+
+        `discount_sensitivity` may be given either as the raw label
+        (Low/Medium/High) or already encoded. Extra columns are ignored.
+        Returns an array of churn probabilities aligned with the rows of `df`.
+        """
+        if len(df) == 0:
+            return np.empty(0, dtype=float)
+
+        input_df = encode_features(df)
+
+        if self.model:
+            try:
+                # predict_proba returns [ [prob_0, prob_1], ... ]
+                return self.model.predict_proba(input_df)[:, 1]
+            except Exception as e:
+                logger.error(f"Frame prediction error: {e}")
+
+        days = np.minimum(input_df["days_since_last_purchase"].to_numpy(dtype=float) / 90, 1.0)
+        vol = np.minimum(input_df["yearly_purchase_count"].to_numpy(dtype=float) / 52, 1.0)
+        return (days * 0.5) + ((1 - vol) * 0.3)
+
     def _heuristic_fallback(self, features: dict) -> float:
         """Original rule-based logic as safeguard."""
         days = min(features.get('days_since_last_purchase', 0) / 90, 1.0)
@@ -0,0 +1,356 @@
+"""
+RFM feature engineering from raw transaction logs.
+
+Derives the model features (ml.train.FEATURES) plus windowed features from
+a transaction table, so training sets can be rebuilt from the source of
+truth instead of the precomputed customer CSV.
+
+Input columns (CSV or Parquet):
+    customer_id, timestamp, amount          required
+    channel                                 optional, "online" counts toward online_ratio
+    discount_amount or discount_used        optional, amount > 0 or a true flag marks
+                                            a discounted order
+
+Point-in-time correctness: features for an `as_of` date only use
+transactions strictly before that date, and the optional label
+(`churned`) only looks at [as_of, as_of + horizon). Several as_of dates
+can be computed in one pass, e.g. monthly snapshots for a training set.
+
+Scale: the table is streamed in chunks (CSV `chunksize`, Parquet record
+batches), never loaded whole. Each chunk is reduced to per-customer
+partial aggregates (counts, sums, first/last purchase day), all of them
+sums, mins or maxes, so partials merge exactly. The group-reduce sorts the
+factorized customer codes once and applies np.add/minimum/maximum.reduceat
+over the contiguous runs. Partials are merged whenever they exceed
+`merge_rows`, so memory is bounded by the number of customers, not
+transactions.
+
+Features (window = last `window_days`, default 365, before as_of):
+    days_since_last_purchase   as_of - last purchase
+    yearly_purchase_count      purchases in the window
+    avg_gap_days               mean gap between purchases in the window
+                               ((last - first) / (n - 1)); all-time when
+                               the window has fewer than 2, else tenure
+    avg_order_value            window spend / window purchases
+    online_ratio               online share of window purchases
+    discount_sensitivity       Low/Medium/High by discounted-order share
+                               (only with a discount column; otherwise the
+                               CLI can join it from a customer table)
+    purchases_30d, purchases_90d, spend_90d
+    frequency_trend            90-day purchase rate / window rate (< 1 = slowing)
+    tenure_days                as_of - first purchase
+
+Usage:
+    python data/generate_freshmart_data.py --n 100000 --transactions --as-of 2024-06-01
+    # as_of + horizon must stay inside the log, or every customer is labeled churned
+    python -m ml.rfm --transactions data/freshmart_transactions.csv --as-of 2024-04-01 \\
+        --label-horizon-days 60 --output data/rfm_training.parquet
+    python -m ml.train --data data/rfm_training.parquet
+
+    # Logs without a discount column: join discount_sensitivity from the
+    # customer table with the same ids (FM_HIST_ ids for generated logs)
+    python -m ml.rfm --transactions data/freshmart_transactions.csv --as-of 2024-04-01 \\
+        --label-horizon-days 60 --customers data/churn_training_data.csv \\
+        --output data/rfm_training.parquet
+"""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from ml.train import FEATURES, stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 365
+DEFAULT_CHUNKSIZE = 2_000_000
+DEFAULT_MERGE_ROWS = 5_000_000
+
+REQUIRED_COLUMNS = ["customer_id", "timestamp", "amount"]
+DISCOUNT_COLUMNS = ["discount_amount", "discount_used"]
+OPTIONAL_COLUMNS = ["channel"] + DISCOUNT_COLUMNS
+
+# Discounted-order share thresholds for discount_sensitivity
+DISCOUNT_BANDS = ((0.2, "Low"), (0.5, "Medium"), (1.01, "High"))
+
+_NO_DAY_MIN = np.iinfo(np.int32).max
+_NO_DAY_MAX = np.iinfo(np.int32).min
+
+# Partial aggregate -> reducer (np ufunc used with reduceat)
+AGGREGATES = {
+    "n_all": np.add,
+    "first_all": np.minimum,
+    "last_all": np.maximum,
+    "n_window": np.add,
+    "first_window": np.minimum,
+    "last_window": np.maximum,
+    "spend_window": np.add,
+    "online_window": np.add,
+    "discounted_window": np.add,
+    "n_90": np.add,
+    "spend_90": np.add,
+    "n_30": np.add,
+    "n_label": np.add,
+}
+
+
+# --------------------------------------------------
+# Chunked input
+# --------------------------------------------------
+def _available_columns(path: str) -> list:
+    if path.endswith(".csv"):
+        return list(pd.read_csv(path, nrows=0).columns)
+    import pyarrow.parquet as pq
+    return list(pq.read_schema(path).names)
+
+
+def iter_transactions(path: str, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Yield the transaction table in DataFrame chunks, reading only the used columns."""
+    available = _available_columns(path)
+    missing = [c for c in REQUIRED_COLUMNS if c not in available]
+    if missing:
+        raise ValueError(f"Transactions missing required columns: {missing}")
+    columns = REQUIRED_COLUMNS + [c for c in OPTIONAL_COLUMNS if c in available]
+
+    if path.endswith(".csv"):
+        dtypes = {
+            "customer_id": "str", "amount": "float64", "channel": "category",
+            "discount_amount": "float64", "discount_used": "str",
+        }
+        yield from pd.read_csv(
+            path,
+            usecols=columns,
+            dtype={c: t for c, t in dtypes.items() if c in columns},
+            parse_dates=["timestamp"],
+            chunksize=chunksize,
+        )
+    else:
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+
+def _discounted(chunk: pd.DataFrame) -> np.ndarray:
+    """True for discounted orders (discount_amount > 0 or a true discount_used flag)."""
+    discounted = np.zeros(len(chunk), dtype=bool)
+    if "discount_amount" in chunk:
+        discounted |= np.nan_to_num(chunk["discount_amount"].to_numpy(dtype=np.float64)) > 0
+    if "discount_used" in chunk:
+        flags = chunk["discount_used"]
+        if pd.api.types.is_bool_dtype(flags):
+            discounted |= flags.fillna(False).to_numpy(dtype=bool)
+        else:
+            discounted |= flags.astype(str).str.strip().str.lower().isin(("true", "1", "yes")).to_numpy()
+    return discounted
+
+
+def _to_day(as_of) -> int:
+    """Day number (days since 1970-01-01) of a date-like value."""
+    return int(np.datetime64(pd.Timestamp(as_of).date(), "D").astype(np.int64))
+
+
+# --------------------------------------------------
+# Group-reduce
+# --------------------------------------------------
+def group_reduce(keys: np.ndarray, columns: dict) -> tuple:
+    """
+    Reduce `columns` (name -> array aligned with `keys`) per key with the
+    AGGREGATES ufuncs. Returns (unique keys, reduced columns).
+    """
+    codes, uniques = pd.factorize(keys)
+    if len(codes) == 0:
+        return np.asarray(uniques, dtype=object), {n: v[:0] for n, v in columns.items()}
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    # Every code 0..k-1 occurs, so run i of the sorted codes belongs to uniques[i]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    reduced = {name: AGGREGATES[name].reduceat(values[order], starts) for name, values in columns.items()}
+    return np.asarray(uniques, dtype=object), reduced
+
+
+def chunk_partials(chunk: pd.DataFrame, as_of_day: int, window_days: int, label_horizon_days: int = None) -> tuple:
+    """Per-customer partial aggregates of one chunk for one as_of date."""
+    timestamps = pd.to_datetime(chunk["timestamp"])
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert(None)
+    days = timestamps.to_numpy().astype("datetime64[D]").astype(np.int64).astype(np.int32)
+    before = days < as_of_day
+    label = np.zeros(len(chunk), dtype=bool)
+    if label_horizon_days:
+        label = (days >= as_of_day) & (days < as_of_day + label_horizon_days)
+    keep = before | label
+    if not keep.all():
+        chunk, days, before, label = chunk[keep], days[keep], before[keep], label[keep]
+
+    amount = chunk["amount"].to_numpy(dtype=np.float64)
+    window = before & (days >= as_of_day - window_days)
+    last_90 = before & (days >= as_of_day - 90)
+    if "channel" in chunk:
+        online = chunk["channel"].astype(str).str.lower().to_numpy() == "online"
+    else:
+        online = np.zeros(len(chunk), dtype=bool)
+    discounted = _discounted(chunk)
+
+    columns = {
+        "n_all": before.astype(np.int64),
+        "first_all": np.where(before, days, _NO_DAY_MIN),
+        "last_all": np.where(before, days, _NO_DAY_MAX),
+        "n_window": window.astype(np.int64),
+        "first_window": np.where(window, days, _NO_DAY_MIN),
+        "last_window": np.where(window, days, _NO_DAY_MAX),
+        "spend_window": np.where(window, amount, 0.0),
+        "online_window": (window & online).astype(np.int64),
+        "discounted_window": (window & discounted).astype(np.int64),
+        "n_90": last_90.astype(np.int64),
+        "spend_90": np.where(last_90, amount, 0.0),
+        "n_30": (before & (days >= as_of_day - 30)).astype(np.int64),
+        "n_label": label.astype(np.int64),
+    }
+    return group_reduce(chunk["customer_id"].astype(str).to_numpy(dtype=object), columns)
+
+
+def merge_partials(partials: list) -> tuple:
+    """Combine (keys, columns) partials into one."""
+    if len(partials) == 1:
+        return partials[0]
+    keys = np.concatenate([k for k, _ in partials])
+    columns = {name: np.concatenate([c[name] for _, c in partials]) for name in AGGREGATES}
+    return group_reduce(keys, columns)
+
+
+# --------------------------------------------------
+# Features
+# --------------------------------------------------
+def features_from_aggregates(keys, agg: dict, as_of_day: int, window_days: int,
+                             has_discounts: bool, label_horizon_days: int = None) -> pd.DataFrame:
+    """Feature frame for customers with at least one purchase before as_of."""
+    active = agg["n_all"] > 0
+    keys = keys[active]
+    agg = {name: values[active] for name, values in agg.items()}
+
+    n_window = agg["n_window"].astype(np.float64)
+    n_all = agg["n_all"].astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        window_gap = (agg["last_window"] - agg["first_window"]) / (n_window - 1)
+        all_time_gap = (agg["last_all"] - agg["first_all"]) / (n_all - 1)
+        tenure = (as_of_day - agg["first_all"]).astype(np.float64)
+        avg_gap = np.where(n_window >= 2, window_gap, np.where(n_all >= 2, all_time_gap, tenure))
+        avg_order_value = np.where(n_window > 0, agg["spend_window"] / n_window, 0.0)
+        online_ratio = np.where(n_window > 0, agg["online_window"] / n_window, 0.0)
+        frequency_trend = np.where(n_window > 0, (agg["n_90"] * (window_days / 90)) / n_window, 0.0)
+
+    out = pd.DataFrame({
+        "customer_id": keys,
+        "as_of": pd.Timestamp(np.datetime64(as_of_day, "D")),
+        "yearly_purchase_count": agg["n_window"].astype(np.float32),
+        "avg_gap_days": avg_gap.astype(np.float32),
+        "days_since_last_purchase": (as_of_day - agg["last_all"]).astype(np.float32),
+        "avg_order_value": avg_order_value.astype(np.float32),
+        "online_ratio": online_ratio.astype(np.float32),
+        "purchases_30d": agg["n_30"].astype(np.float32),
+        "purchases_90d": agg["n_90"].astype(np.float32),
+        "spend_90d": agg["spend_90"].astype(np.float32),
+        "frequency_trend": frequency_trend.astype(np.float32),
+        "tenure_days": tenure.astype(np.float32),
+    })
+    if has_discounts:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = np.where(n_window > 0, agg["discounted_window"] / n_window, 0.0)
+        thresholds = [t for t, _ in DISCOUNT_BANDS]
+        labels = np.array([name for _, name in DISCOUNT_BANDS], dtype=object)
+        out["discount_sensitivity"] = labels[np.searchsorted(thresholds, share, side="right")]
+    if label_horizon_days:
+        out["churned"] = (agg["n_label"] == 0).astype(np.int8)
+    return out
+
+
+def compute_rfm(
+    transactions: str,
+    as_of,
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    label_horizon_days: int = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    merge_rows: int = DEFAULT_MERGE_ROWS,
+) -> pd.DataFrame:
+    """
+    Point-in-time features for every customer with a purchase before each
+    as_of date, in one streaming pass over `transactions`.
+
+    Args:
+        transactions: Transaction table (CSV/Parquet).
+        as_of: One date or a list of dates (features use transactions strictly before it).
+        window_days: Lookback of the yearly features.
+        label_horizon_days: Add `churned` = no purchase in [as_of, as_of + horizon).
+            The data must extend past as_of + horizon for the label to be meaningful.
+        chunksize: Transactions per chunk.
+        merge_rows: Merge pending partials once they hold this many rows.
+
+    Returns:
+        DataFrame with customer_id, as_of, the model features and the
+        windowed features (one row per customer and as_of).
+    """
+    as_of_days = [_to_day(d) for d in (as_of if isinstance(as_of, (list, tuple)) else [as_of])]
+    pending = {day: [] for day in as_of_days}
+    has_discounts = any(c in DISCOUNT_COLUMNS for c in _available_columns(transactions))
+    rows = 0
+
+    with stage("rfm_aggregate"):
+        for chunk in iter_transactions(transactions, chunksize):
+            rows += len(chunk)
+            for day in as_of_days:
+                pending[day].append(chunk_partials(chunk, day, window_days, label_horizon_days))
+                if sum(len(k) for k, _ in pending[day]) > merge_rows:
+                    pending[day] = [merge_partials(pending[day])]
+            logger.info("Aggregated %s transactions", f"{rows:,}")
+
+    frames = []
+    for day in as_of_days:
+        if not pending[day]:
+            continue
+        keys, agg = merge_partials(pending[day])
+        frames.append(features_from_aggregates(keys, agg, day, window_days, has_discounts, label_horizon_days))
+    if not frames:
+        return pd.DataFrame(columns=["customer_id", "as_of"] + [f for f in FEATURES if f != "discount_sensitivity"])
+    result = pd.concat(frames, ignore_index=True)
+    logger.info("RFM features for %s customer snapshots from %s transactions", len(result), f"{rows:,}")
+    return result
+
+
+# --------------------------------------------------
+# Script Entry Point
+# --------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute RFM features from a transaction log.")
+    parser.add_argument("--transactions", required=True, help="Transaction table (CSV/Parquet)")
+    parser.add_argument("--as-of", action="append", required=True, help="Snapshot date (repeatable)")
+    parser.add_argument("--window-days", type=int, default=DEFAULT_WINDOW_DAYS)
+    parser.add_argument("--label-horizon-days", type=int, default=None, help="Add the churned label")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--customers", default=None,
+                        help="Customer table to take discount_sensitivity from when transactions have no discounts")
+    parser.add_argument("--output", required=True, help="Output file (.csv or .parquet)")
+    args = parser.parse_args()
+
+    features = compute_rfm(args.transactions, args.as_of, args.window_days, args.label_horizon_days, args.chunksize)
+    if features.empty:
+        raise SystemExit(f"No customers have purchases before {args.as_of}")
+    if args.customers and "discount_sensitivity" not in features:
+        profiles = pd.read_csv(args.customers, usecols=["customer_id", "discount_sensitivity"], dtype=str)
+        features = features.merge(profiles, on="customer_id", how="left")
+        if features["discount_sensitivity"].isna().all():
+            raise SystemExit(f"No customer_id in {args.transactions} matched {args.customers}")
+    # A one-class label can't be trained on (e.g. as_of + horizon past the end of the log)
+    if args.label_horizon_days and features["churned"].nunique() < 2:
+        raise SystemExit(
+            f"Every row has churned={features['churned'].iloc[0]}: choose an --as-of at least "
+            f"{args.label_horizon_days} days before the end of the transaction log"
+        )
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    if args.output.endswith(".csv"):
+        features.to_csv(args.output, index=False)
+    else:
+        features.to_parquet(args.output, index=False)
+    logger.info("💾 Saved %s rows to %s", len(features), args.output)
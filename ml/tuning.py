@@ -0,0 +1,231 @@
+"""
+Parallel hyperparameter search and cross-validation harness.
+
+Runs a configurable search over model families and hyperparameters with
+stratified k-fold CV. Every (candidate, fold) pair is a task in a process
+pool; workers memory-map the cached feature matrix written by
+ml.train.load_feature_matrix, so the dataset is parsed once and shared
+through the page cache instead of being pickled to each worker.
+
+For every candidate the leaderboard records CV AUC / accuracy, fit time
+and inference latency (batch per-row and single-row), plus whether the
+candidate is on the quality-vs-serving-cost Pareto frontier.
+
+Usage:
+    python -m ml.train tune --data data/churn_training_data.csv --folds 5 --workers 4
+    python -m ml.train tune --space my_space.json --search random --n-iter 20
+"""
+
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# family -> {param: [values]}
+DEFAULT_SEARCH_SPACE = {
+    "random_forest": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [6, 8, 12],
+    },
+    "extra_trees": {
+        "n_estimators": [100, 200],
+        "max_depth": [8, 12],
+    },
+    "gradient_boosting": {
+        "n_estimators": [100, 200],
+        "max_depth": [2, 3],
+        "learning_rate": [0.1],
+    },
+    "hist_gradient_boosting": {
+        "max_iter": [100, 200],
+        "max_depth": [None, 6],
+        "learning_rate": [0.1],
+    },
+    "logistic_regression": {
+        "C": [0.1, 1.0],
+    },
+}
+
+# Rows timed one at a time for single-row latency
+SINGLE_ROW_SAMPLES = 20
+
+
+def build_estimator(family: str, params: dict):
+    """Instantiate a single-threaded estimator for `family` with `params`."""
+    from sklearn.ensemble import (
+        RandomForestClassifier,
+        ExtraTreesClassifier,
+        GradientBoostingClassifier,
+        HistGradientBoostingClassifier,
+    )
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    # Workers are already parallel; nested threading would oversubscribe cores
+    if family == "random_forest":
+        return RandomForestClassifier(random_state=42, class_weight="balanced", n_jobs=1, **params)
+    if family == "extra_trees":
+        return ExtraTreesClassifier(random_state=42, class_weight="balanced", n_jobs=1, **params)
+    if family == "gradient_boosting":
+        return GradientBoostingClassifier(random_state=42, **params)
+    if family == "hist_gradient_boosting":
+        return HistGradientBoostingClassifier(random_state=42, **params)
+    if family == "logistic_regression":
+        return make_pipeline(StandardScaler(), LogisticRegression(class_weight="balanced", max_iter=1000, **params))
+    raise ValueError(f"Unknown model family '{family}'")
+
+
+def expand_search_space(space: dict, search: str = "grid", n_iter: int = 20, seed: int = 42) -> list:
+    """
+    List of (family, params) candidates from a search space.
+
+    Args:
+        search: "grid" for the full cartesian product per family, "random"
+            for `n_iter` candidates sampled from it.
+    """
+    candidates = []
+    for family, grid in space.items():
+        names = list(grid)
+        for values in itertools.product(*(grid[n] for n in names)):
+            candidates.append((family, dict(zip(names, values))))
+
+    if search == "random" and n_iter < len(candidates):
+        candidates = random.Random(seed).sample(candidates, n_iter)
+    return candidates
+
+
+def _evaluate_fold(x_path: str, y_path: str, family: str, params: dict, folds: int, fold: int) -> dict:
+    """Worker: fit one candidate on one CV fold of the memory-mapped matrix."""
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+
+    X = np.load(x_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+
+    # Deterministic split recomputed in the worker: cheaper than shipping indices
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    train_idx, val_idx = next(itertools.islice(splitter.split(np.zeros(len(y)), y), fold, None))
+
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_val, y_val = X[val_idx], y[val_idx]
+
+    model = build_estimator(family, params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probs = model.predict_proba(X_val)[:, 1]
+    batch_seconds = time.perf_counter() - start
+
+    single = []
+    for i in range(min(SINGLE_ROW_SAMPLES, len(X_val))):
+        row = X_val[i:i + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        single.append(time.perf_counter() - start)
+
+    return {
+        "auc": float(roc_auc_score(y_val, probs)),
+        "accuracy": float(accuracy_score(y_val, probs >= 0.5)),
+        "fit_seconds": fit_seconds,
+        "batch_latency_us_per_row": batch_seconds / len(X_val) * 1e6,
+        "single_row_latency_ms": float(np.median(single) * 1e3),
+    }
+
+
+def _pareto_flags(quality: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """True where no other candidate has higher quality and lower cost."""
+    flags = np.ones(len(quality), dtype=bool)
+    for i in range(len(quality)):
+        dominated = (quality >= quality[i]) & (cost <= cost[i]) & ((quality > quality[i]) | (cost < cost[i]))
+        flags[i] = not dominated.any()
+    return flags
+
+
+def run_search(
+    data_path: str,
+    space: dict = None,
+    search: str = "grid",
+    n_iter: int = 20,
+    folds: int = 5,
+    workers: int = None,
+    output_path: str = "benchmarks/results/tuning_leaderboard.csv",
+) -> pd.DataFrame:
+    """
+    Cross-validate every candidate in the search space in a process pool.
+
+    Returns:
+        pd.DataFrame: Leaderboard sorted by mean CV AUC (also written to
+        `output_path` as CSV, with a JSON copy next to it).
+    """
+    from ml.train import cache_paths, load_feature_matrix
+
+    space = space or DEFAULT_SEARCH_SPACE
+    candidates = expand_search_space(space, search, n_iter)
+    workers = workers or os.cpu_count() or 1
+
+    # Make sure the shared .npy matrix exists before the workers map it
+    load_feature_matrix(data_path, use_cache=True, mmap=True)
+    x_path, y_path = cache_paths(data_path)
+
+    logger.info(f"🔎 Tuning {len(candidates)} candidates x {folds} folds on {workers} workers...")
+    start = time.perf_counter()
+
+    fold_results = {i: [] for i in range(len(candidates))}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_evaluate_fold, x_path, y_path, family, params, folds, fold): i
+            for i, (family, params) in enumerate(candidates)
+            for fold in range(folds)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                fold_results[i].append(future.result())
+            except Exception as e:
+                family, params = candidates[i]
+                logger.error(f"Candidate {family} {params} failed: {e}")
+
+    rows = []
+    for i, (family, params) in enumerate(candidates):
+        results = fold_results[i]
+        if not results:
+            continue
+        frame = pd.DataFrame(results)
+        rows.append({
+            "family": family,
+            "params": json.dumps(params, sort_keys=True),
+            "folds": len(results),
+            "auc_mean": frame["auc"].mean(),
+            "auc_std": frame["auc"].std(ddof=0),
+            "accuracy_mean": frame["accuracy"].mean(),
+            "fit_seconds_mean": frame["fit_seconds"].mean(),
+            "batch_latency_us_per_row": frame["batch_latency_us_per_row"].median(),
+            "single_row_latency_ms": frame["single_row_latency_ms"].median(),
+        })
+
+    leaderboard = pd.DataFrame(rows)
+    if not leaderboard.empty:
+        leaderboard["pareto_optimal"] = _pareto_flags(
+            leaderboard["auc_mean"].to_numpy(), leaderboard["batch_latency_us_per_row"].to_numpy()
+        )
+        leaderboard = leaderboard.sort_values("auc_mean", ascending=False, ignore_index=True)
+        leaderboard.insert(0, "rank", range(1, len(leaderboard) + 1))
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    leaderboard.to_csv(output_path, index=False)
+    leaderboard.to_json(os.path.splitext(output_path)[0] + ".json", orient="records", indent=2)
+
+    logger.info(f"✅ Tuning finished in {time.perf_counter() - start:.1f}s")
+    logger.info(f"🏆 Leaderboard written to: {output_path}")
+    return leaderboard
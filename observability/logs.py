@@ -1,37 +1,190 @@
+"""
+Logging for the FreshMart retention system: non-blocking, structured, sampled.
+
+`setup_logging()` installs a single QueueHandler on the root logger. Callers
+only do a cheap enqueue; a QueueListener thread formats the records and
+writes them to stdout, so a slow terminal, pipe or disk never adds latency
+to a request.
+
+- Lazy formatting: log with %-style arguments
+  (`logger.debug("found %d matches", n)`); disabled levels cost one level
+  check, and the JSON rendering happens on the listener thread.
+- Structured records (LOG_FORMAT=json): one JSON object per line with the
+  timestamp, level, logger, message, request path, trace/span ids and any
+  `extra={...}` fields.
+- Per-route sampling (LOG_ROUTE_SAMPLE_RATIOS="/api/churn/customers=0.01"):
+  the keep/drop decision is taken once per request (see `bind_request`),
+  so a sampled request keeps all of its records. WARNING and above are
+  never sampled out.
+- A full queue drops the record (counted in log_records_dropped_total)
+  instead of blocking the caller.
+
+Usage:
+    from observability.logs import setup_logging, get_logger
+    setup_logging()
+    logger = get_logger(__name__)
+"""
+
+import atexit
+import contextvars
+import json
 import logging
+import queue
+import random
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from opentelemetry import trace
+
+from core import config
+from core.tracing import parse_route_ratios
+from observability.metrics import LOG_RECORDS_DROPPED
+
+# Per-request logging state: (request path, sampled?)
+_request_state = contextvars.ContextVar("log_request_state", default=None)
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+# Longest prefixes first
+_route_ratios = sorted(parse_route_ratios(config.LOG_ROUTE_SAMPLE_RATIOS).items(), key=lambda kv: -len(kv[0]))
+
+
+def bind_request(path: str) -> contextvars.Token:
+    """
+    Start the logging context of a request: decide once whether its
+    sub-WARNING records are kept. Returns a token for `unbind_request`.
+    """
+    sampled = True
+    for prefix, ratio in _route_ratios:
+        if path.startswith(prefix):
+            sampled = ratio >= 1.0 or random.random() < ratio
+            break
+    return _request_state.set((path, sampled))
+
+
+def unbind_request(token: contextvars.Token):
+    _request_state.reset(token)
+
+
+class RouteSamplingFilter(logging.Filter):
+    """Drops sub-WARNING records of requests that were not sampled."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        state = _request_state.get()
+        if state is not None:
+            record.request_path = state[0]
+            if not state[1] and record.levelno < logging.WARNING:
+                return False
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller. Only the %-interpolation of
+    the message happens here (so mutable arguments are captured as they
+    were); JSON rendering and traceback formatting run on the listener.
+    """
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        span = _current_span_context()
+        if span is not None:
+            record.trace_id = format(span.trace_id, "032x")
+            record.span_id = format(span.span_id, "016x")
+        return record
+
+
+def _current_span_context():
+    ctx = trace.get_current_span().get_span_context()
+    return ctx if ctx.is_valid else None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _build_formatter() -> logging.Formatter:
+    if config.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(
+        '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+
+def setup_logging(level: str = None, stream=None) -> QueueListener:
+    """
+    Route all logging through the queue pipeline (idempotent). Existing
+    root handlers (e.g. from basicConfig) are replaced.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(_build_formatter())
+
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+        handler.addFilter(RouteSamplingFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel((level or config.LOG_LEVEL).upper())
+
+        _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Get a configured logger instance for the FreshMart retention system.
-    
+
     Args:
         name (str): The name of the module/component (usually __name__).
-        
+
     Returns:
-        logging.Logger: Configured logger instance.
-    """
-    logger = logging.getLogger(name)
-    
-    # Configure logger if it doesn't have handlers
-    if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Create console handler (stdout)
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setLevel(logging.INFO)
-        
-        # Define format with timestamp and log level
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        handler.setFormatter(formatter)
-        
-        logger.addHandler(handler)
-        
-        # Prevent propagation to root logger to avoid duplicate logs
-        # if root logger is also configured (e.g. by uvicorn)
-        logger.propagate = False
-        
-    return logger
+        logging.Logger: Logger that propagates to the queue pipeline.
+    """
+    setup_logging()
+    return logging.getLogger(name)
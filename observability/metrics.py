@@ -0,0 +1,314 @@
+"""
+In-process metrics registry (counters, gauges, histograms) rendered in the
+Prometheus text exposition format at /metrics.
+
+Kept deliberately small: an observation is a bisect into fixed buckets and
+a couple of additions under a lock, so instrumenting hot paths costs on
+the order of a microsecond and needs no tracing backend.
+
+    from observability.metrics import STAGE_LATENCY, timer
+
+    with timer(STAGE_LATENCY, stage="model"):
+        prob = model.predict(...)
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; tuned for sub-millisecond feature prep up to multi-second LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, **labels):
+        """Child metric for one label combination (created on first use)."""
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels(...)")
+        return self.labels()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _ValueChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    @property
+    def value(self) -> float:
+        return self._default().value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def render(self, name, labelnames, key):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observations in fixed cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def timer(histogram: Histogram, **labels):
+    """Observe the wall time of the block into `histogram`."""
+    target = histogram.labels(**labels) if labels else histogram
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        target.observe(time.perf_counter() - start)
+
+
+# --------------------------------------------------
+# Application metrics
+# --------------------------------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status.",
+    labelnames=("route", "method", "status"),
+)
+
+STAGE_LATENCY = Histogram(
+    "churn_stage_duration_seconds",
+    "Latency of individual request stages (feature_prep, model, competitor_lookup, shap, llm, serialization).",
+    labelnames=("stage",),
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    labelnames=("cache", "result"),
+)
+
+POOL_QUEUE_DEPTH = Gauge(
+    "inference_pool_queue_depth",
+    "Blocking inference calls waiting for a worker in the inference pool.",
+)
+
+POOL_IN_FLIGHT = Gauge(
+    "inference_pool_in_flight",
+    "Blocking inference calls currently running in the inference pool.",
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+
+SINGLEFLIGHT_REQUESTS = Counter(
+    "singleflight_requests_total",
+    "Coalesced calls by group and role (leader computed, follower reused an in-flight result).",
+    labelnames=("group", "role"),
+)
+
+SINGLEFLIGHT_IN_FLIGHT = Gauge(
+    "singleflight_in_flight",
+    "Distinct computations currently in flight per coalescing group.",
+    labelnames=("group",),
+)
+
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total",
+    "/predict requests by admitted service level (full, no_llm, no_shap, precomputed, rejected).",
+    labelnames=("level",),
+)
+
+ADMISSION_LEVEL = Gauge(
+    "admission_level",
+    "Service level applied to the most recent /predict request (0 = full ... 4 = rejected).",
+)
+
+ADMISSION_PRESSURE = Gauge(
+    "admission_pressure",
+    "Load pressure behind the admission level (max of queue depth and latency ratios).",
+)
+
+FEATURE_EVENTS = Counter(
+    "feature_events_total",
+    "Purchase events received by the online feature store, by source (api, file) and result.",
+    labelnames=("source", "result"),
+)
+
+FEATURE_STORE_CUSTOMERS = Gauge(
+    "feature_store_customers",
+    "Customers tracked by the online feature store.",
+)
+
+RESCORED_CUSTOMERS = Counter(
+    "rescored_customers_total",
+    "Customers re-scored by the event-driven rescoring worker.",
+)
+
+RESCORE_PENDING = Gauge(
+    "rescore_pending_customers",
+    "Changed customers waiting for the rescoring worker.",
+)
+
+CHURN_ALERTS = Counter(
+    "churn_alerts_total",
+    "Alerts raised for customers moving into the High risk band.",
+)
+
+DRIFT_OBSERVATIONS = Counter(
+    "drift_observations_total",
+    "Feature rows counted by the drift monitor, by source (online, batch).",
+    labelnames=("source",),
+)
+
+FEATURE_DRIFT_PSI = Gauge(
+    "feature_drift_psi",
+    "Population stability index of a model feature vs. the training reference.",
+    labelnames=("source", "feature"),
+)
+
+FEATURE_DRIFT_KS = Gauge(
+    "feature_drift_ks",
+    "Binned Kolmogorov-Smirnov statistic of a model feature vs. the training reference.",
+    labelnames=("source", "feature"),
+)
@@ -0,0 +1,248 @@
+"""
+Opt-in sampling profiler for the API process.
+
+A single background thread samples every thread's Python stack
+(`sys._current_frames()`) while there is something to profile, and stays
+parked on an Event otherwise, so the cost when off is one header lookup per
+request. Stacks are aggregated in the folded format
+("mod:func;mod:func <count>" per line) understood by flamegraph.pl,
+speedscope and inferno.
+
+Two modes:
+- Request profiles: a request whose `X-Profile` header carries ADMIN_TOKEN
+  (any value with ADMIN_OPEN=true), or one of the next N requests after
+  `arm(N)`, is sampled at a high rate for its whole duration; the profile
+  is stored (bounded) and retrievable by id.
+- Continuous: low-rate sampling that aggregates hot stacks over time.
+
+Samples cover all busy threads (the event loop and the inference pool), so
+a request profile also contains work of requests running concurrently.
+Idle threads (blocked in threading/selectors/queue waits, parked pool
+workers) are skipped.
+"""
+
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from core import config
+
+# Leaf frames in these modules mean the thread is parked, not working
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", "futures/thread.py")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_MODULES)
+
+
+def collect_stacks(exclude_thread: int = None, max_depth: int = 64) -> list:
+    """Folded stacks (root first) of all busy threads right now."""
+    stacks = []
+    for thread_id, frame in sys._current_frames().items():
+        if thread_id == exclude_thread or frame is None or _is_idle(frame):
+            continue
+        labels = []
+        while frame is not None and len(labels) < max_depth:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        stacks.append(";".join(reversed(labels)))
+    return stacks
+
+
+class ProfileSession:
+    """Samples collected for one profiled request."""
+
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_s = None
+        self.samples = 0
+        self.stacks = Counter()
+
+    def add(self, stacks: list):
+        self.samples += 1
+        self.stacks.update(stacks)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_s * 1000 if self.duration_s is not None else None,
+            "samples": self.samples,
+        }
+
+
+def to_folded(stacks: Counter) -> str:
+    """Folded-stack text, heaviest stacks first."""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+def top_functions(stacks: Counter, limit: int = 20) -> list:
+    """Functions by self samples (leaf of the stack)."""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return [{"function": f, "samples": n} for f, n in leaves.most_common(limit)]
+
+
+class Profiler:
+    """Process-wide profiler: request sessions, next-N arming and continuous mode."""
+
+    def __init__(
+        self,
+        interval_s: float = None,
+        continuous_hz: float = None,
+        max_profiles: int = None,
+        max_depth: int = 64,
+    ):
+        self.interval_s = config.PROFILER_INTERVAL_MS / 1000 if interval_s is None else interval_s
+        self.continuous_hz = config.PROFILER_CONTINUOUS_HZ if continuous_hz is None else continuous_hz
+        self.max_depth = max_depth
+        self._profiles = OrderedDict()
+        self._max_profiles = config.PROFILER_MAX_PROFILES if max_profiles is None else max_profiles
+        self._sessions = set()
+        self._armed = 0
+        self._continuous = False
+        self._continuous_stacks = Counter()
+        self._continuous_samples = 0
+        self._continuous_since = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # -------------------- request profiling --------------------
+    def arm(self, requests: int):
+        """Profile the next `requests` requests."""
+        with self._lock:
+            self._armed = max(0, int(requests))
+
+    @property
+    def armed(self) -> int:
+        return self._armed
+
+    def should_profile(self, header_value: str = None) -> bool:
+        """Cheap per-request check: profiling header or armed counter."""
+        if header_value:
+            token = config.ADMIN_TOKEN
+            if (header_value == token) if token else config.ADMIN_OPEN:
+                return True
+        if self._armed:
+            with self._lock:
+                if self._armed > 0:
+                    self._armed -= 1
+                    return True
+        return False
+
+    def begin(self, label: str) -> ProfileSession:
+        session = ProfileSession(label)
+        with self._lock:
+            self._sessions.add(session)
+        self._ensure_thread()
+        self._wake.set()
+        return session
+
+    def end(self, session: ProfileSession) -> ProfileSession:
+        session.duration_s = time.perf_counter() - session._start
+        with self._lock:
+            self._sessions.discard(session)
+            self._profiles[session.id] = session
+            while len(self._profiles) > self._max_profiles:
+                self._profiles.popitem(last=False)
+        return session
+
+    def get_profile(self, profile_id: str):
+        return self._profiles.get(profile_id)
+
+    def list_profiles(self) -> list:
+        return [p.summary() for p in reversed(list(self._profiles.values()))]
+
+    # -------------------- continuous mode --------------------
+    def set_continuous(self, enabled: bool, hz: float = None):
+        with self._lock:
+            self._continuous = enabled
+            if hz:
+                self.continuous_hz = hz
+            if enabled and self._continuous_since is None:
+                self._continuous_since = time.time()
+        if enabled:
+            self._ensure_thread()
+            self._wake.set()
+
+    def reset_continuous(self):
+        with self._lock:
+            self._continuous_stacks = Counter()
+            self._continuous_samples = 0
+            self._continuous_since = time.time() if self._continuous else None
+
+    def continuous_profile(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self._continuous,
+                "hz": self.continuous_hz,
+                "since": self._continuous_since,
+                "samples": self._continuous_samples,
+                "stacks": Counter(self._continuous_stacks),
+            }
+
+    def status(self) -> dict:
+        return {
+            "active_sessions": len(self._sessions),
+            "armed_requests": self._armed,
+            "stored_profiles": len(self._profiles),
+            "continuous": self._continuous,
+            "continuous_hz": self.continuous_hz,
+            "interval_ms": self.interval_s * 1000,
+            "sampler_running": self._thread is not None and self._thread.is_alive(),
+        }
+
+    # -------------------- sampler thread --------------------
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        next_continuous = 0.0
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                continuous = self._continuous
+            if not sessions and not continuous:
+                # Nothing to do: park until a session or continuous mode starts
+                self._wake.clear()
+                self._wake.wait()
+                continue
+
+            now = time.perf_counter()
+            take_continuous = continuous and now >= next_continuous
+            if sessions or take_continuous:
+                stacks = collect_stacks(me, self.max_depth)
+                for session in sessions:
+                    session.add(stacks)
+                if take_continuous:
+                    next_continuous = now + 1.0 / self.continuous_hz
+                    with self._lock:
+                        self._continuous_stacks.update(stacks)
+                        self._continuous_samples += 1
+
+            if sessions:
+                time.sleep(self.interval_s)
+            else:
+                time.sleep(max(next_continuous - time.perf_counter(), 0.001))
+
+
+profiler = Profiler()
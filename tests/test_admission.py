@@ -0,0 +1,44 @@
+"""
+Service levels chosen by the /predict admission controller.
+
+Usage:
+    python -m pytest tests/test_admission.py
+"""
+
+from core.admission import FULL, NO_LLM, NO_SHAP, PRECOMPUTED, REJECTED, AdmissionController
+
+
+def _controller(**kwargs):
+    params = dict(enabled=True, queue_depth_step=16, latency_target_s=1.0, llm_latency_target_s=5.0, ewma_alpha=1.0)
+    params.update(kwargs)
+    return AdmissionController(**params)
+
+
+def test_level_follows_compute_latency():
+    admission = _controller()
+    for seconds, expected in [(0.1, FULL), (1.5, NO_LLM), (2.5, NO_SHAP), (3.2, PRECOMPUTED), (9.0, REJECTED)]:
+        admission.observe(seconds)
+        assert admission.admit() == expected
+
+
+def test_slow_llm_only_drops_the_llm():
+    admission = _controller()
+    admission.observe(0.1)
+    admission.observe_llm(60.0)
+    assert admission.pressure() < 1
+    assert admission.admit() == NO_LLM
+
+
+def test_skipped_llm_calls_let_the_llm_recover():
+    admission = _controller(ewma_alpha=0.5)
+    admission.observe_llm(20.0)
+    levels = [admission.admit() for _ in range(5)]
+    assert levels[0] == NO_LLM
+    assert levels[-1] == FULL
+
+
+def test_disabled_is_always_full():
+    admission = _controller(enabled=False)
+    admission.observe(100.0)
+    admission.observe_llm(100.0)
+    assert admission.admit() == FULL
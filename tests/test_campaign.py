@@ -0,0 +1,71 @@
+"""
+Checks the campaign budget solver against brute force on small instances.
+
+Usage:
+    python -m pytest tests/test_campaign.py
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from ml.campaign import solve_budget_allocation
+
+
+def _brute_force(value, cost, budget):
+    """Best total value over every allocation of at most one offer per customer."""
+    n, k = value.shape
+    value = np.where(value > cost, value, 0.0)
+    best = 0.0
+    for combo in itertools.product(range(-1, k), repeat=n):
+        picked = [(i, j) for i, j in enumerate(combo) if j >= 0]
+        if sum(cost[i, j] for i, j in picked) <= budget + 1e-9:
+            best = max(best, sum(value[i, j] for i, j in picked))
+    return best
+
+
+def _totals(value, cost, choice):
+    value = np.where(value > cost, value, 0.0)
+    rows = np.flatnonzero(choice >= 0)
+    return value[rows, choice[rows]].sum(), cost[rows, choice[rows]].sum()
+
+
+def _instance(rng, n, k):
+    cost = rng.uniform(1, 20, (n, k))
+    value = cost * rng.uniform(0.5, 4, (n, k))
+    budget = rng.uniform(5, cost.sum() / k)
+    return value, cost, budget
+
+
+@pytest.mark.parametrize("n,k", [(6, 3), (8, 2), (5, 4)])
+def test_close_to_brute_force_optimum(n, k):
+    rng = np.random.default_rng(1)
+    ratios = []
+    for _ in range(100):
+        value, cost, budget = _instance(rng, n, k)
+        choice = solve_budget_allocation(value, cost, budget)
+        got, spent = _totals(value, cost, choice)
+        assert spent <= budget + 1e-6
+        optimum = _brute_force(value, cost, budget)
+        if optimum > 0:
+            ratios.append(got / optimum)
+    assert min(ratios) >= 0.85
+    assert np.mean(ratios) >= 0.98
+
+
+def test_budget_covering_everything_takes_best_offer_per_customer():
+    rng = np.random.default_rng(2)
+    value, cost, _ = _instance(rng, 50, 4)
+    choice = solve_budget_allocation(value, cost, budget=cost.sum())
+    margin = np.where(value > cost, value, 0.0)
+    # With no price on budget each customer simply takes their most valuable offer
+    expected = np.where(margin.max(axis=1) > 0, margin.argmax(axis=1), -1)
+    np.testing.assert_array_equal(choice, expected)
+
+
+def test_unprofitable_offers_and_empty_budget():
+    value = np.array([[1.0, 2.0], [3.0, 1.0]])
+    cost = np.array([[2.0, 5.0], [4.0, 1.0]])
+    np.testing.assert_array_equal(solve_budget_allocation(value, cost, 10.0), [-1, -1])
+    np.testing.assert_array_equal(solve_budget_allocation(value * 10, cost, 0.0), [-1, -1])
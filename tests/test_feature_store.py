@@ -0,0 +1,170 @@
+"""
+Online feature store: ingestion against a pandas reference, event
+rejection, checkpoint/restore and the copy-on-write sync into a snapshot.
+
+Usage:
+    python -m pytest tests/test_feature_store.py
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.feature_store import FEATURE_COLUMNS, MAX_FUTURE_DAYS, FeatureStore
+
+GAP_ALPHA = 0.2
+
+
+def _events(n: int = 600, n_customers: int = 25, seed: int = 0) -> pd.DataFrame:
+    """Chronological purchase events over the last ~15 months (some fall outside the yearly window)."""
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    days_ago = np.sort(rng.integers(0, 450, n))[::-1]
+    return pd.DataFrame({
+        "customer_id": [f"LIVE_{i:03d}" for i in rng.integers(0, n_customers, n)],
+        "day": [today - timedelta(days=int(d)) for d in days_ago],
+        "amount": rng.uniform(5, 300, n).round(2),
+        "channel": rng.choice(["online", "store"], n),
+    })
+
+
+def _as_payload(events: pd.DataFrame) -> list:
+    return [
+        {"customer_id": r.customer_id, "timestamp": r.day.isoformat(), "amount": r.amount, "channel": r.channel}
+        for r in events.itertuples()
+    ]
+
+
+def _reference(events: pd.DataFrame) -> pd.DataFrame:
+    """Trailing-12-calendar-month features and the gap EWMA, computed per customer."""
+    today = date.today()
+    first_month = today.year * 12 + today.month - 1 - 11
+    month = events["day"].map(lambda d: d.year * 12 + d.month - 1)
+    in_window = events[month >= first_month]
+    window = in_window.groupby("customer_id").agg(
+        yearly_purchase_count=("amount", "size"),
+        avg_order_value=("amount", "mean"),
+        online_ratio=("channel", lambda c: (c == "online").mean()),
+    )
+    rows = {}
+    for customer_id, group in events.groupby("customer_id", sort=False):
+        last, gap = None, 0.0
+        for day in group["day"]:
+            if last is not None and day > last:
+                gap += GAP_ALPHA * ((day - last).days - gap)
+            last = day if last is None else max(last, day)
+        rows[customer_id] = {"days_since_last_purchase": (today - last).days, "avg_gap_days": gap}
+    reference = pd.DataFrame.from_dict(rows, orient="index").join(window)
+    return reference.fillna({"yearly_purchase_count": 0, "avg_order_value": 0.0, "online_ratio": 0.0})
+
+
+def _store(tmp_path) -> FeatureStore:
+    store = FeatureStore(checkpoint_path=str(tmp_path / "features.json"), gap_alpha=GAP_ALPHA)
+    store.restore()
+    return store
+
+
+def _assert_features(store: FeatureStore, reference: pd.DataFrame):
+    for customer_id, expected in reference.iterrows():
+        got = store.features(customer_id)
+        for column in FEATURE_COLUMNS:
+            assert got[column] == pytest.approx(expected[column], rel=1e-9, abs=1e-9), (customer_id, column)
+
+
+def test_ingest_matches_pandas_reference(tmp_path):
+    events = _events()
+    store = _store(tmp_path)
+    # Batches of uneven size, as the API and the tailer would deliver them
+    payload = _as_payload(events)
+    for start in range(0, len(payload), 37):
+        store.ingest(payload[start:start + 37])
+    assert sorted(store.tracked_ids()) == sorted(events["customer_id"].unique())
+    _assert_features(store, _reference(events))
+
+
+def test_future_and_malformed_events_are_rejected(tmp_path):
+    store = _store(tmp_path)
+    store.ingest([{"customer_id": "C1", "amount": 50.0}])
+    before = store.features("C1")
+    too_far = (date.today() + timedelta(days=MAX_FUTURE_DAYS + 1)).isoformat()
+    result = store.ingest([
+        {"customer_id": "C1", "amount": 10.0, "timestamp": too_far},
+        {"amount": 10.0},
+        {"customer_id": "C1", "amount": "not a number"},
+    ])
+    assert result["applied"] == 0 and result["rejected"] == 3
+    assert store.features("C1") == before
+
+
+def test_seeds_from_the_snapshot_row(tmp_path):
+    snapshot = pd.DataFrame(
+        {"days_since_last_purchase": [10], "yearly_purchase_count": [24], "avg_gap_days": [15],
+         "avg_order_value": [100], "online_ratio": [0.5]},
+        index=pd.Index(["SNAP_1"], name="customer_id"),
+    )
+    store = _store(tmp_path)
+    store.attach(snapshot)
+    store.ingest([{"customer_id": "SNAP_1", "amount": 350.0, "channel": "online"}])
+    features = store.features("SNAP_1")
+    assert features["yearly_purchase_count"] == pytest.approx(25)
+    assert features["avg_order_value"] == pytest.approx((2400 + 350) / 25)
+    assert features["online_ratio"] == pytest.approx(13 / 25)
+    assert features["days_since_last_purchase"] == 0
+    assert features["avg_gap_days"] == pytest.approx(15 + GAP_ALPHA * (10 - 15))
+
+
+def test_checkpoint_restore_round_trip(tmp_path):
+    events = _events(seed=1)
+    store = _store(tmp_path)
+    store.ingest(_as_payload(events), tail_offset=1234)
+    assert store.checkpoint()
+    assert not store.checkpoint()  # unchanged since the last one
+
+    restored = FeatureStore(checkpoint_path=store.checkpoint_path, gap_alpha=GAP_ALPHA)
+    assert restored.restore() == len(store.tracked_ids())
+    assert restored.tail_offset == 1234
+    assert restored.data_version() == store.data_version()
+    _assert_features(restored, _reference(events))
+
+
+def test_restore_keeps_events_ingested_before_it(tmp_path):
+    store = _store(tmp_path)
+    store.ingest([{"customer_id": "OLD", "amount": 20.0}, {"customer_id": "BOTH", "amount": 20.0}])
+    store.checkpoint()
+
+    fresh = FeatureStore(checkpoint_path=store.checkpoint_path, gap_alpha=GAP_ALPHA)
+    fresh.ingest([{"customer_id": "BOTH", "amount": 80.0}, {"customer_id": "NEW", "amount": 5.0}])
+    # An existing checkpoint is never overwritten before it was loaded
+    assert not fresh.checkpoint()
+    fresh.restore()
+    assert sorted(fresh.tracked_ids()) == ["BOTH", "NEW", "OLD"]
+    assert fresh.features("BOTH")["avg_order_value"] == pytest.approx(80.0)
+    assert fresh.version > store.version
+    assert fresh.checkpoint()
+
+
+def test_sync_returns_an_updated_copy(tmp_path):
+    snapshot = pd.DataFrame(
+        {"days_since_last_purchase": [30, 40, 50], "yearly_purchase_count": [12, 6, 3],
+         "avg_gap_days": [30, 60, 90], "avg_order_value": [100, 200, 300],
+         "online_ratio": [0.1, 0.2, 0.3], "primary_category": ["Dairy", "Bakery", "Dairy"]},
+        index=pd.Index(["A", "B", "C"], name="customer_id"),
+    )
+    original = snapshot.copy()
+    store = _store(tmp_path)
+    store.attach(snapshot)
+    store.ingest([{"customer_id": "B", "amount": 500.0, "channel": "online"}, {"customer_id": "ZZ", "amount": 1.0}])
+
+    synced = store.sync(snapshot)
+    pd.testing.assert_frame_equal(snapshot, original)  # never written in place
+    assert list(synced.dtypes) == list(snapshot.dtypes)
+    features = store.features("B")
+    for column in FEATURE_COLUMNS:
+        expected = features[column]
+        if pd.api.types.is_integer_dtype(snapshot[column]):
+            expected = round(expected)
+        assert synced.loc["B", column] == pytest.approx(expected)
+    pd.testing.assert_frame_equal(synced.drop(index="B"), snapshot.drop(index="B"))
+    assert store.sync(synced) is synced  # nothing changed since
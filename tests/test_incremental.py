@@ -0,0 +1,117 @@
+"""
+Incremental retraining: promotion decisions and the partition bookkeeping.
+
+Usage:
+    python -m pytest tests/test_incremental.py
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from ml import incremental
+from ml.drift import reference_path
+from ml.train import load_training_data
+
+CURRENT_TREES = 10
+
+
+def _outcomes(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    days_since = rng.integers(0, 120, n)
+    return pd.DataFrame({
+        "yearly_purchase_count": rng.integers(1, 50, n),
+        "avg_gap_days": rng.uniform(2, 60, n),
+        "days_since_last_purchase": days_since,
+        "avg_order_value": rng.uniform(100, 2000, n),
+        "online_ratio": rng.uniform(0, 1, n),
+        "discount_sensitivity": rng.choice(["Low", "Medium", "High"], n),
+        "churn": ((days_since > 60) ^ (rng.random(n) < 0.1)).astype(int),
+    })
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """A production model trained on the first batch, and a store with two new partitions."""
+    seed_path = tmp_path / "seed.parquet"
+    _outcomes(400, seed=0).to_parquet(seed_path, index=False)
+    X, y = load_training_data(str(seed_path))
+    current = RandomForestClassifier(n_estimators=CURRENT_TREES, max_depth=4, random_state=0, class_weight="balanced")
+    current.fit(X, y)
+    model_path = tmp_path / "churn_model.pkl"
+    joblib.dump(current, model_path)
+
+    store = tmp_path / "store"
+    incremental.append_outcomes(_outcomes(300, seed=1), "2024-06-01", str(store))
+    incremental.append_outcomes(_outcomes(300, seed=2), "2024-06-02", str(store))
+    return {
+        "store_dir": str(store),
+        "current_model_path": str(model_path),
+        "models_dir": str(tmp_path / "models"),
+    }
+
+
+def _fix_auc(monkeypatch, current_auc: float, candidate_auc: float):
+    """Score the current model (CURRENT_TREES trees) and the candidate with fixed AUCs."""
+    def evaluate(model, X, y):
+        auc = current_auc if len(model.estimators_) == CURRENT_TREES else candidate_auc
+        return {"auc": auc, "accuracy": 0.5, "n_trees": len(model.estimators_)}
+    monkeypatch.setattr(incremental, "_evaluate", evaluate)
+
+
+def test_better_candidate_is_promoted(workspace, monkeypatch):
+    _fix_auc(monkeypatch, current_auc=0.70, candidate_auc=0.75)
+    entry = incremental.retrain("warm_start", new_trees=5, promote=True, **workspace)
+
+    assert entry["promoted"] and entry["partitions"] == ["2024-06-01", "2024-06-02"]
+    production = joblib.load(workspace["current_model_path"])
+    assert len(production.estimators_) == CURRENT_TREES + 5
+    assert os.path.exists(reference_path(workspace["current_model_path"]))
+    manifest = incremental.load_manifest(os.path.join(workspace["models_dir"], "manifest.json"))
+    assert manifest["current_version"] == 1
+    assert manifest["last_trained_partition"] == "2024-06-02"
+
+    # Nothing newer than the promoted partitions is left to train on
+    with pytest.raises(ValueError):
+        incremental.retrain("warm_start", new_trees=5, promote=True, **workspace)
+
+
+def test_worse_candidate_is_kept_out_and_its_partitions_stay_pending(workspace, monkeypatch):
+    _fix_auc(monkeypatch, current_auc=0.80, candidate_auc=0.80 - 2 * incremental.PROMOTION_AUC_TOLERANCE)
+    entry = incremental.retrain("warm_start", new_trees=5, promote=True, **workspace)
+
+    assert not entry["promoted"]
+    assert os.path.exists(entry["path"])  # still published as a version
+    assert len(joblib.load(workspace["current_model_path"]).estimators_) == CURRENT_TREES
+    manifest = incremental.load_manifest(os.path.join(workspace["models_dir"], "manifest.json"))
+    assert manifest["current_version"] is None
+    assert manifest["last_trained_partition"] is None
+
+    # The next run trains on the same partitions again
+    _fix_auc(monkeypatch, current_auc=0.80, candidate_auc=0.80)
+    retry = incremental.retrain("warm_start", new_trees=5, promote=True, **workspace)
+    assert retry["promoted"] and retry["version"] == 2
+    assert retry["partitions"] == entry["partitions"]
+
+
+def test_candidate_within_tolerance_is_promoted_but_not_without_the_flag(workspace, monkeypatch):
+    _fix_auc(monkeypatch, current_auc=0.80, candidate_auc=0.80 - incremental.PROMOTION_AUC_TOLERANCE / 2)
+    assert not incremental.retrain("warm_start", new_trees=5, promote=False, **workspace)["promoted"]
+    assert incremental.retrain("warm_start", new_trees=5, promote=True, **workspace)["promoted"]
+
+
+def test_grow_forest_caps_the_tree_count(workspace):
+    current = joblib.load(workspace["current_model_path"])
+    X, y = incremental.load_partitions(["2024-06-01"], workspace["store_dir"])
+    grown = incremental.grow_forest(current, X, y, new_trees=8, max_trees=12)
+    assert len(grown.estimators_) == 12
+    # The oldest trees are dropped, the current model is untouched
+    assert len(current.estimators_) == CURRENT_TREES
+    dropped = CURRENT_TREES + 8 - 12
+    for kept, original in zip(grown.estimators_, current.estimators_[dropped:]):
+        np.testing.assert_array_equal(kept.tree_.threshold, original.tree_.threshold)
+    assert grown.class_weight == "balanced"
@@ -0,0 +1,114 @@
+"""
+Chunked RFM features checked against a plain pandas groupby over the whole log.
+
+Usage:
+    python -m pytest tests/test_rfm.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.rfm import DISCOUNT_BANDS, compute_rfm
+
+AS_OF = pd.Timestamp("2024-04-01")
+WINDOW_DAYS = 365
+HORIZON_DAYS = 60
+
+
+def _transactions(n_rows: int = 3000, n_customers: int = 80, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2022-06-01")
+    return pd.DataFrame({
+        "customer_id": [f"C{i:03d}" for i in rng.integers(0, n_customers, n_rows)],
+        "timestamp": start + pd.to_timedelta(rng.integers(0, 700 * 24 * 3600, n_rows), unit="s"),
+        "amount": rng.uniform(5, 500, n_rows).round(2),
+        "channel": rng.choice(["online", "store"], n_rows),
+        "discount_used": rng.choice(["True", "False"], n_rows, p=[0.3, 0.7]),
+    })
+
+
+def _reference(tx: pd.DataFrame, as_of: pd.Timestamp) -> pd.DataFrame:
+    """Features computed per customer straight from their transactions."""
+    day = tx["timestamp"].dt.normalize()
+    as_of = as_of.normalize()
+    rows = []
+    for customer_id, group in tx.assign(day=day).groupby("customer_id"):
+        before = group[group["day"] < as_of]
+        if before.empty:
+            continue
+        window = before[before["day"] >= as_of - pd.Timedelta(days=WINDOW_DAYS)]
+        label = group[(group["day"] >= as_of) & (group["day"] < as_of + pd.Timedelta(days=HORIZON_DAYS))]
+        n = len(window)
+        if n >= 2:
+            gap = (window["day"].max() - window["day"].min()).days / (n - 1)
+        elif len(before) >= 2:
+            gap = (before["day"].max() - before["day"].min()).days / (len(before) - 1)
+        else:
+            gap = (as_of - before["day"].min()).days
+        discounted = (window["discount_used"] == "True").mean() if n else 0.0
+        band = next(name for threshold, name in DISCOUNT_BANDS if discounted < threshold)
+        rows.append({
+            "customer_id": customer_id,
+            "yearly_purchase_count": n,
+            "avg_gap_days": gap,
+            "days_since_last_purchase": (as_of - before["day"].max()).days,
+            "avg_order_value": window["amount"].mean() if n else 0.0,
+            "online_ratio": (window["channel"] == "online").mean() if n else 0.0,
+            "purchases_30d": (before["day"] >= as_of - pd.Timedelta(days=30)).sum(),
+            "purchases_90d": (before["day"] >= as_of - pd.Timedelta(days=90)).sum(),
+            "spend_90d": before.loc[before["day"] >= as_of - pd.Timedelta(days=90), "amount"].sum(),
+            "tenure_days": (as_of - before["day"].min()).days,
+            "discount_sensitivity": band,
+            "churned": int(label.empty),
+        })
+    return pd.DataFrame(rows).set_index("customer_id").sort_index()
+
+
+def _check(result: pd.DataFrame, expected: pd.DataFrame):
+    result = result.set_index("customer_id").sort_index()
+    assert list(result.index) == list(expected.index)
+    for column in expected.columns:
+        if column == "discount_sensitivity":
+            assert (result[column] == expected[column]).all(), column
+        else:
+            np.testing.assert_allclose(
+                result[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                rtol=1e-5, atol=1e-3, err_msg=column,
+            )
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return _transactions()
+
+
+def test_csv_chunks_match_pandas_reference(tmp_path, transactions):
+    path = tmp_path / "transactions.csv"
+    transactions.to_csv(path, index=False)
+    # Small chunks and merge threshold exercise the partial merges
+    result = compute_rfm(str(path), AS_OF, WINDOW_DAYS, HORIZON_DAYS, chunksize=137, merge_rows=60)
+    _check(result, _reference(transactions, AS_OF))
+
+
+def test_parquet_matches_csv(tmp_path, transactions):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "transactions.parquet"
+    transactions.to_parquet(path, index=False)
+    result = compute_rfm(str(path), AS_OF, WINDOW_DAYS, HORIZON_DAYS, chunksize=500)
+    _check(result, _reference(transactions, AS_OF))
+
+
+def test_several_as_of_dates_in_one_pass(tmp_path, transactions):
+    path = tmp_path / "transactions.csv"
+    transactions.to_csv(path, index=False)
+    dates = [pd.Timestamp("2023-10-01"), AS_OF]
+    result = compute_rfm(str(path), dates, WINDOW_DAYS, HORIZON_DAYS, chunksize=400)
+    for as_of in dates:
+        _check(result[result["as_of"] == as_of].drop(columns="as_of"), _reference(transactions, as_of))
+
+
+def test_no_purchases_before_as_of(tmp_path, transactions):
+    path = tmp_path / "transactions.csv"
+    transactions.to_csv(path, index=False)
+    assert compute_rfm(str(path), "2020-01-01").empty
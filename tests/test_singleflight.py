@@ -0,0 +1,75 @@
+"""
+Single-flight coalescing of concurrent identical calls.
+
+Usage:
+    python -m pytest tests/test_singleflight.py
+"""
+
+import asyncio
+
+import pytest
+
+from core.singleflight import SingleFlight, canonical_key
+
+
+def test_canonical_key_ignores_key_order():
+    assert canonical_key({"a": 1, "b": [1, 2]}) == canonical_key({"b": [1, 2], "a": 1})
+    assert canonical_key({"a": 1}) != canonical_key({"a": 2})
+
+
+def test_concurrent_calls_share_one_computation():
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.run(key, compute, key) for key in [1, 1, 1, 2, 2]))
+        assert flight.in_flight() == 0
+        # Finished computations are not cached
+        again = await flight.run(1, compute, 1)
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert results == [2, 2, 2, 4, 4]
+    assert again == 2
+    assert calls == [1, 2, 1]
+
+
+def test_exceptions_are_shared():
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        flight = SingleFlight("test")
+        return await asyncio.gather(*(flight.run("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        flight = SingleFlight("test")
+        leader = asyncio.ensure_future(flight.run("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "done"
@@ -1,6 +1,7 @@
 
 import sys
 import os
+import time
 import json
 from fastapi.testclient import TestClient
 
@@ -11,48 +12,52 @@ from api.main import app
 
 def verify_ab_simulation():
     print("Verifying A/B Simulation Endpoint...")
-    client = TestClient(app)
+    with TestClient(app) as client:
+        # Startup loads the data and model in the background; wait for /ready
+        deadline = time.time() + 60
+        while client.get("/api/churn/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.2)
     
-    # payload
-    payload = {
-        "customer_id": "C001",
-        "strategy_a": {
-            "name": "Strategy A",
-            "planned_discount": 10,
-            "loyalty_points_bonus": 0
-        },
-        "strategy_b": {
-            "name": "Strategy B",
-            "planned_discount": 0,
-            "loyalty_points_bonus": 500
+        # payload
+        payload = {
+            "customer_id": "C001",
+            "strategy_a": {
+                "name": "Strategy A",
+                "planned_discount": 10,
+                "loyalty_points_bonus": 0
+            },
+            "strategy_b": {
+                "name": "Strategy B",
+                "planned_discount": 0,
+                "loyalty_points_bonus": 500
+            }
         }
-    }
     
-    try:
-        response = client.post("/api/churn/simulate-comparison", json=payload)
+        try:
+            response = client.post("/api/churn/simulate-comparison", json=payload)
         
-        if response.status_code == 200:
-            data = response.json()
-            print("SUCCESS: Endpoint returned 200 OK")
-            print(json.dumps(data, indent=2))
+            if response.status_code == 200:
+                data = response.json()
+                print("SUCCESS: Endpoint returned 200 OK")
+                print(json.dumps(data, indent=2))
             
-            # Basic sanity checks
-            if data["winner"]:
-                print(f"Winner declared: {data['winner']}")
-            else:
-                print("FAILURE: No winner declared")
+                # Basic sanity checks
+                if data["winner"]:
+                    print(f"Winner declared: {data['winner']}")
+                else:
+                    print("FAILURE: No winner declared")
                 
-            if "net_retention_score" in data["strategy_a"]:
-                 print("Structure check passed.")
-            else:
-                 print("FAILURE: Missing net_retention_score in strategy_a")
+                if "net_retention_score" in data["strategy_a"]:
+                     print("Structure check passed.")
+                else:
+                     print("FAILURE: Missing net_retention_score in strategy_a")
                  
-        else:
-            print(f"FAILURE: Status {response.status_code}")
-            print(response.text)
+            else:
+                print(f"FAILURE: Status {response.status_code}")
+                print(response.text)
             
-    except Exception as e:
-        print(f"FAILURE: Exception occurred: {e}")
+        except Exception as e:
+            print(f"FAILURE: Exception occurred: {e}")
 
 if __name__ == "__main__":
     verify_ab_simulation()
@@ -1,6 +1,7 @@
 
 import sys
 import os
+import time
 import sqlite3
 import json
 from fastapi.testclient import TestClient
@@ -30,22 +31,26 @@ def verify_db():
 
 def verify_api():
     print("\nVerifying API Endpoint /api/churn/top-risk...")
-    client = TestClient(app)
-    response = client.get("/api/churn/top-risk")
+    with TestClient(app) as client:
+        # Startup loads the data and model in the background; wait for /ready
+        deadline = time.time() + 60
+        while client.get("/api/churn/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.2)
+        response = client.get("/api/churn/top-risk")
     
-    if response.status_code == 200:
-        data = response.json()
-        print(f"API returned {len(data)} records.")
-        if len(data) > 0:
-            print(f"Sample API record: {data[0]}")
+        if response.status_code == 200:
+            data = response.json()
+            print(f"API returned {len(data)} records.")
+            if len(data) > 0:
+                print(f"Sample API record: {data[0]}")
             
-        if len(data) == 100:
-             print("SUCCESS: API returned 100 records.")
+            if len(data) == 100:
+                 print("SUCCESS: API returned 100 records.")
+            else:
+                 print(f"FAILURE: API returned {len(data)} records.")
         else:
-             print(f"FAILURE: API returned {len(data)} records.")
-    else:
-        print(f"FAILURE: API returned status {response.status_code}")
-        print(response.text)
+            print(f"FAILURE: API returned status {response.status_code}")
+            print(response.text)
 
 if __name__ == "__main__":
     verify_db()
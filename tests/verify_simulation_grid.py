@@ -0,0 +1,59 @@
+import sys
+import os
+import time
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.main import app
+
+def verify_simulation_grid():
+    print("Verifying What-If Grid Simulation Endpoint...")
+    with TestClient(app) as client:
+        # Startup loads the data and model in the background; wait for /ready
+        deadline = time.time() + 60
+        while client.get("/api/churn/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.2)
+
+        payload = {
+            "customer_id": "FM_CUST_000001",
+            "discount_levels": [0, 10, 20, 30],
+            "loyalty_bonus_levels": [0, 500, 1000],
+            "channels": ["email", "sms", "phone"]
+        }
+
+        response = client.post("/api/churn/simulate-grid", json=payload)
+
+        if response.status_code != 200:
+            print(f"FAILURE: Status {response.status_code}")
+            print(response.text)
+            return
+
+        data = response.json()
+        print("SUCCESS: Endpoint returned 200 OK")
+        print(f"Baseline churn probability: {data['baseline_churn_probability']:.3f}")
+
+        expected = 4 * 3 * 3
+        if len(data["grid"]) == expected:
+            print(f"Grid check passed ({expected} points).")
+        else:
+            print(f"FAILURE: Expected {expected} grid points, got {len(data['grid'])}")
+
+        costs = [p["intervention_cost"] for p in data["pareto_frontier"]]
+        reductions = [p["churn_reduction_absolute"] for p in data["pareto_frontier"]]
+        if costs == sorted(costs) and all(b > a for a, b in zip(reductions, reductions[1:])):
+            print(f"Pareto frontier check passed ({len(costs)} points).")
+        else:
+            print("FAILURE: Pareto frontier is not monotone in cost and reduction")
+
+        print(f"Best strategy: {data['best_strategy']}")
+
+        bad = client.post("/api/churn/simulate-grid", json={**payload, "channels": ["fax"]})
+        if bad.status_code == 400:
+            print("Unsupported channel rejected with 400.")
+        else:
+            print(f"FAILURE: Unsupported channel returned {bad.status_code}")
+
+if __name__ == "__main__":
+    verify_simulation_grid()